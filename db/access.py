@@ -1,9 +1,37 @@
 import boto3
+from botocore.config import Config
 from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeDeserializer
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import decimal
+import itertools
+from db.deserializer import deserialize_item
+from db.cache import QueryCache, IntervalCache, estimate_items_bytes
+from db.frame_cache import HOUR_MS, frame_cache
+from utils.frame import SensorFrame
+
+# Upper bound for concurrent segment queries (shared pool, shared client connections)
+MAX_QUERY_WORKERS = 8
+MAX_SEGMENTS = 32
 
 # Initialize globally for reuse
 dynamodb = boto3.resource('dynamodb')
+# Plain low-level client for the fast_decode and segmented paths. The resource's own meta.client
+# has boto3's TypeSerializer/TypeDeserializer hooks attached, and resources are not thread-safe;
+# a low-level client is, so all segment workers share this one (and its connection pool).
+client = boto3.client('dynamodb', config=Config(max_pool_connections=MAX_QUERY_WORKERS))
+segment_pool = ThreadPoolExecutor(max_workers=MAX_QUERY_WORKERS, thread_name_prefix='dynamodb-segment')
+
+_type_deserializer = TypeDeserializer()
+
+# Warm-container caches for historical windows (see db/cache.py); survive between invocations.
+# range_cache serves query_paginated (sliding windows), page_cache the exact-range GSI timestamp scans.
+page_cache = QueryCache()
+range_cache = IntervalCache()
+
+# Key condition for the low-level client: 'id' + 'time' range ('time' is a reserved word)
+RANGE_KEY_CONDITION = '#id = :id AND #t BETWEEN :start AND :end'
 
 
 def query_health_status(table_name, id_value, start_time=None, end_time=None):
@@ -26,27 +54,174 @@ def query_health_status(table_name, id_value, start_time=None, end_time=None):
     return response.get('Items', [])
 
 
-def query_paginated(table_name, id_value, start_time, end_time, limit=32):
+def _range_query_params(table_name, id_value, start_time, end_time):
+    """Low-level client parameters for the 'id' + 'time' BETWEEN query."""
+    return {
+        'TableName': table_name,
+        'KeyConditionExpression': RANGE_KEY_CONDITION,
+        'ExpressionAttributeNames': {'#id': 'id', '#t': 'time'},
+        'ExpressionAttributeValues': {
+            ':id': {'S': str(id_value)},
+            ':start': {'N': str(start_time)},
+            ':end': {'N': str(end_time)},
+        },
+    }
+
+
+class _ClientTable:
+    """
+    Minimal stand-in for a boto3 Table that queries through the shared low-level client.
+    fast_decode=True deserializes with db.deserializer (numbers as int/float, sample lists as
+    array('d')); otherwise with TypeDeserializer, giving exactly the resource's Decimal items.
+    """
+
+    def __init__(self, table_name, id_value, start_time, end_time, fast_decode=False):
+        self.base_params = _range_query_params(table_name, id_value, start_time, end_time)
+        self.deserialize = deserialize_item if fast_decode else _deserialize_decimal
+
+    def query(self, **params):
+        params.pop('KeyConditionExpression', None)
+        if 'ExclusiveStartKey' in params:
+            params['ExclusiveStartKey'] = _serialize_key(params['ExclusiveStartKey'])
+
+        request = dict(self.base_params)
+        names = dict(request['ExpressionAttributeNames'])
+        names.update(params.pop('ExpressionAttributeNames', {}))
+        request.update(params)
+        request['ExpressionAttributeNames'] = names
+
+        response = client.query(**request)
+        result = {'Items': [self.deserialize(item) for item in response.get('Items', [])]}
+        if 'LastEvaluatedKey' in response:
+            result['LastEvaluatedKey'] = self.deserialize(response['LastEvaluatedKey'])
+        return result
+
+
+def _deserialize_decimal(item):
+    return {k: _type_deserializer.deserialize(v) for k, v in item.items()}
+
+
+def _serialize_key(key):
+    """Deserialized primary key -> low-level typed key."""
+    return {k: {'N': str(v)} if isinstance(v, (int, float, decimal.Decimal)) else {'S': str(v)}
+            for k, v in key.items()}
+
+
+def _split_range(start_time, end_time, segments):
+    """Splits the inclusive [start_time, end_time] into up to 'segments' contiguous inclusive sub-ranges."""
+    segments = max(1, min(segments, end_time - start_time + 1))
+    bounds = [start_time + (end_time - start_time + 1) * k // segments for k in range(segments + 1)]
+    return [(bounds[k], bounds[k + 1] - 1) for k in range(segments)]
+
+
+def query_paginated(table_name, id_value, start_time, end_time, limit=32, fast_decode=False,
+                    segments=1, size_from_index=False, use_cache=True):
     """
     Queries DynamoDB using ID + Time index.
     Accumulates items until 'limit' is reached or data is exhausted.
     Returns (items_list, next_timestamp_or_none).
+    With fast_decode=True the query goes through the low-level client and numbers come back
+    as int/float (sample lists as array('d')) instead of decimal.Decimal.
+    With segments > 1 the range is split and queried concurrently (see _query_paginated_segmented);
+    the result is identical to the sequential path.
+    Historical parts of the range are served from range_cache where already known, and only the
+    gaps are queried (see _query_with_intervals). use_cache=False always queries the whole range.
     """
-    table = dynamodb.Table(table_name)
+    def fetch(lo, hi, fetch_limit):
+        if segments > 1:
+            return _query_paginated_segmented(table_name, id_value, lo, hi, fetch_limit,
+                                              fast_decode, segments, size_from_index)
+
+        if fast_decode:
+            table = _ClientTable(table_name, id_value, lo, hi, fast_decode=True)
+        else:
+            table = dynamodb.Table(table_name)
+        return _paginate(table, id_value, lo, hi, fetch_limit)
+
+    if not use_cache:
+        return fetch(start_time, end_time, limit)
+
+    # Segmenting does not change the result, so it is not part of the series key
+    series = (table_name, id_value, fast_decode)
+    return _query_with_intervals(series, start_time, end_time, limit, fetch)
+
+
+def _item_time(item):
+    return int(item['time'])
+
+
+def _query_with_intervals(series, start_time, end_time, limit, fetch):
+    """
+    Walks [start_time, end_time] in time order, taking packets from the cached segments of 'series'
+    and calling fetch(lo, hi, limit) for the gaps between them. Gap results older than the
+    freshness horizon are added back to range_cache (merged with their neighbours), so the next
+    sliding window finds them.
+    Same result and next_timestamp semantics as a single query of the whole range.
+    """
+    horizon = range_cache.horizon()
+    cached = range_cache.overlapping(series, start_time, min(end_time, horizon - 1)) if horizon is not None else []
+
+    items = []
+    cursor = start_time
+    for segment in cached + [None]:
+        if limit is not None and len(items) >= limit:
+            break
+
+        gap_end = min(segment.lo - 1, end_time) if segment is not None else end_time
+        if cursor <= gap_end:
+            range_cache.record_gap()
+            batch, next_timestamp = fetch(cursor, gap_end, None if limit is None else limit - len(items))
+            items.extend(batch)
+
+            # Everything up to the last packet returned (or the whole gap) is now fully known
+            covered_end = next_timestamp - 1 if next_timestamp else gap_end
+            if horizon is not None:
+                covered_end = min(covered_end, horizon - 1)
+                range_cache.add(series, cursor, covered_end,
+                                [item for item in batch if _item_time(item) <= covered_end], _item_time)
+            if next_timestamp:
+                break
+
+        if segment is not None:
+            items.extend(segment.between(max(cursor, segment.lo), end_time))
+            cursor = segment.hi + 1
 
+    next_timestamp = None
+    if limit is not None and len(items) >= limit:
+        items = items[:limit]
+        next_timestamp = _item_time(items[-1]) + 1
+    return items, next_timestamp
+
+
+def _cached_query(cache_key, end_time, fetch, size_of):
+    """Read-through page_cache lookup; ranges newer than the freshness horizon always hit DynamoDB."""
+    if not page_cache.is_cacheable(end_time):
+        page_cache.record_uncacheable()
+        return fetch()
+
+    result = page_cache.get(cache_key)
+    if result is None:
+        result = fetch()
+        page_cache.put(cache_key, result, size_of(result))
+    return result
+
+
+def _paginate(table, id_value, start_time, end_time, limit):
+    """Follows LastEvaluatedKey until 'limit' items (None = all items) are collected."""
     key_condition = Key('id').eq(id_value) & Key('time').between(start_time, end_time)
 
     items = []
     last_key = None
-    params = {'KeyConditionExpression': key_condition, 'Limit': limit}
+    params = {'KeyConditionExpression': key_condition}
 
     while True:
-        # Update limit to fetch only what we need to reach the target
-        needed = limit - len(items)
-        if needed <= 0:
-            break
+        if limit is not None:
+            # Update limit to fetch only what we need to reach the target
+            needed = limit - len(items)
+            if needed <= 0:
+                break
 
-        params['Limit'] = needed
+            params['Limit'] = needed
 
         response = table.query(**params)
         batch = response.get('Items', [])
@@ -71,14 +246,147 @@ def query_paginated(table_name, id_value, start_time, end_time, limit=32):
     return items, next_timestamp
 
 
-def query_timestamps_only(table_name, id_value, start_time, end_time):
+def _query_paginated_segmented(table_name, id_value, start_time, end_time, limit, fast_decode,
+                               segments, size_from_index):
+    """
+    Splits [start_time, end_time] into sub-ranges, queries them concurrently on segment_pool and
+    stitches the pages back in time order.
+
+    - size_from_index=False: equal time slices, launched in time order for the items still missing.
+      One slice runs at first; each slice that falls short of the page doubles the slices in flight.
+    - size_from_index=True: the first 'limit' keys of the GSI split the page into equal packet counts.
+
+    DynamoDB returns a LastEvaluatedKey as soon as a query stops on its Limit, so the sequential
+    path yields next_timestamp = last time + 1 whenever 'limit' items were found. We mirror that.
+    """
+    def fetch(a, b, segment_limit):
+        return _paginate(_ClientTable(table_name, id_value, a, b, fast_decode), id_value, a, b, segment_limit)[0]
+
+    if size_from_index:
+        timestamps = query_timestamps_only(table_name, id_value, start_time, end_time, fast_decode=True,
+                                           segments=segments, limit=limit)
+        if not timestamps:
+            return [], None
+        per_segment = -(-len(timestamps) // segments)
+        starts = timestamps[::per_segment]
+        ranges = [(starts[k], starts[k + 1] - 1) for k in range(len(starts) - 1)]
+        ranges.append((starts[-1], timestamps[-1]))
+    else:
+        ranges = _split_range(start_time, end_time, segments)
+
+    items = []
+    if size_from_index or limit is None:
+        futures = [segment_pool.submit(fetch, a, b, None) for a, b in ranges]
+        for future in futures:
+            items.extend(future.result())
+    else:
+        pending, in_flight, window = iter(ranges), deque(), 1
+        while True:
+            for a, b in itertools.islice(pending, window - len(in_flight)):
+                in_flight.append(segment_pool.submit(fetch, a, b, limit - len(items)))
+            if not in_flight:
+                break
+            items.extend(in_flight.popleft().result())
+            if len(items) >= limit:
+                for future in in_flight:
+                    future.cancel()
+                break
+            window = min(2 * window, MAX_QUERY_WORKERS)
+
+    next_timestamp = None
+    if limit is not None and len(items) >= limit:
+        items = items[:limit]
+        next_timestamp = int(items[-1]['time']) + 1
+
+    return items, next_timestamp
+
+
+def query_hourly_frames(table_name, id_value, start_time, end_time, limit, processor, fast_decode=False,
+                        segments=1):
+    """
+    Columnar counterpart of query_paginated for the FRAME_TOPICS: returns (SensorFrame, next_timestamp)
+    with the same packets and the same next_timestamp semantics.
+
+    The range is walked one UTC hour at a time. Historical hours in frame_cache (/tmp) are memory-mapped;
+    other hours are queried as usual, and stored once range_cache holds the whole hour.
+    """
+    frames = []
+    count = 0
+    hour = start_time - start_time % HOUR_MS
+
+    while hour <= end_time and count < limit:
+        lo, hi = max(start_time, hour), min(end_time, hour + HOUR_MS - 1)
+
+        cacheable = frame_cache.is_cacheable(hour)
+        frame = frame_cache.load(table_name, id_value, hour) if cacheable else None
+        if frame is not None:
+            frame = frame.between(lo, hi)
+        elif cacheable:
+            items, next_timestamp = query_paginated(table_name, id_value, lo, hi, limit=limit - count,
+                                                    fast_decode=True, segments=segments)
+            # Earlier pages and this one may together hold the whole hour
+            hour_items = None if next_timestamp else \
+                range_cache.covering((table_name, id_value, True), hour, hour + HOUR_MS - 1)
+            if hour_items is not None:
+                frame = processor.process(hour_items, fmt='frame')
+                frame_cache.store(table_name, id_value, hour, frame)
+                frame = frame.between(lo, hi)
+            else:
+                frame = processor.process(items, fmt='frame')
+        else:
+            items, _ = query_paginated(table_name, id_value, lo, hi, limit=limit - count,
+                                       fast_decode=fast_decode, segments=segments)
+            frame = processor.process(items, fmt='frame')
+
+        frames.append(frame)
+        count += len(frame)
+        hour += HOUR_MS
+
+        if not len(frame) and hour <= end_time:
+            # Skip runs of empty hours with a single one-item probe
+            probe, _ = query_paginated(table_name, id_value, hour, end_time, limit=1, fast_decode=True)
+            if not probe:
+                break
+            next_time = int(probe[0]['time'])
+            hour = next_time - next_time % HOUR_MS
+
+    frame = SensorFrame.concat(frames)
+    next_timestamp = None
+    if len(frame) >= limit:
+        frame = frame.take(range(limit))
+        next_timestamp = int(frame.packet_times()[-1]) + 1
+    return frame, next_timestamp
+
+
+def query_timestamps_only(table_name, id_value, start_time, end_time, fast_decode=False, segments=1, limit=None):
     """
     Queries the 'id-time-index-only-keys' GSI.
     Returns a list of integer timestamps.
-    Does NOT enforce a 2048 limit (fetches all keys in range).
+    Does NOT enforce a 2048 limit (fetches all keys in range) unless 'limit' is given, in which
+    case only the first 'limit' keys are read.
+    With segments > 1 (and no limit) the range is split and the slices are queried concurrently.
     """
-    table = dynamodb.Table(table_name)
+    def fetch():
+        if segments > 1 and limit is None:
+            futures = [
+                segment_pool.submit(_collect_timestamps, _ClientTable(table_name, id_value, a, b, fast_decode),
+                                    id_value, a, b)
+                for a, b in _split_range(start_time, end_time, segments)
+            ]
+            return [ts for future in futures for ts in future.result()]
 
+        if fast_decode or segments > 1:
+            table = _ClientTable(table_name, id_value, start_time, end_time, fast_decode=True)
+        else:
+            table = dynamodb.Table(table_name)
+        return _collect_timestamps(table, id_value, start_time, end_time, limit)
+
+    # Timestamps are plain ints whatever the decode path, so fast_decode is not part of the key
+    cache_key = ('timestamps', table_name, id_value, start_time, end_time, limit)
+    return list(_cached_query(cache_key, end_time, fetch, lambda r: estimate_items_bytes([]) + 36 * len(r)))
+
+
+def _collect_timestamps(table, id_value, start_time, end_time, limit=None):
     # GSI Name provided by you
     INDEX_NAME = 'id-time-index-only-keys'
 
@@ -94,6 +402,13 @@ def query_timestamps_only(table_name, id_value, start_time, end_time):
     }
 
     while True:
+        if limit is not None:
+            # Stop the walk as soon as 'limit' keys are collected
+            needed = limit - len(timestamps)
+            if needed <= 0:
+                break
+            params['Limit'] = needed
+
         response = table.query(**params)
 
         # Extract just the time integer
@@ -105,4 +420,4 @@ def query_timestamps_only(table_name, id_value, start_time, end_time):
             break
         params['ExclusiveStartKey'] = last_key
 
-    return timestamps
\ No newline at end of file
+    return timestamps
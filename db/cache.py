@@ -0,0 +1,232 @@
+# db/cache.py
+"""
+Warm-container read-through cache for historical DynamoDB query results.
+
+Sensor packets older than a few minutes never change, so a query whose end_time is older than
+the freshness horizon always returns the same result. Lambda keeps module globals alive between
+invocations of a warm container, so an in-process LRU saves the DynamoDB round-trip for the
+windows our dashboards keep re-requesting.
+
+QueryCache is keyed on exact query parameters; IntervalCache tracks which time intervals of a
+series it holds, so overlapping (sliding) windows only fetch their missing gaps.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get('ASENSE_CACHE_MAX_MB', 128)) * 1024 * 1024)
+DEFAULT_FRESHNESS_MS = int(os.environ.get('ASENSE_CACHE_FRESHNESS_MS', 5 * 60 * 1000))
+
+# Rough per-object costs used by estimate_items_bytes (CPython, 64-bit)
+_PTR_BYTES = 8
+_SCALAR_BYTES = 64
+
+
+class QueryCache:
+    """
+    LRU over query results, capped by an estimated memory size.
+    Thread-safe: segmented and multi-topic requests query from worker threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, freshness_ms=DEFAULT_FRESHNESS_MS):
+        self.max_bytes = max_bytes
+        self.freshness_ms = freshness_ms
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    def is_cacheable(self, end_time, now_ms=None):
+        """Only ranges that ended before the freshness horizon are immutable."""
+        if self.max_bytes <= 0:
+            return False
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        return end_time < now_ms - self.freshness_ms
+
+    def record_uncacheable(self):
+        with self._lock:
+            self.uncacheable += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def estimate_items_bytes(items):
+    """
+    Cheap memory estimate for a list of deserialized items: O(attributes), not O(samples).
+    Sample lists are costed from their first element (Decimal ~104 B, float ~24 B, array('d') 8 B).
+    """
+    total = sys.getsizeof(items)
+    for item in items:
+        total += sys.getsizeof(item)
+        for value in item.values():
+            if isinstance(value, (list, tuple)):
+                element = sys.getsizeof(value[0]) if value else 0
+                total += sys.getsizeof(value) + len(value) * element
+            elif hasattr(value, 'buffer_info'):  # array('d')
+                total += sys.getsizeof(value)
+            else:
+                total += _SCALAR_BYTES + _PTR_BYTES
+    return total
+
+
+class IntervalCache:
+    """
+    Per-series (table, device, decode path) sorted list of disjoint time intervals whose packets
+    are fully known. Dashboards slide their windows, so request N+1 mostly overlaps request N:
+    keyed on exact ranges it would always miss, here only the uncovered gaps go to DynamoDB.
+
+    Segments are evicted whole, least recently used first, under the same byte cap as QueryCache.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, freshness_ms=DEFAULT_FRESHNESS_MS):
+        self.max_bytes = max_bytes
+        self.freshness_ms = freshness_ms
+        self._series = {}  # series -> sorted list of _Segment
+        self._lru = OrderedDict()  # (series, lo) -> _Segment
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def horizon(self, now_ms=None):
+        """First timestamp that may still change; None when caching is disabled."""
+        if self.max_bytes <= 0:
+            return None
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        return now_ms - self.freshness_ms
+
+    def overlapping(self, series, start_time, end_time):
+        """Snapshot of the segments intersecting [start_time, end_time], in time order."""
+        with self._lock:
+            segments = [s for s in self._series.get(series, ())
+                        if s.hi >= start_time and s.lo <= end_time]
+            for segment in segments:
+                self._lru.move_to_end((series, segment.lo))
+            self.hits += len(segments)
+            return segments
+
+    def covering(self, series, start_time, end_time):
+        """Items of [start_time, end_time] when a single segment covers all of it, else None."""
+        with self._lock:
+            for segment in self._series.get(series, ()):
+                if segment.lo <= start_time and segment.hi >= end_time:
+                    self._lru.move_to_end((series, segment.lo))
+                    return segment.between(start_time, end_time)
+        return None
+
+    def record_gap(self):
+        with self._lock:
+            self.misses += 1
+
+    def add(self, series, lo, hi, items, time_of):
+        """Records that 'items' are all the packets in [lo, hi]; merges touching segments."""
+        if hi < lo:
+            return
+        with self._lock:
+            segments = self._series.setdefault(series, [])
+            touching = [s for s in segments if s.hi >= lo - 1 and s.lo <= hi + 1]
+
+            by_time = {}
+            for segment in touching + [_Segment(lo, hi, items, time_of)]:
+                for item in segment.items:
+                    by_time.setdefault(time_of(item), item)
+            merged = _Segment(min([lo] + [s.lo for s in touching]), max([hi] + [s.hi for s in touching]),
+                              [by_time[t] for t in sorted(by_time)], time_of)
+            if merged.size > self.max_bytes:
+                return
+
+            for segment in touching:
+                self._remove(series, segment)
+            segments.append(merged)
+            segments.sort(key=lambda s: s.lo)
+            self._lru[(series, merged.lo)] = merged
+            self.current_bytes += merged.size
+
+            while self.current_bytes > self.max_bytes:
+                (evicted_series, _), segment = next(iter(self._lru.items()))
+                self._remove(evicted_series, segment)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._lru.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'segments': len(self._lru),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remove(self, series, segment):
+        self._series[series].remove(segment)
+        del self._lru[(series, segment.lo)]
+        self.current_bytes -= segment.size
+
+
+class _Segment:
+    __slots__ = ('lo', 'hi', 'items', 'times', 'size')
+
+    def __init__(self, lo, hi, items, time_of):
+        self.lo = lo
+        self.hi = hi
+        self.items = items
+        self.times = [time_of(item) for item in items]
+        self.size = estimate_items_bytes(items)
+
+    def between(self, start_time, end_time):
+        return self.items[bisect_left(self.times, start_time):bisect_right(self.times, end_time)]
@@ -0,0 +1,138 @@
+# db/calibration.py
+"""
+Per-device packet period learned by auto ODR, so that short requests start from the device's real period.
+Kept in memory and mirrored to a JSON file in /tmp; entries older than max_age_ms are ignored.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_PATH = os.environ.get('ASENSE_CALIBRATION_PATH', '/tmp/asense_calibration.json')
+DEFAULT_MAX_AGE_MS = 7 * 24 * 3600 * 1000
+MAX_ENTRIES = 10000
+# Relative period change worth an immediate write; smaller refinements wait for the timer
+SAVE_TOLERANCE = 1e-3
+SAVE_INTERVAL_MS = 60 * 1000
+
+
+class CalibrationStore:
+    """Thread-safe {(table, id): period_ms} map with a JSON mirror on disk."""
+
+    def __init__(self, path=DEFAULT_PATH, max_age_ms=DEFAULT_MAX_AGE_MS):
+        self.path = path
+        self.max_age_ms = max_age_ms
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer at a time, outside _lock
+        self._entries = None  # "table/id" -> {'period_ms', 'updated_ms'}; read lazily
+        self._dirty = False
+        self._saved_ms = 0
+        self._version = 0  # of the last snapshot taken
+        self._written = 0  # of the snapshot on disk
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.saves = 0
+
+    def get(self, table_name, id_value, now_ms=None):
+        """Learned period in ms, or None when unknown or stale."""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        with self._lock:
+            entry = self._load().get(_key(table_name, id_value))
+            if entry is None or now_ms - entry['updated_ms'] > self.max_age_ms:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['period_ms']
+
+    def update(self, table_name, id_value, period_ms, now_ms=None):
+        if period_ms is None:
+            return
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        key = _key(table_name, id_value)
+        with self._lock:
+            entries = self._load()
+            previous = entries.get(key)
+            entries[key] = {'period_ms': float(period_ms), 'updated_ms': now_ms}
+            if len(entries) > MAX_ENTRIES:
+                for old, _ in sorted(entries.items(), key=lambda e: e[1]['updated_ms'])[:len(entries) - MAX_ENTRIES]:
+                    del entries[old]
+            self.updates += 1
+            self._dirty = True
+            changed = previous is None or \
+                abs(period_ms - previous['period_ms']) > SAVE_TOLERANCE * previous['period_ms']
+            if not changed and now_ms - self._saved_ms < SAVE_INTERVAL_MS:
+                return
+            snapshot = self._snapshot(now_ms)
+        self._save(*snapshot)
+
+    def flush(self):
+        """Writes pending updates now (e.g. before the process exits)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = self._snapshot(int(time.time() * 1000))
+        self._save(*snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._dirty = False
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'devices': len(self._load()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'updates': self.updates,
+                'saves': self.saves,
+            }
+
+    # --- internals ---
+
+    def _load(self):
+        """Called with _lock held."""
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _snapshot(self, now_ms):
+        """Called with _lock held: (version, copy of the entries) for _save."""
+        self._dirty = False
+        self._saved_ms = now_ms
+        self._version += 1
+        # Entries are replaced, never mutated, so a shallow copy is consistent
+        return self._version, dict(self._entries)
+
+    def _save(self, version, entries):
+        """Called without _lock: the JSON dump and the disk write do not block get/update."""
+        staging = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with self._save_lock:
+                if version <= self._written:
+                    return  # a newer snapshot is already on disk
+                self._written = version
+                with open(staging, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(staging, self.path)
+                self.saves += 1
+        except OSError as e:
+            # The in-memory copy is enough for this container: never fail the request
+            print(f"Calibration store save failed for {self.path}: {e}")
+
+
+def _key(table_name, id_value):
+    return f"{table_name}/{id_value}"
+
+
+# Survives between invocations of a warm container (and, on disk, across processes)
+calibration_store = CalibrationStore()
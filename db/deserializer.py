@@ -0,0 +1,59 @@
+# db/deserializer.py
+"""
+Decimal-free deserializer for low-level DynamoDB client responses.
+
+boto3's resource layer runs every attribute through TypeDeserializer, which turns each number
+into a decimal.Decimal. The processors immediately convert those back with float(), so for the
+big sample lists (axyz, gxyz, fft, ain) we parse the wire strings straight into array('d').
+"""
+from array import array
+
+# Sample lists that the processors only ever read as floats
+NUMERIC_LIST_KEYS = {'axyz', 'gxyz', 'fft', 'ain'}
+
+
+def parse_number(text):
+    """DynamoDB 'N' string -> int when integral, float otherwise (no Decimal)."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def deserialize_value(value):
+    """Generic deserialization of one typed attribute value ({'N': '1'}, {'S': 'a'}, ...)."""
+    (tag, raw), = value.items()
+    if tag == 'N':
+        return parse_number(raw)
+    if tag == 'S':
+        return raw
+    if tag == 'BOOL':
+        return raw
+    if tag == 'NULL':
+        return None
+    if tag == 'L':
+        return [deserialize_value(v) for v in raw]
+    if tag == 'M':
+        return {k: deserialize_value(v) for k, v in raw.items()}
+    if tag == 'NS':
+        return {parse_number(v) for v in raw}
+    if tag == 'SS':
+        return set(raw)
+    if tag in ('B', 'BS'):
+        return raw if tag == 'B' else set(raw)
+    raise TypeError(f"Unsupported DynamoDB type: {tag}")
+
+
+def deserialize_item(item):
+    """
+    Deserializes a low-level item. Lists in NUMERIC_LIST_KEYS become array('d') directly
+    from their wire strings; everything else goes through deserialize_value.
+    """
+    result = {}
+    for key, value in item.items():
+        numbers = value.get('L') if key in NUMERIC_LIST_KEYS else None
+        if numbers is not None:
+            result[key] = array('d', [float(v['N']) for v in numbers])
+        else:
+            result[key] = deserialize_value(value)
+    return result
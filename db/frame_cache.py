@@ -0,0 +1,253 @@
+# db/frame_cache.py
+"""
+Persistent /tmp cache of decoded SensorFrames (utils/frame.py), one entry per device/topic/UTC hour:
+one memory-mapped .npy file per array, evicted LRU by total bytes on disk.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+
+from utils.frame import Block, SensorFrame, TimeGrid, np
+from db.cache import DEFAULT_FRESHNESS_MS
+
+DEFAULT_ROOT = os.environ.get('ASENSE_FRAME_CACHE_DIR', '/tmp/asense_frames')
+# Lambda's /tmp is 512 MB by default: stay well below it
+DEFAULT_MAX_BYTES = int(float(os.environ.get('ASENSE_FRAME_CACHE_MAX_MB', 256)) * 1024 * 1024)
+
+HOUR_MS = 3600 * 1000
+
+MANIFEST = 'manifest.json'
+GRID_PARTS = ('anchor', 'period', 'shift')
+
+
+class FrameDiskCache:
+    """
+    Size-capped LRU of decoded hours on local disk.
+    Thread-safe within a process; concurrent writers of the same hour are resolved by an atomic
+    rename (the first one wins, the others drop their copy).
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES, freshness_ms=DEFAULT_FRESHNESS_MS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.freshness_ms = freshness_ms
+        self._lock = threading.Lock()
+        self._index = None  # entry path -> [size_bytes, last_used]; scanned lazily
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return np is not None and self.max_bytes > 0
+
+    def is_cacheable(self, hour_ms, now_ms=None):
+        """Only hours that ended before the freshness horizon are immutable."""
+        if not self.enabled:
+            return False
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        return hour_ms + HOUR_MS <= now_ms - self.freshness_ms
+
+    def entry_path(self, table_name, id_value, hour_ms):
+        return os.path.join(self.root, _safe(table_name), _safe(id_value), str(int(hour_ms)))
+
+    def load(self, table_name, id_value, hour_ms):
+        """Memory-mapped SensorFrame for that hour, or None on a miss."""
+        path = self.entry_path(table_name, id_value, hour_ms)
+        try:
+            frame = _read_frame(path)
+        except (OSError, ValueError, KeyError):
+            frame = None
+
+        with self._lock:
+            if frame is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(path)
+        return frame
+
+    def store(self, table_name, id_value, hour_ms, frame):
+        path = self.entry_path(table_name, id_value, hour_ms)
+        staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            size = _write_frame(staging, frame)
+            if size > self.max_bytes:
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+            try:
+                os.replace(staging, path)
+            except OSError:
+                # Another worker stored the same hour first
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+        except OSError as e:
+            # A full or read-only /tmp must never fail the request
+            print(f"Frame cache store failed for {path}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            index = self._entries()
+            index[path] = [size, time.time()]
+            self.stores += 1
+            self._evict(index)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._index = {}
+
+    def stats(self):
+        with self._lock:
+            index = self._entries()
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(index),
+                'bytes': sum(size for size, _ in index.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    # --- internals (called with the lock held) ---
+
+    def _entries(self):
+        if self._index is None:
+            self._index = _scan(self.root)
+        return self._index
+
+    def _touch(self, path):
+        now = time.time()
+        entry = self._entries().get(path)
+        if entry is None:
+            entry = self._index[path] = [_dir_size(path), now]
+        entry[1] = now
+        try:
+            os.utime(os.path.join(path, MANIFEST), (now, now))
+        except OSError:
+            pass
+
+    def _evict(self, index):
+        total = sum(size for size, _ in index.values())
+        for path, (size, _) in sorted(index.items(), key=lambda e: e[1][1]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            del index[path]
+            total -= size
+            self.evictions += 1
+
+
+def _safe(name):
+    """Table name / id -> a single path component: separators are percent-encoded."""
+    name = urllib.parse.quote(str(name), safe='')
+    if not name.strip('.'):
+        # '', '.' and '..' would resolve to the parent directories; quote() never emits a bare '%'
+        return '%' + '%2E' * len(name)
+    return name
+
+
+def _dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _scan(root):
+    """Rebuilds the LRU index from the entries already on disk (e.g. left by a previous process)."""
+    index = {}
+    if not os.path.isdir(root):
+        return index
+    for table in os.scandir(root):
+        if not table.is_dir():
+            continue
+        for device in os.scandir(table.path):
+            if not device.is_dir():
+                continue
+            for entry in os.scandir(device.path):
+                manifest = os.path.join(entry.path, MANIFEST)
+                if entry.is_dir() and os.path.exists(manifest):
+                    index[entry.path] = [_dir_size(entry.path), os.path.getmtime(manifest)]
+    return index
+
+
+def _write_frame(path, frame):
+    os.makedirs(path)
+    manifest = {'fields': list(frame.packets), 'objects': {}, 'blocks': []}
+
+    for field, column in frame.packets.items():
+        if column.dtype.kind in 'iufb':
+            np.save(os.path.join(path, f"p.{field}.npy"), column)
+        else:
+            # ids / axis labels: a handful of strings per packet, kept in the manifest
+            manifest['objects'][field] = column.tolist()
+
+    for k, block in enumerate(frame.blocks):
+        spec = {'domain': block.domain, 'keys': list(block.values), 'present': block.present is not None}
+        if block.grid is not None and block.grid_offsets is None:
+            # A few numbers per packet instead of one time per sample
+            for part in GRID_PARTS:
+                np.save(os.path.join(path, f"b{k}.grid.{part}.npy"), getattr(block.grid, part))
+            spec['grid'] = block.grid.dtype.str
+        else:
+            np.save(os.path.join(path, f"b{k}.index.npy"), block.index)
+        np.save(os.path.join(path, f"b{k}.offsets.npy"), block.offsets)
+        if block.present is not None:
+            np.save(os.path.join(path, f"b{k}.present.npy"), block.present)
+        for key, values in block.values.items():
+            np.save(os.path.join(path, f"b{k}.v.{key}.npy"), values)
+        manifest['blocks'].append(spec)
+
+    # The manifest goes last: an entry without one is incomplete and never read
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, default=str)
+    return _dir_size(path)
+
+
+def _read_frame(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    def load(name):
+        try:
+            # Copy-on-write: the corrector may shift times in place without touching the file
+            return np.load(os.path.join(path, name), mmap_mode='c')
+        except ValueError:  # zero-length arrays cannot be mapped
+            return np.load(os.path.join(path, name))
+
+    packets = {}
+    for field in manifest['fields']:
+        if field in manifest['objects']:
+            values = manifest['objects'][field]
+            packets[field] = np.empty(len(values), dtype=object)
+            packets[field][:] = values
+        else:
+            packets[field] = load(f"p.{field}.npy")
+    if 'time' not in packets:
+        packets['time'] = np.zeros(0, dtype=np.int64)
+
+    blocks = []
+    for k, spec in enumerate(manifest['blocks']):
+        grid = None
+        if spec.get('grid'):
+            grid = TimeGrid(*[load(f"b{k}.grid.{part}.npy") for part in GRID_PARTS], dtype=spec['grid'])
+        blocks.append(Block(
+            spec['domain'],
+            None if grid is not None else load(f"b{k}.index.npy"),
+            {key: load(f"b{k}.v.{key}.npy") for key in spec['keys']},
+            load(f"b{k}.offsets.npy"),
+            load(f"b{k}.present.npy") if spec['present'] else None,
+            grid=grid,
+        ))
+    return SensorFrame(packets, blocks)
+
+
+# Survives between invocations of a warm container (and, on disk, across processes)
+frame_cache = FrameDiskCache()
@@ -46,6 +46,9 @@ if [ -f "$ZIP_NAME" ]; then
     echo "3. Click 'Upload from' -> '.zip file'."
     echo "4. Select '$ZIP_NAME' from this directory."
     echo "5. Ensure Runtime Settings > Handler is set to: 'lambda_function.lambda_handler'"
+    echo "6. Set the environment variable ASENSE_CURSOR_SECRET (Configuration > Environment variables)"
+    echo "   to a long random string. Without it no 'cursor' is issued and corrected topics"
+    echo "   (acc/gyr/ain) are corrected page by page when clients follow next_timestamp."
     echo "-------------------------------------------------------"
 else
     echo "❌ Error: Failed to create zip file."
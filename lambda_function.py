@@ -1,9 +1,27 @@
 import json
+import base64
 import datetime
 import traceback
-from db import access
-from processors import factory
-from utils import mergers, formatters, corrector
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from db import access, calibration
+from processors import factory, numpy_engine
+from utils import mergers, formatters, corrector, paging, batch, cursor, odr, downsample, aggregate, resample
+from utils import serializer, columnar
+
+# Multi-topic requests (table_name=acc,gyr,ain) run their topics concurrently on this pool;
+# batch requests run them inline in their device worker instead (see run_topics)
+MAX_TOPIC_WORKERS = 4
+topic_pool = ThreadPoolExecutor(max_workers=MAX_TOPIC_WORKERS, thread_name_prefix='topic')
+
+# Fleet batch requests (id=ASENSE00000001..ASENSE00000036) run their devices on this pool:
+# at most batch_concurrency devices, hence topic queries, are in flight per batch
+MAX_BATCH_WORKERS = 16
+DEFAULT_BATCH_CONCURRENCY = 8
+device_pool = ThreadPoolExecutor(max_workers=MAX_BATCH_WORKERS, thread_name_prefix='device')
+
+# Tables whose keys-only GSI query failed (see _window_times); warm-container memory
+_tables_without_index = set()
 
 
 def lambda_handler(event, context):
@@ -27,21 +45,134 @@ def lambda_handler(event, context):
     timestamps_only = str(query_params.get('timestamps_only', 'false')).lower() == 'true'
     merge_param = str(query_params.get('merge', 'true')).lower()
     merge = merge_param != 'false'
+    # merge=window:<N>m|h|d merges per UTC bucket instead of per page (per hour for fft)
+    try:
+        merge_window = mergers.parse_window(merge_param)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': cors_headers,
+            'body': json.dumps({'error': str(e)})
+        }
 
     # Feature Flag for Correction
     enable_correction_param = str(query_params.get('enable_correction', 'true')).lower()
     enable_correction = enable_correction_param != 'false'
 
+    # Feature Flag for the Decimal-free low-level DynamoDB path
+    fast_decode = str(query_params.get('fast_decode', 'false')).lower() == 'true'
+
+    # Segmented Queries: split the range into N slices queried concurrently (1 = sequential)
+    try:
+        segments = max(1, min(int(query_params.get('segments', 1)), access.MAX_SEGMENTS))
+    except (ValueError, TypeError):
+        segments = 1
+    size_from_index = str(query_params.get('size_from_index', 'false')).lower() == 'true'
+
+    # Fleet Batch: how many devices of an 'id' list/range are queried at the same time
+    try:
+        batch_concurrency = max(1, min(int(query_params.get('batch_concurrency', DEFAULT_BATCH_CONCURRENCY)),
+                                       MAX_BATCH_WORKERS))
+    except (ValueError, TypeError):
+        batch_concurrency = DEFAULT_BATCH_CONCURRENCY
+
+    # Persistent /tmp cache of decoded historical hours (frame topics with the numpy engine only)
+    disk_cache = str(query_params.get('disk_cache', 'true')).lower() != 'false'
+
     # Feature Flag for Auto ODR
     auto_odr_param = str(query_params.get('auto_odr', 'false')).lower()
     auto_odr = auto_odr_param == 'true'
 
-    # Output Format: 'map' (default), 'tuple_array', 'dict_array', 'combined_tuple', 'combined_dict'
+    # Auto ODR: follow clock drift with a rolling median over the last 'odr_window' packet deltas
+    try:
+        odr_window = max(0, min(int(query_params.get('odr_window', 0)), odr.MAX_WINDOW)) or None
+    except (ValueError, TypeError):
+        odr_window = None
+
+    # Output Format: 'map' (default), 'tuple_array', 'dict_array', 'combined_tuple', 'combined_dict',
+    # 'typed' (base64 little-endian arrays in JSON), 'typed_grid' (typed, lazy time grids sent as
+    # per-packet anchor/period/count/shift), or the binary columnar 'arrow' / 'parquet'
+    # (utils.columnar, base64 body)
     output_format = query_params.get('output_format', 'map')
-    valid_formats = ['map', 'tuple_array', 'dict_array', 'combined_tuple', 'combined_dict']
+    valid_formats = ['map', 'tuple_array', 'dict_array', 'combined_tuple', 'combined_dict',
+                     formatters.TYPED, formatters.TYPED_GRID] + columnar.FORMATS
     if output_format not in valid_formats:
         output_format = 'map'
 
+    # Chart Requests: at most 'max_points' samples per vector key and item (needs numpy)
+    try:
+        max_points = max(int(query_params['max_points']), downsample.MIN_POINTS) \
+            if 'max_points' in query_params and numpy_engine.np is not None else None
+    except (ValueError, TypeError):
+        max_points = None
+    downsample_method = query_params.get('downsample', downsample.DEFAULT_METHOD)
+    if downsample_method not in downsample.METHODS:
+        downsample_method = downsample.DEFAULT_METHOD
+
+    # Synchronized Channels: vector keys interpolated onto a uniform 'resample_hz' grid (needs numpy)
+    try:
+        resample_hz = float(query_params['resample_hz']) \
+            if 'resample_hz' in query_params and numpy_engine.np is not None else None
+    except (ValueError, TypeError):
+        resample_hz = None
+    if resample_hz is not None and not 0 < resample_hz <= resample.MAX_HZ:
+        resample_hz = None
+
+    # Aggregate Mode: per-window RMS / peak-to-peak / mean / std instead of the samples
+    aggregate_window = None
+    if query_params.get('aggregate'):
+        try:
+            aggregate_window = mergers.parse_duration(query_params['aggregate'])
+            if numpy_engine.np is None:
+                raise ValueError('aggregate requires numpy')
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': str(e)})
+            }
+
+    # Response Budget: pages are filled with as many packets as fit in 'max_bytes' of formatted output
+    try:
+        max_bytes = int(query_params.get('max_bytes', paging.DEFAULT_BUDGET_BYTES))
+    except (ValueError, TypeError):
+        max_bytes = paging.DEFAULT_BUDGET_BYTES
+
+    # Decode Engine: 'numpy' (vectorized, default when numpy is installed) or 'python'
+    engine = numpy_engine.resolve_engine(query_params.get('decode_engine', numpy_engine.DEFAULT_ENGINE))
+
+    # Cache Introspection (hit/miss counters of the warm-container page cache)
+    if topic == 'cache_stats':
+        return {
+            'statusCode': 200,
+            'headers': cors_headers,
+            'body': json.dumps({**access.page_cache.stats(), 'range_cache': access.range_cache.stats(),
+                                'frame_cache': access.frame_cache.stats(),
+                                'calibration': calibration.calibration_store.stats()})
+        }
+
+    # Continuation Cursor: resumes exactly after the last packet of the previous page
+    cursor_token = query_params.get('cursor')
+    if cursor_token:
+        try:
+            page_cursor = cursor.decode(cursor_token)
+            corrector.validate_state(page_cursor['state'])
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': str(e)})
+            }
+        if topic not in (None, page_cursor['topic']) or id_value not in (None, page_cursor['id']):
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': 'Cursor does not match table_name/id'})
+            }
+        topic, id_value = page_cursor['topic'], page_cursor['id']
+        start_time_str = str(cursor.resume_start_time(page_cursor))
+        end_time_str = str(page_cursor['end'])
+
     if not all([topic, id_value]):
         return {
             'statusCode': 400,
@@ -94,7 +225,8 @@ def lambda_handler(event, context):
                 }
 
             # Fetch using the GSI, no limit
-            ts_list = access.query_timestamps_only(table_name, id_value, start_time, end_time)
+            ts_list = access.query_timestamps_only(table_name, id_value, start_time, end_time,
+                                                   fast_decode=fast_decode, segments=segments)
             print(f"Timestamps found: {len(ts_list)}")  # DEBUG LOG
 
             return {
@@ -103,83 +235,121 @@ def lambda_handler(event, context):
                 'body': json.dumps({'timestamps': ts_list, 'count': len(ts_list)})
             }
 
-        # 5. Standard Fetch with Pagination
-        raw_items, next_timestamp = access.query_paginated(table_name, id_value, start_time, end_time)
+        topics = [t.strip() for t in topic.split(',') if t.strip()]
+        processors = {t: factory.get_processor(t) for t in topics}
+        unknown = [t for t, processor in processors.items() if not processor]
+        if unknown or not topics:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': f'Unknown topic: {topic}'})
+            }
+        if aggregate_window and any(t not in aggregate.TOPICS for t in topics):
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': f"aggregate supports {', '.join(aggregate.TOPICS)} only"})
+            }
+        if output_format in columnar.FORMATS and (columnar.pa is None or numpy_engine.np is None):
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': f"output_format={output_format} needs pyarrow and numpy"})
+            }
+        if output_format in (formatters.TYPED, formatters.TYPED_GRID) and numpy_engine.np is None:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': f"output_format={output_format} needs numpy"})
+            }
+        if output_format in columnar.FORMATS and aggregate_window:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': 'aggregate rows are only available as JSON'})
+            }
 
-        print(f"Items fetched: {len(raw_items)}")  # DEBUG LOG
+        pipeline_options = {
+            'output_format': output_format,
+            'max_bytes': max_bytes,
+            'merge': merge,
+            'merge_window': merge_window,
+            'max_points': max_points,
+            'downsample_method': downsample_method,
+            'resample_hz': resample_hz,
+            'aggregate_window': aggregate_window,
+            'enable_correction': enable_correction,
+            'auto_odr': auto_odr,
+            'odr_window': odr_window,
+            'fast_decode': fast_decode,
+            'segments': segments,
+            'size_from_index': size_from_index,
+            'engine': engine,
+            'disk_cache': disk_cache,
+            'corrector_state': page_cursor['state'] if cursor_token else None,
+        }
 
-        if not raw_items:
+        try:
+            devices = batch.parse_device_ids(id_value)
+        except ValueError as e:
             return {
-                'statusCode': 200,
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': str(e)})
+            }
+        if not devices:
+            return {
+                'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({'data': []})
+                'body': json.dumps({'error': 'Missing required parameters'})
             }
-
-        # 6. Process Data
-        processor = factory.get_processor(topic)
-        if not processor:
+        if len(devices) > batch.MAX_BATCH_DEVICES:
             return {
                 'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({'error': f'Unknown topic: {topic}'})
+                'body': json.dumps({'error': f'Too many devices: {len(devices)} (max {batch.MAX_BATCH_DEVICES})'})
+            }
+        if len(devices) > 1 and output_format in columnar.FORMATS:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': f"output_format={output_format} serves one device per request"})
             }
 
-        processed_items = processor.process(raw_items)  # use the internal format ('dict_array')
+        if len(devices) > 1:
+            # --- FLEET BATCH ROUTE ---
+            # Devices share the byte budget and run at most 'batch_concurrency' at a time, each running
+            # its topics one after another; a failing device is reported under 'errors' instead of
+            # failing the whole batch.
+            pipeline_options['max_bytes'] = max_bytes // len(devices)
+            results, errors = batch.run_bounded(
+                device_pool,
+                lambda device: run_topics(topics, processors, device, start_time, end_time, concurrent=False,
+                                          **pipeline_options),
+                devices, batch_concurrency
+            )
+            response_body = {'data': {device: data for device, (data, _, _) in results.items()}}
+            next_timestamps = {device: ts for device, (_, ts, _) in results.items() if ts}
+            if next_timestamps:
+                response_body['next_timestamp'] = next_timestamps
+            cursors = {device: token for device, (_, _, token) in results.items() if token}
+            if cursors:
+                response_body['cursor'] = cursors
+            if errors:
+                response_body['errors'] = errors
 
-        # 7. Sort (Critical for delta calculation)
-        processed_items.sort(key=lambda x: x.get('time', 0))
+            return {
+                'statusCode': 200,
+                'headers': cors_headers,
+                'body': serializer.dumps(response_body)
+            }
 
-        # 8. Correct Timestamps
-        # We apply correction ONLY to high-freq sensor data where this 1280ms packet logic applies.
-        if (enable_correction or auto_odr) and topic in ['acc', 'gyr', 'ain']:
-            print(f"--- Running Corrector (Correction: {enable_correction}, AutoODR: {auto_odr}) ---")
-            processed_items = corrector.apply_correction(
-                processed_items,
-                enable_glitch_fix=enable_correction,
-                enable_auto_odr=auto_odr
-            )
-        else:
-            print(f"--- Corrector SKIPPED (Correction: {enable_correction}, AutoODR: {auto_odr}, Topic: {topic}) ---")
+        final_list, next_timestamp, next_cursor = run_topics(topics, processors, devices[0], start_time, end_time,
+                                                             **pipeline_options)
 
-        # 9. Merge
-        if merge:
-            if topic == 'data':
-                # do not merge
-                pass
-            elif topic == 'fft':
-                processed_items = mergers.merge_fft_axes_by_hour(processed_items)
-            else:
-                if processed_items:
-                    processed_items = [mergers.merge_items_in_group(processed_items)]
-                else:
-                    processed_items = []
-                # Old function: merge by hour. No longer needed since we don't rely on seq number to calculate timestamps.
-                # The previous method required the seq number to be unique within the hour, and possibly to reset each hour.
-                # processed_items = mergers.merge_items_by_hour(processed_items)
-
-        # 10. Final Formatting (Enrich & Cleanup)
-        final_list = []
-        for item in processed_items:
-            # A. Generate Datetime String (The "Anchor")
-            # We do this BEFORE popping 'time'.
-            if 'time' in item:
-                item['datetime'] = datetime.datetime.utcfromtimestamp(item['time'] / 1000).isoformat() + 'Z'
-
-            # B. Cleanup Metadata
-            # We remove variable fields to clean up the root object, but keep 'datetime' as the human-readable anchor.
-            if topic in ['acc', 'gyr', 'ain']:
-                item.pop('time', None)
-
-            if merge:
-                # Remove fields not needed after merging
-                for field in ['seq', 'odr', 'scale']:
-                    item.pop(field, None)
-
-            # C. CONVERT FORMAT (The new step)
-            # This transforms the dict_arrays into map/tuple_array if requested
-            formatted_item = formatters.convert_item_format(item, output_format)
-
-            final_list.append(dict(sorted(formatted_item.items())))
+        if output_format in columnar.FORMATS:
+            data = final_list if isinstance(final_list, dict) else {topics[0]: final_list}
+            return _columnar_response(data, output_format, next_timestamp, next_cursor, cors_headers)
 
         # 11. Construct Response
         response_body = {
@@ -188,11 +358,13 @@ def lambda_handler(event, context):
 
         if next_timestamp:
             response_body['next_timestamp'] = next_timestamp
+        if next_cursor:
+            response_body['cursor'] = next_cursor
 
         return {
             'statusCode': 200,
             'headers': cors_headers,
-            'body': json.dumps(response_body)
+            'body': serializer.dumps(response_body)
         }
 
     except Exception as e:
@@ -202,4 +374,245 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'headers': cors_headers,
             'body': json.dumps({'error': f"Internal Server Error: {str(e)}"})
-        }
\ No newline at end of file
+        }
+
+
+def run_topics(topics, processors, id_value, start_time, end_time, max_bytes=paging.DEFAULT_BUDGET_BYTES,
+               concurrent=True, **options):
+    """
+    Runs run_topic for each topic of one device.
+    A single topic returns its (final_list, next_timestamp, cursor) as is. Several topics run
+    concurrently on topic_pool (in the calling thread when not 'concurrent'), share the byte budget,
+    and return the same triple keyed by topic
+    ({topic: final_list}, {topic: next_timestamp} or None, {topic: cursor} or None).
+    """
+    if len(topics) == 1:
+        return run_topic(topics[0], processors[topics[0]], id_value, start_time, end_time,
+                         max_bytes=max_bytes, **options)
+
+    if concurrent:
+        futures = {
+            t: topic_pool.submit(run_topic, t, processors[t], id_value, start_time, end_time,
+                                 max_bytes=max_bytes // len(topics), **options)
+            for t in topics
+        }
+        results = {t: future.result() for t, future in futures.items()}
+    else:
+        results = {t: run_topic(t, processors[t], id_value, start_time, end_time,
+                                max_bytes=max_bytes // len(topics), **options)
+                   for t in topics}
+
+    data, next_timestamps, cursors = {}, {}, {}
+    for t, result in results.items():
+        data[t], next_timestamp, next_cursor = result
+        if next_timestamp:
+            next_timestamps[t] = next_timestamp
+        if next_cursor:
+            cursors[t] = next_cursor
+    return data, next_timestamps or None, cursors or None
+
+
+def run_topic(topic, processor, id_value, start_time, end_time, output_format='map',
+              max_bytes=paging.DEFAULT_BUDGET_BYTES, merge=True, merge_window=None, max_points=None,
+              downsample_method=downsample.DEFAULT_METHOD, resample_hz=None, aggregate_window=None,
+              enable_correction=True, auto_odr=False, odr_window=None, fast_decode=False, segments=1,
+              size_from_index=False, engine='python', disk_cache=True, corrector_state=None):
+    """
+    Fetch -> process -> sort -> correct -> merge -> format for one topic.
+    merge_window (ms) replaces the default merge (whole page, hourly for fft) by UTC buckets.
+    resample_hz interpolates the vibration channels onto a uniform grid (utils.resample).
+    aggregate_window (ms) returns per-window statistics rows instead of the samples (utils.aggregate).
+    Returns (final_list, next_timestamp_or_none, cursor_or_none).
+    corrector_state comes from the previous page's cursor (see corrector.StreamingCorrector).
+    """
+    # Internal format: columnar 'frame' for the high-frequency topics with the numpy engine,
+    # 'dict_array' otherwise. Both flow through the same corrector/merger calls below.
+    use_frame = engine == 'numpy' and topic in factory.FRAME_TOPICS
+    # Binary outputs are encoded from (index, values) arrays by the handler (utils.columnar)
+    item_format = formatters.COLUMNS if output_format in columnar.FORMATS else output_format
+
+    # We apply correction ONLY to high-freq sensor data where this 1280ms packet logic applies.
+    correct = (enable_correction or auto_odr) and topic in ['acc', 'gyr', 'ain']
+
+    # 5. Standard Fetch with Pagination (page size derived from the byte budget)
+    limit = paging.packets_for_budget(topic, output_format, max_bytes)
+    if aggregate_window and use_frame:
+        # The response is a few rows per window: the page is only bounded by the columnar memory
+        limit = paging.MAX_PAGE_PACKETS
+    table_name = f"asense_table_{topic}"
+    # The streaming corrector decides the page's last packet with one packet of lookahead, whose
+    # state only carries over through a cursor (ASENSE_CURSOR_SECRET)
+    fetch_limit = limit + 1 if correct and cursor.enabled() else limit
+    from_frame_cache = use_frame and disk_cache
+    if from_frame_cache:
+        # Fetch + Process in one go: historical hours come already decoded from the /tmp frame cache
+        processed_items, next_timestamp = access.query_hourly_frames(table_name, id_value, start_time,
+                                                                     end_time, fetch_limit, processor,
+                                                                     fast_decode=fast_decode,
+                                                                     segments=segments)
+        print(f"Items fetched: {len(processed_items)}")  # DEBUG LOG
+        fetched = len(processed_items)
+    else:
+        raw_items, next_timestamp = access.query_paginated(table_name, id_value, start_time, end_time,
+                                                           limit=fetch_limit, fast_decode=fast_decode,
+                                                           segments=segments, size_from_index=size_from_index)
+        print(f"Items fetched: {len(raw_items)}")  # DEBUG LOG
+        fetched = len(raw_items)
+
+    if not fetched:
+        return [], None, None
+
+    # 6. Process Data
+    if not from_frame_cache:
+        processed_items = processor.process(raw_items, fmt='frame' if use_frame else 'dict_array',
+                                            engine=engine)
+
+    # 7. Sort (Critical for delta calculation)
+    if use_frame:
+        processed_items = processed_items.sorted()
+    else:
+        processed_items.sort(key=lambda x: x.get('time', 0))
+
+    # Original time of every packet fetched (the corrector may shift them)
+    packet_times = processed_items.packet_times().tolist() if use_frame else [x['time'] for x in processed_items]
+
+    # 8. Correct Timestamps
+    corrector_stream = None
+    if correct:
+        print(f"--- Running Corrector (Correction: {enable_correction}, AutoODR: {auto_odr}) ---")
+        # Streaming: the extra packet fetched beyond 'limit' is only used as lookahead, and the
+        # carried state makes consecutive pages match a single unpaged correction.
+        lookahead = fetched > limit
+        if lookahead:
+            packet_times = packet_times[:-1]
+            next_timestamp = int(packet_times[-1]) + 1
+        # Period learned for this device by earlier requests: better than 1280ms on short pages
+        calibrated_delta = calibration.calibration_store.get(table_name, id_value) if auto_odr else None
+        corrector_stream = corrector.StreamingCorrector(enable_correction, auto_odr, corrector_state,
+                                                        odr_window=odr_window, calibrated_delta=calibrated_delta)
+        processed_items = corrector_stream.correct(
+            processed_items, lookahead=lookahead,
+            window_times=lambda: _window_times(table_name, id_value, start_time, end_time)
+        )
+        calibration.calibration_store.update(table_name, id_value, corrector_stream.learned_delta())
+    else:
+        print(f"--- Corrector SKIPPED (Correction: {enable_correction}, AutoODR: {auto_odr}, Topic: {topic}) ---")
+
+    # Primary key of the last packet returned: the ExclusiveStartKey of the next page
+    next_cursor = None
+    if next_timestamp and cursor.enabled():
+        next_cursor = cursor.encode(topic, id_value, packet_times[-1], end_time,
+                                    state=corrector_stream.state() if corrector_stream else None)
+
+    # 8b. Aggregate: the statistics replace merge, downsampling and formatting
+    if aggregate_window:
+        rows = aggregate.aggregate(processed_items, aggregate_window, topic)
+        for row in rows:
+            row['datetime'] = datetime.datetime.utcfromtimestamp(row['time'] / 1000).isoformat() + 'Z'
+        return rows, next_timestamp, next_cursor
+
+    # 9. Merge
+    if merge:
+        if topic == 'data':
+            # do not merge
+            pass
+        elif merge_window:
+            # One item per UTC bucket. A bucket cut by the page boundary continues on the next page.
+            if topic == 'fft':
+                processed_items = mergers.merge_fft_axes_by_window(processed_items, merge_window)
+            else:
+                processed_items = mergers.merge_items_by_window(processed_items, merge_window)
+        elif topic == 'fft':
+            processed_items = mergers.merge_fft_axes_by_hour(processed_items)
+        else:
+            if use_frame:
+                processed_items = mergers.merge_items_in_group(processed_items)
+            elif processed_items:
+                processed_items = [mergers.merge_items_in_group(processed_items)]
+            else:
+                processed_items = []
+            # Old function: merge by hour. No longer needed since we don't rely on seq number to calculate timestamps.
+            # The previous method required the seq number to be unique within the hour, and possibly to reset each hour.
+            # processed_items = mergers.merge_items_by_hour(processed_items)
+
+    # 9a. Resample: every acc/gyr/ain channel on the same epoch-anchored grid, aligned by timestamp
+    if resample_hz and topic in ['acc', 'gyr', 'ain']:
+        if use_frame:
+            processed_items = resample.resample_frame(processed_items, resample_hz)
+        else:
+            resample.resample_items(processed_items, resample_hz)
+
+    # 9b. Downsample: after correction and merge, so the kept samples carry the final timestamps
+    if max_points and topic != 'data':
+        if use_frame:
+            processed_items = downsample.downsample_frame(processed_items, max_points, downsample_method)
+        else:
+            downsample.downsample_items(processed_items, max_points, downsample_method)
+
+    # 10. Final Formatting (Enrich & Cleanup)
+    if use_frame:
+        # The edge of the columnar pipeline: vectors come out already in output_format
+        processed_items = formatters.convert_frame(processed_items, item_format)
+
+    final_list = []
+    for item in processed_items:
+        # A. Generate Datetime String (The "Anchor")
+        # We do this BEFORE popping 'time'.
+        if 'time' in item:
+            item['datetime'] = datetime.datetime.utcfromtimestamp(item['time'] / 1000).isoformat() + 'Z'
+
+        # B. Cleanup Metadata
+        # We remove variable fields to clean up the root object, but keep 'datetime' as the human-readable anchor.
+        if topic in ['acc', 'gyr', 'ain']:
+            item.pop('time', None)
+
+        if merge:
+            # Remove fields not needed after merging
+            for field in ['seq', 'odr', 'scale']:
+                item.pop(field, None)
+
+        # C. CONVERT FORMAT (The new step)
+        # This transforms the dict_arrays into map/tuple_array if requested
+        formatted_item = item if use_frame else formatters.convert_item_format(item, item_format)
+
+        final_list.append(dict(sorted(formatted_item.items())))
+
+    return final_list, next_timestamp, next_cursor
+
+
+def _columnar_response(data, output_format, next_timestamp, next_cursor, cors_headers):
+    """
+    Arrow / Parquet page as a base64 body (API Gateway decodes it for binary media types).
+    The paging fields are in the schema metadata and in the X-Next-Timestamp / X-Cursor headers.
+    """
+    paging_fields = {'next_timestamp': next_timestamp} if next_timestamp else {}
+    if next_cursor:
+        paging_fields['cursor'] = next_cursor
+    payload = columnar.encode(columnar.to_table(data, paging_fields), output_format)
+    headers = {**cors_headers, 'Content-Type': columnar.CONTENT_TYPES[output_format],
+               'Access-Control-Expose-Headers': 'X-Next-Timestamp,X-Cursor'}
+    if next_timestamp:
+        # Multi-topic pages have one value per topic: JSON objects
+        headers['X-Next-Timestamp'] = serializer.dumps(next_timestamp)
+    if next_cursor:
+        headers['X-Cursor'] = next_cursor if isinstance(next_cursor, str) else serializer.dumps(next_cursor)
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'isBase64Encoded': True,
+        'body': base64.b64encode(payload).decode()
+    }
+
+
+def _window_times(table_name, id_value, start_time, end_time):
+    """First corrector.SEED_PACKETS packet times of the window from the keys-only GSI, or None."""
+    if table_name in _tables_without_index:
+        return None
+    try:
+        return access.query_timestamps_only(table_name, id_value, start_time, end_time, fast_decode=True,
+                                            limit=corrector.SEED_PACKETS)
+    except ClientError as e:
+        # Not every table has the index: do not pay the failing round-trip on every first page
+        _tables_without_index.add(table_name)
+        print(f"Window timestamps unavailable for {table_name}: {e}")  # DEBUG LOG
+        return None
@@ -1,12 +1,15 @@
 import math
 from utils.formatters import DataBuilder
+from processors import numpy_engine
+from utils.frame import FrameBuilder, PacketGrid
 
 
-def process(raw_items, fmt='dict_array'):
+def process(raw_items, fmt='dict_array', engine='python'):
+    # fmt='frame' returns a columnar SensorFrame (always decoded with the numpy engine)
+    frame = FrameBuilder() if fmt == 'frame' else None
     processed_list = []
 
     for event in raw_items:
-        axyz = [float(x) for x in event['axyz']]
         scale = float(event['scale'])
         odr = float(event['odr'])
         # Current assumption: event['time'] is the timestamp of the LAST sample in this packet
@@ -21,9 +24,6 @@ def process(raw_items, fmt='dict_array'):
         w_s = float(event.get('w_s', 0)) * 0.01
         w_d = float(event.get('w_d', 0)) * 360 / 16
 
-        # 3 axes, so length is total / 3
-        message_length = math.floor(len(axyz) / 3)
-
         item = {
             'id': client_id,
             'time': end_time_ms,
@@ -32,6 +32,24 @@ def process(raw_items, fmt='dict_array'):
             'seq': seq
         }
 
+        factor = scale * math.pow(2, -15)
+
+        # Calculate sample period in milliseconds
+        # ODR is in Hz (samples per second). 1000 / ODR = ms per sample.
+        if odr > 0:
+            period_ms = 1000.0 / odr
+        else:
+            period_ms = 0
+
+        if frame is not None:
+            samples = numpy_engine.decode_samples(event['axyz'], 3, factor)
+            times = PacketGrid(end_time_ms, period_ms, len(samples))
+            frame.add_packet(item, [
+                ('time', PacketGrid(end_time_ms, 0, 1), {'tamb': [tamb], 'w_s': [w_s], 'w_d': [w_d]}),
+                ('time', times, {'acc_x': samples[:, 0], 'acc_y': samples[:, 1], 'acc_z': samples[:, 2]}),
+            ])
+            continue
+
         # 1. Build Temp/Wind (Scalar)
         # These are recorded at the time of the packet (end_time)
         b_tamb = DataBuilder(fmt, 'time', 'val', 5)
@@ -51,27 +69,31 @@ def process(raw_items, fmt='dict_array'):
         b_y = DataBuilder(fmt, 'time', 'val', 5)
         b_z = DataBuilder(fmt, 'time', 'val', 5)
 
-        factor = scale * math.pow(2, -15)
-
-        # Calculate sample period in milliseconds
-        # ODR is in Hz (samples per second). 1000 / ODR = ms per sample.
-        if odr > 0:
-            period_ms = 1000.0 / odr
+        if engine == 'numpy':
+            # Whole packet at once: (N, 3) samples and one arange for the time grid
+            times, samples = numpy_engine.decode_interleaved(event['axyz'], 3, end_time_ms, period_ms, factor)
+            times = times.tolist()
+            b_x.extend(times, samples[:, 0].tolist())
+            b_y.extend(times, samples[:, 1].tolist())
+            b_z.extend(times, samples[:, 2].tolist())
         else:
-            period_ms = 0
+            axyz = [float(x) for x in event['axyz']]
+
+            # 3 axes, so length is total / 3
+            message_length = math.floor(len(axyz) / 3)
 
-        for i in range(message_length):
-            # i=0 is the oldest sample in this packet
-            # i=(message_length-1) is the newest sample (at end_time_ms)
+            for i in range(message_length):
+                # i=0 is the oldest sample in this packet
+                # i=(message_length-1) is the newest sample (at end_time_ms)
 
-            # Number of steps back from the end
-            steps_back = (message_length - 1) - i
+                # Number of steps back from the end
+                steps_back = (message_length - 1) - i
 
-            t = end_time_ms - (steps_back * period_ms)
+                t = end_time_ms - (steps_back * period_ms)
 
-            b_x.add(t, axyz[i * 3] * factor)
-            b_y.add(t, axyz[i * 3 + 1] * factor)
-            b_z.add(t, axyz[i * 3 + 2] * factor)
+                b_x.add(t, axyz[i * 3] * factor)
+                b_y.add(t, axyz[i * 3 + 1] * factor)
+                b_z.add(t, axyz[i * 3 + 2] * factor)
 
         item['acc_x'] = b_x.get_result()
         item['acc_y'] = b_y.get_result()
@@ -79,4 +101,6 @@ def process(raw_items, fmt='dict_array'):
 
         processed_list.append(item)
 
+    if frame is not None:
+        return frame.build()
     return processed_list
\ No newline at end of file
@@ -1,12 +1,15 @@
 import math
 from utils.formatters import DataBuilder
+from processors import numpy_engine
+from utils.frame import FrameBuilder, PacketGrid
 
 
-def process(raw_items, fmt='dict_array'):
+def process(raw_items, fmt='dict_array', engine='python'):
+    # fmt='frame' returns a columnar SensorFrame (always decoded with the numpy engine)
+    frame = FrameBuilder() if fmt == 'frame' else None
     processed_list = []
 
     for event in raw_items:
-        ain = [float(x) for x in event.get('ain', [])]
         scale = float(event.get('scale', 1))
         odr = float(event.get('odr', 1))
         # Current assumption: event['time'] is the timestamp of the LAST sample in this packet
@@ -14,8 +17,6 @@ def process(raw_items, fmt='dict_array'):
         client_id = event['id']
         seq = int(event.get('seq', 1))
 
-        message_length = math.floor(len(ain) / 2)
-
         item = {
             'id': client_id,
             'time': end_time_ms,
@@ -24,24 +25,43 @@ def process(raw_items, fmt='dict_array'):
             'seq': seq
         }
 
-        b_a = DataBuilder(fmt, 'time', 'val', 5)
-        b_b = DataBuilder(fmt, 'time', 'val', 5)
-
         if odr > 0:
             period_ms = 1000.0 / odr
         else:
             period_ms = 0
 
-        for i in range(message_length):
-            steps_back = (message_length - 1) - i
-            t = end_time_ms - (steps_back * period_ms)
+        if frame is not None:
+            samples = numpy_engine.decode_samples(event.get('ain', []), 2, scale)
+            times = PacketGrid(end_time_ms, period_ms, len(samples))
+            frame.add_packet(item, [
+                ('time', times, {'ain_a': samples[:, 0], 'ain_b': samples[:, 1]}),
+            ])
+            continue
+
+        b_a = DataBuilder(fmt, 'time', 'val', 5)
+        b_b = DataBuilder(fmt, 'time', 'val', 5)
+
+        if engine == 'numpy':
+            times, samples = numpy_engine.decode_interleaved(event.get('ain', []), 2, end_time_ms, period_ms, scale)
+            times = times.tolist()
+            b_a.extend(times, samples[:, 0].tolist())
+            b_b.extend(times, samples[:, 1].tolist())
+        else:
+            ain = [float(x) for x in event.get('ain', [])]
+            message_length = math.floor(len(ain) / 2)
+
+            for i in range(message_length):
+                steps_back = (message_length - 1) - i
+                t = end_time_ms - (steps_back * period_ms)
 
-            b_a.add(t, ain[i * 2] * scale)
-            b_b.add(t, ain[i * 2 + 1] * scale)
+                b_a.add(t, ain[i * 2] * scale)
+                b_b.add(t, ain[i * 2 + 1] * scale)
 
         item['ain_a'] = b_a.get_result()
         item['ain_b'] = b_b.get_result()
 
         processed_list.append(item)
 
+    if frame is not None:
+        return frame.build()
     return processed_list
\ No newline at end of file
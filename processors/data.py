@@ -4,7 +4,8 @@ from datetime import datetime, timezone
 from utils.formatters import DataBuilder
 
 
-def process(raw_items, fmt='dict_array'):
+def process(raw_items, fmt='dict_array', engine='python'):
+    # 'engine' is accepted for a uniform processor signature; data packets are scalar-only.
     processed_list = []
 
     for event in raw_items:
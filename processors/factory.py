@@ -1,5 +1,9 @@
 from processors import acc, gyr, ain, fft, data
 
+# Topics whose processors can emit a columnar SensorFrame (fmt='frame')
+FRAME_TOPICS = ['acc', 'gyr', 'ain', 'fft']
+
+
 def get_processor(topic):
     if topic == 'acc': return acc
     if topic == 'gyr': return gyr
@@ -1,20 +1,21 @@
 import math
 from utils.formatters import DataBuilder
+from processors import numpy_engine
+from utils.frame import FrameBuilder
 
 
-def process(raw_items, fmt='dict_array'):
+def process(raw_items, fmt='dict_array', engine='python'):
+    # fmt='frame' returns a columnar SensorFrame (always decoded with the numpy engine)
+    frame = FrameBuilder() if fmt == 'frame' else None
     processed_list = []
 
     for event in raw_items:
-        fft_vals = [float(x) for x in event['fft']]
         scale = float(event['scale'])
         odr = float(event['odr'])
         axis = str(event['axis'])
         time = int(event['time'])
         client_id = event['id']
 
-        message_length = math.floor(len(fft_vals))
-
         item = {
             'id': client_id,
             'time': time,
@@ -23,16 +24,31 @@ def process(raw_items, fmt='dict_array'):
             'axis': axis
         }
 
+        factor = scale * math.pow(2, -15)
+
+        if frame is not None:
+            freqs, amplitudes = numpy_engine.decode_spectrum(event['fft'], factor)
+            frame.add_packet(item, [('freq', freqs, {'fft': amplitudes})])
+            continue
+
         # Using 'freq' as label for dict_array
         b_fft = DataBuilder(fmt, 'freq', 'val', 3)
-        factor = scale * math.pow(2, -15)
 
-        for i in range(message_length):
-            fft_frequency = i / 1024 * 50
-            amplitude = fft_vals[i] * factor
-            b_fft.add(fft_frequency, amplitude)
+        if engine == 'numpy':
+            freqs, amplitudes = numpy_engine.decode_spectrum(event['fft'], factor)
+            b_fft.extend(freqs.tolist(), amplitudes.tolist())
+        else:
+            fft_vals = [float(x) for x in event['fft']]
+            message_length = math.floor(len(fft_vals))
+
+            for i in range(message_length):
+                fft_frequency = i / 1024 * 50
+                amplitude = fft_vals[i] * factor
+                b_fft.add(fft_frequency, amplitude)
 
         item['fft'] = b_fft.get_result()
         processed_list.append(item)
 
+    if frame is not None:
+        return frame.build()
     return processed_list
\ No newline at end of file
@@ -1,12 +1,15 @@
 import math
 from utils.formatters import DataBuilder
+from processors import numpy_engine
+from utils.frame import FrameBuilder, PacketGrid
 
 
-def process(raw_items, fmt='dict_array'):
+def process(raw_items, fmt='dict_array', engine='python'):
+    # fmt='frame' returns a columnar SensorFrame (always decoded with the numpy engine)
+    frame = FrameBuilder() if fmt == 'frame' else None
     processed_list = []
 
     for event in raw_items:
-        gxyz = [float(x) for x in event['gxyz']]
         scale_raw = int(event['scale'])
         odr = float(event['odr'])
         # Current assumption: event['time'] is the timestamp of the LAST sample in this packet
@@ -22,8 +25,6 @@ def process(raw_items, fmt='dict_array'):
         elif scale_raw == 31:
             scale = 2000 / math.pow(2, 6)
 
-        message_length = math.floor(len(gxyz) / 3)
-
         item = {
             'id': client_id,
             'time': end_time_ms,
@@ -32,10 +33,6 @@ def process(raw_items, fmt='dict_array'):
             'seq': seq
         }
 
-        b_x = DataBuilder(fmt, 'time', 'val', 5)
-        b_y = DataBuilder(fmt, 'time', 'val', 5)
-        b_z = DataBuilder(fmt, 'time', 'val', 5)
-
         factor = scale * math.pow(2, -15)
 
         if odr > 0:
@@ -43,13 +40,35 @@ def process(raw_items, fmt='dict_array'):
         else:
             period_ms = 0
 
-        for i in range(message_length):
-            steps_back = (message_length - 1) - i
-            t = end_time_ms - (steps_back * period_ms)
+        if frame is not None:
+            samples = numpy_engine.decode_samples(event['gxyz'], 3, factor)
+            times = PacketGrid(end_time_ms, period_ms, len(samples))
+            frame.add_packet(item, [
+                ('time', times, {'gyr_x': samples[:, 0], 'gyr_y': samples[:, 1], 'gyr_z': samples[:, 2]}),
+            ])
+            continue
+
+        b_x = DataBuilder(fmt, 'time', 'val', 5)
+        b_y = DataBuilder(fmt, 'time', 'val', 5)
+        b_z = DataBuilder(fmt, 'time', 'val', 5)
+
+        if engine == 'numpy':
+            times, samples = numpy_engine.decode_interleaved(event['gxyz'], 3, end_time_ms, period_ms, factor)
+            times = times.tolist()
+            b_x.extend(times, samples[:, 0].tolist())
+            b_y.extend(times, samples[:, 1].tolist())
+            b_z.extend(times, samples[:, 2].tolist())
+        else:
+            gxyz = [float(x) for x in event['gxyz']]
+            message_length = math.floor(len(gxyz) / 3)
+
+            for i in range(message_length):
+                steps_back = (message_length - 1) - i
+                t = end_time_ms - (steps_back * period_ms)
 
-            b_x.add(t, gxyz[i * 3] * factor)
-            b_y.add(t, gxyz[i * 3 + 1] * factor)
-            b_z.add(t, gxyz[i * 3 + 2] * factor)
+                b_x.add(t, gxyz[i * 3] * factor)
+                b_y.add(t, gxyz[i * 3 + 1] * factor)
+                b_z.add(t, gxyz[i * 3 + 2] * factor)
 
         item['gyr_x'] = b_x.get_result()
         item['gyr_y'] = b_y.get_result()
@@ -57,4 +76,6 @@ def process(raw_items, fmt='dict_array'):
 
         processed_list.append(item)
 
+    if frame is not None:
+        return frame.build()
     return processed_list
\ No newline at end of file
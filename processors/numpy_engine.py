@@ -0,0 +1,64 @@
+# processors/numpy_engine.py
+"""
+Vectorized decode engine for the interleaved high-frequency packets (acc/gyr/ain).
+
+A packet stores its samples interleaved ([x0, y0, z0, x1, y1, z1, ...]). Instead of walking
+the list sample-by-sample, we reshape it once into an (N, axes) array and build the whole
+time grid with a single arange. Results are bit-identical to the pure-python loops.
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy is optional: the pure-python processors keep working without it
+    np = None
+
+ENGINES = ['python', 'numpy']
+DEFAULT_ENGINE = 'numpy' if np is not None else 'python'
+
+
+def resolve_engine(engine):
+    """Returns a usable engine name, falling back to 'python' when numpy is unavailable."""
+    if engine not in ENGINES:
+        return DEFAULT_ENGINE
+    if engine == 'numpy' and np is None:
+        return 'python'
+    return engine
+
+
+def time_grid(end_time_ms, period_ms, count):
+    """
+    Sample times of a packet whose LAST sample is at end_time_ms.
+    Same arithmetic as the processors: end_time_ms - steps_back * period_ms.
+    """
+    if not period_ms:
+        # Zero period: every sample sits on the anchor (keeps the int type, like the python loop)
+        return np.full(count, end_time_ms, dtype=np.int64)
+    steps_back = np.arange(count - 1, -1, -1, dtype=np.float64)
+    return end_time_ms - steps_back * period_ms
+
+
+def decode_interleaved(values, axes, end_time_ms, period_ms, factor):
+    """
+    Converts a packet's interleaved sample list into (times, samples).
+    :param values: flat list/array of raw samples (Decimal, int or float)
+    :param axes: number of interleaved axes (3 for axyz/gxyz, 2 for ain)
+    :return: times with shape (N,), samples with shape (N, axes), already multiplied by factor
+    """
+    samples = decode_samples(values, axes, factor)
+    return time_grid(end_time_ms, period_ms, len(samples)), samples
+
+
+def decode_samples(values, axes, factor):
+    """Samples only, shape (N, axes): the frame path keeps the time grid lazy (utils.frame.PacketGrid)."""
+    raw = np.asarray(values, dtype=np.float64)
+    count = len(raw) // axes
+    return raw[:count * axes].reshape(count, axes) * factor
+
+
+def decode_spectrum(values, factor):
+    """
+    Converts an FFT packet into (freqs, amplitudes).
+    Bin i sits at i / 1024 * 50 Hz, exactly as in processors/fft.py.
+    """
+    amplitudes = np.asarray(values, dtype=np.float64) * factor
+    freqs = np.arange(len(amplitudes), dtype=np.float64) / 1024 * 50
+    return freqs, amplitudes
@@ -0,0 +1,80 @@
+# tests/bench_deserializer.py
+"""
+Benchmark: boto3 resource-style deserialization (TypeDeserializer -> Decimal -> float)
+versus the low-level client + db.deserializer fast path (wire strings -> array('d')).
+
+Runs offline on synthetic wire-format pages (32 packets, like query_paginated's default limit).
+Usage: python tests/bench_deserializer.py
+"""
+import os
+import sys
+import random
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boto3.dynamodb.types import TypeDeserializer
+from db.deserializer import deserialize_item
+from processors import factory, numpy_engine
+
+PAGE_SIZE = 32
+REPEAT = 5
+
+# topic -> (sample list key, values per packet, extra scalar attributes)
+TOPIC_SHAPES = {
+    'acc': ('axyz', 64 * 3, {'tamb': '2500', 'w_s': '1000', 'w_d': '8'}),
+    'gyr': ('gxyz', 64 * 3, {}),
+    'ain': ('ain', 64 * 2, {}),
+    'fft': ('fft', 1024, {'axis': '0'}),
+}
+
+
+def _wire_packet(time_val, values_key, n_values, extra):
+    rnd = random.Random(time_val)
+    item = {
+        'id': {'S': 'ASENSE00000022'},
+        'time': {'N': str(time_val)},
+        'odr': {'N': '50'},
+        'scale': {'N': '2'},
+        'seq': {'N': '1'},
+        values_key: {'L': [{'N': str(rnd.randint(-32768, 32767))} for _ in range(n_values)]},
+    }
+    for k, v in extra.items():
+        item[k] = {'S': v} if k == 'axis' else {'N': v}
+    return item
+
+
+def _resource_decode(page, deserializer=TypeDeserializer()):
+    return [deserializer.deserialize({'M': item}) for item in page]
+
+
+def _fast_decode(page):
+    return [deserialize_item(item) for item in page]
+
+
+def _best(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def main():
+    engine = numpy_engine.DEFAULT_ENGINE
+    print(f"Page: {PAGE_SIZE} packets | best of {REPEAT} | processor engine: {engine}\n")
+    print(f"| {'Topic':<5} | {'Decode (Decimal)':>17} | {'Decode (fast)':>14} | {'Speedup':>8} "
+          f"| {'+Process (Decimal)':>19} | {'+Process (fast)':>16} | {'Speedup':>8} |")
+    print(f"|{'-' * 7}|{'-' * 19}|{'-' * 16}|{'-' * 10}|{'-' * 21}|{'-' * 18}|{'-' * 10}|")
+
+    for topic, (values_key, n_values, extra) in TOPIC_SHAPES.items():
+        page = [_wire_packet(1700000000000 + i * 1280, values_key, n_values, extra) for i in range(PAGE_SIZE)]
+        processor = factory.get_processor(topic)
+
+        decode_slow = _best(lambda: _resource_decode(page))
+        decode_fast = _best(lambda: _fast_decode(page))
+        total_slow = _best(lambda: processor.process(_resource_decode(page), engine=engine))
+        total_fast = _best(lambda: processor.process(_fast_decode(page), engine=engine))
+
+        print(f"| {topic:<5} | {decode_slow:>14.2f} ms | {decode_fast:>11.2f} ms | {decode_slow / decode_fast:>7.1f}x "
+              f"| {total_slow:>16.2f} ms | {total_fast:>13.2f} ms | {total_slow / total_fast:>7.1f}x |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# tests/bench_mergers.py
+"""
+Benchmark: merge_items_in_group on growing slices of a synthetic day of acc packets
+(one packet every 1280 ms, 64 samples per axis), against the previous 'current + value' merger.
+
+The previous merger copies the accumulated vectors on every packet (quadratic), so it only runs
+up to MAX_QUADRATIC_HOURS. The time per sample of the current merger should stay flat.
+Usage: python tests/bench_mergers.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import mergers
+from utils.frame import FrameBuilder, PacketGrid, np
+
+PACKET_MS = 1280
+SAMPLES = 64
+DAY_PACKETS = 24 * 3600 * 1000 // PACKET_MS
+HOURS = [0.25, 1, 3, 6, 12, 24]
+MAX_QUADRATIC_HOURS = 1
+REPEAT = 3
+
+
+def _quadratic_merge(group):
+    """merge_items_in_group before the chunked merger (kept as the reference)."""
+    merged_item = group[0].copy()
+    for item in group[1:]:
+        for key, value in item.items():
+            if key == 'time':
+                continue
+            current_val = merged_item.get(key)
+            if isinstance(value, list) and isinstance(current_val, list):
+                merged_item[key] = current_val + value
+            elif key not in merged_item:
+                merged_item[key] = value
+    return merged_item
+
+
+def _acc_items(n_packets):
+    """Processed 'dict_array' acc items. Samples are shared dicts: only the list sizes matter here."""
+    sample = {'time': 0, 'val': 0.0}
+    items = []
+    for p in range(n_packets):
+        t = 1700000000000 + p * PACKET_MS
+        item = {'id': 'ASENSE00000022', 'time': t, 'scale': 2.0, 'odr': 50.0, 'seq': 1}
+        for key in ['tamb', 'w_s', 'w_d']:
+            item[key] = [sample]
+        for key in ['acc_x', 'acc_y', 'acc_z']:
+            item[key] = [sample] * SAMPLES
+        items.append(item)
+    return items
+
+
+def _acc_frame(n_packets):
+    builder = FrameBuilder()
+    values = np.zeros(SAMPLES)
+    for p in range(n_packets):
+        t = 1700000000000 + p * PACKET_MS
+        builder.add_packet({'id': 'ASENSE00000022', 'time': t, 'scale': 2.0, 'odr': 50.0, 'seq': 1}, [
+            ('time', PacketGrid(t, 0, 1), {'tamb': [0.0], 'w_s': [0.0], 'w_d': [0.0]}),
+            ('time', PacketGrid(t, 20.0, SAMPLES), {'acc_x': values, 'acc_y': values, 'acc_z': values}),
+        ])
+    return builder.build()
+
+
+def _best(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def main():
+    print(f"Synthetic day: {DAY_PACKETS} packets x {SAMPLES} samples | best of {REPEAT}\n")
+    print(f"| {'Hours':>5} | {'Packets':>7} | {'Quadratic':>11} | {'Chunked':>9} | {'ns/sample':>9} "
+          f"| {'Frame (+index)':>14} |")
+    print(f"|{'-' * 7}|{'-' * 9}|{'-' * 13}|{'-' * 11}|{'-' * 11}|{'-' * 16}|")
+
+    for hours in HOURS:
+        n_packets = int(DAY_PACKETS * hours / 24)
+        items = _acc_items(n_packets)
+        samples = n_packets * SAMPLES * 3
+
+        quadratic = f"{_best(lambda: _quadratic_merge(items)):>8.1f} ms" if hours <= MAX_QUADRATIC_HOURS else f"{'-':>11}"
+        chunked = _best(lambda: mergers.merge_items_in_group(items))
+
+        frame_ms = f"{'-':>14}"
+        if np is not None:
+            frame = _acc_frame(n_packets)
+            # merged() is O(blocks); reading the index materializes the lazy time grid
+            frame_ms = f"{_best(lambda: [b.index for b in frame.take(np.arange(n_packets)).merged().blocks]):>11.1f} ms"
+
+        print(f"| {hours:>5} | {n_packets:>7} | {quadratic} | {chunked:>6.1f} ms | {chunked * 1e6 / samples:>9.1f} "
+              f"| {frame_ms} |")
+
+
+if __name__ == '__main__':
+    main()
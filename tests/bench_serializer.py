@@ -0,0 +1,87 @@
+# tests/bench_serializer.py
+"""
+Benchmark: stdlib json.dumps versus orjson (utils.serializer) on full response pages, plus the
+chunked encoder writing the same page to a file.
+
+Pages are synthetic, shaped like a merged response filling the default byte budget: acc in
+'map' and 'combined_tuple' (one packet = 64 samples x 3 axes), fft in 'map' (512 bins per packet).
+The peak column is the largest allocation traced while encoding (tracemalloc, separate run).
+Usage: python tests/bench_serializer.py
+"""
+import os
+import sys
+import random
+import tempfile
+import timeit
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import formatters, serializer
+
+REPEAT = 3
+ACC_PACKETS = 1500
+FFT_PACKETS = 200
+PACKET_MS = 1280
+
+
+def _acc_page(output_format):
+    rnd = random.Random(1)
+    item = {'id': 'ASENSE00000022', 'time': 1700000000000, 'datetime': '2023-11-14T22:13:20Z', 'scale': 2.0}
+    n = ACC_PACKETS * 64
+    for key in ['acc_x', 'acc_y', 'acc_z']:
+        item[key] = [{'time': 1700000000000 + i * 19.53125, 'val': rnd.gauss(0, 0.5)} for i in range(n)]
+    for key in ['tamb', 'w_s', 'w_d']:
+        item[key] = [{'time': 1700000000000 + p * PACKET_MS, 'val': rnd.random()} for p in range(ACC_PACKETS)]
+    return {'data': [formatters.convert_item_format(item, output_format)], 'next_timestamp': 1700001920001}
+
+
+def _fft_page():
+    rnd = random.Random(2)
+    items = []
+    for p in range(FFT_PACKETS):
+        item = {'id': 'ASENSE00000022', 'time': 1700000000000 + p * 60000, 'axis': 'x'}
+        item['fft_x'] = [{'freq': b * 0.048828125, 'val': rnd.random() * 1e-3} for b in range(512)]
+        items.append(formatters.convert_item_format(item, 'map'))
+    return {'data': items}
+
+
+def _best(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    engines = [e for e in serializer.ENGINES if serializer.resolve_engine(e) == e]
+    print(f"Engines: {', '.join(engines)} | best of {REPEAT}\n")
+    print(f"| {'Page':<19} | {'Size':>8} | {'Engine':<6} | {'dumps':>9} | {'Chunked to file':>15} "
+          f"| {'Peak dumps':>10} | {'Peak chunked':>12} |")
+    print(f"|{'-' * 21}|{'-' * 10}|{'-' * 8}|{'-' * 11}|{'-' * 17}|{'-' * 12}|{'-' * 14}|")
+
+    pages = [('acc map', _acc_page('map')), ('acc combined_tuple', _acc_page('combined_tuple')),
+             ('fft map', _fft_page())]
+    with tempfile.TemporaryFile() as fp:
+        def chunked(body, engine):
+            fp.seek(0)
+            serializer.dump(body, fp, engine)
+
+        for name, body in pages:
+            for engine in engines:
+                size = len(serializer.dumps_bytes(body, engine)) / 1e6
+                dumps_ms = _best(lambda: serializer.dumps(body, engine))
+                chunked_ms = _best(lambda: chunked(body, engine))
+                peak_dumps = _peak_mb(lambda: serializer.dumps(body, engine))
+                peak_chunked = _peak_mb(lambda: chunked(body, engine))
+                print(f"| {name:<19} | {size:>5.2f} MB | {engine:<6} | {dumps_ms:>6.1f} ms | {chunked_ms:>12.1f} ms "
+                      f"| {peak_dumps:>7.1f} MB | {peak_chunked:>9.1f} MB |")
+
+
+if __name__ == '__main__':
+    main()
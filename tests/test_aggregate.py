@@ -0,0 +1,92 @@
+# tests/test_aggregate.py
+import unittest
+import sys
+import os
+import copy
+import math
+import random
+import statistics
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from processors import acc, gyr
+from utils import aggregate, corrector
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler, START
+
+
+def _reference(items, key, window_ms):
+    """Per-window statistics computed sample by sample with the statistics module."""
+    windows = {}
+    for item in items:
+        for sample in item.get(key, []):
+            windows.setdefault(math.floor(sample['time'] / window_ms) * window_ms, []).append(sample['val'])
+    return {start: {'count': len(v), 'mean': statistics.fmean(v), 'std': statistics.pstdev(v),
+                    'rms': math.sqrt(statistics.fmean(x * x for x in v)), 'p2p': max(v) - min(v)}
+            for start, v in windows.items()}
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestAggregate(unittest.TestCase):
+
+    def assertStatsEqual(self, actual, expected, msg=None):
+        self.assertEqual(actual['count'], expected['count'], msg)
+        for stat in ['mean', 'std', 'rms', 'p2p']:
+            self.assertAlmostEqual(actual[stat], expected[stat], places=9, msg=f"{msg} {stat}")
+
+    def test_matches_reference_statistics(self):
+        print("\n--- Test: reduceat window statistics == statistics module, frames and dict items ---")
+        times = sorted(random.Random(5).sample(range(START, START + 2 * 3600000, 1280), 400))
+        raw = [_raw_packet(t, 'gxyz', 64 * 3) for t in times]
+        for window_ms in [60000, 600000, 3600000]:
+            items = corrector.apply_correction(sorted(gyr.process(copy.deepcopy(raw)), key=lambda x: x['time']),
+                                               True, True)
+            frame = corrector.apply_correction(gyr.process(copy.deepcopy(raw), fmt='frame').sorted(), True, True)
+            for data in (items, frame):
+                rows = aggregate.aggregate(data, window_ms, 'gyr')
+                self.assertEqual([r['time'] for r in rows], sorted(r['time'] for r in rows))
+                for key in aggregate.AGGREGATE_KEYS['gyr']:
+                    expected = _reference(items, key, window_ms)
+                    self.assertEqual(sorted(expected), [r['time'] for r in rows])
+                    for row in rows:
+                        self.assertStatsEqual(row[key], expected[row['time']], f"{window_ms} {key}")
+
+    def test_missing_keys_and_empty_input(self):
+        self.assertEqual(aggregate.aggregate([], 60000, 'acc'), [])
+        items = acc.process([_raw_packet(START, 'axyz', 3 * 4)])
+        items[0].pop('acc_y')
+        row, = aggregate.aggregate(items, 60000, 'acc')
+        self.assertEqual(set(row), {'time', 'acc_x', 'acc_z'})
+        self.assertEqual(row['acc_x']['count'], 4)
+
+
+class TestHandlerAggregate(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.times = [START + 600 + i * 20000 for i in range(20)]
+        access.client = TopicDynamoClient(self.DEVICES, times=self.times)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_aggregate_rows(self):
+        print("\n--- Test: aggregate=1m returns one compact row per minute ---")
+        for engine in ['python', 'numpy']:
+            params = dict(table_name='acc', id='ASENSE00000022', decode_engine=engine, end_time=str(START + 600000))
+            status, body = call_handler(aggregate='1m', **params)
+            self.assertEqual(status, 200)
+            rows = body['data']
+            self.assertEqual(sum(r['acc_x']['count'] for r in rows), 64 * len(self.times))
+            self.assertTrue(all(r['time'] % 60000 == 0 and r['datetime'].endswith('Z') for r in rows))
+
+            _, samples = call_handler(**params)
+            self.assertLess(len(str(body)), len(str(samples)) / 10)
+
+    def test_invalid_requests(self):
+        self.assertEqual(call_handler(table_name='fft', id='ASENSE00000022', aggregate='1h')[0], 400)
+        self.assertEqual(call_handler(table_name='acc', id='ASENSE00000022', aggregate='5s')[0], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
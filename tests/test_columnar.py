@@ -0,0 +1,148 @@
+# tests/test_columnar.py
+import unittest
+import sys
+import os
+import io
+import json
+import base64
+import copy
+import contextlib
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from db import access
+from processors import gyr
+from utils import columnar, corrector, formatters, mergers
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler, START
+
+pa = columnar.pa
+
+
+def _decode(response):
+    payload = base64.b64decode(response['body'])
+    if response['headers']['Content-Type'] == columnar.CONTENT_TYPES['parquet']:
+        return columnar.pq.read_table(pa.BufferReader(payload))
+    return pa.ipc.open_stream(payload).read_all()
+
+
+def _rows(table):
+    """(topic, item, key, time/freq, val) rows of a decoded table, in table order."""
+    columns = table.to_pydict()
+    index = [t if t is not None else f for t, f in zip(columns.get('time', [None] * table.num_rows),
+                                                       columns.get('freq', [None] * table.num_rows))]
+    return list(zip(columns['topic'], columns['item'], columns['key'], index, columns['val']))
+
+
+def _json_rows(data):
+    """The same rows from a 'dict_array' JSON response: {topic: items}."""
+    rows = []
+    for topic, items in data.items():
+        for position, item in enumerate(items):
+            for key, value in item.items():
+                if isinstance(value, list) and key in formatters.FIELD_SCHEMA:
+                    cfg = formatters.FIELD_SCHEMA[key]
+                    rows.extend((topic, position, key, s[cfg['idx']], s[cfg['val']]) for s in value)
+    return rows
+
+
+@unittest.skipIf(pa is None or np is None, "pyarrow or numpy is not installed")
+class TestColumnar(unittest.TestCase):
+
+    def test_frame_and_dict_columns_build_the_same_table(self):
+        print("\n--- Test: COLUMNS items from frames and from dict items give the same table ---")
+        raw = [_raw_packet(START + i * 1280, 'gxyz', 64 * 3, scale=250) for i in range(30)]
+        items = corrector.apply_correction(sorted(gyr.process(copy.deepcopy(raw)), key=lambda x: x['time']), True, True)
+        frame = corrector.apply_correction(gyr.process(copy.deepcopy(raw), fmt='frame').sorted(), True, True)
+        from_items = [formatters.convert_item_format(mergers.merge_items_in_group(items), formatters.COLUMNS)]
+        from_frame = formatters.convert_frame(mergers.merge_items_in_group(frame), formatters.COLUMNS)
+        self.assertTrue(columnar.to_table({'gyr': from_items}).equals(columnar.to_table({'gyr': from_frame})))
+
+        table = columnar.to_table({'gyr': from_frame}, {'next_timestamp': 5})
+        self.assertEqual(table.num_rows, 30 * 64 * 3)
+        # Scaled int16 samples are exact in float32
+        self.assertEqual(table.schema.field('val').type, pa.float32())
+        metadata = json.loads(table.schema.metadata[columnar.METADATA_KEY])
+        self.assertEqual(metadata['next_timestamp'], 5)
+        self.assertEqual(metadata['items']['gyr'][0]['id'], 'TEST_DEVICE')
+
+    def test_column_types(self):
+        item = {'id': 'A', 'acc_x': (np.array([1.0, 2.0]), np.array([0.1, 0.2])),
+                'fft_x': (np.array([0.0, 0.5]), np.array([0.5, 0.25]))}
+        table = columnar.to_table({'acc': [item], 'fft': [item]})
+        self.assertEqual(table.column_names, ['topic', 'item', 'key', 'time', 'freq', 'val'])
+        self.assertEqual(table.schema.field('time').type, pa.int64())
+        self.assertEqual(table.schema.field('item').type, pa.int16())
+        # 0.1 is not exact in float32
+        self.assertEqual(table.schema.field('val').type, pa.float64())
+        self.assertEqual(table.column('time').null_count, 4)
+        item['acc_x'] = (np.array([1.5, 2.0]), np.array([0.5, 0.25]))
+        table = columnar.to_table({'acc': [item]})
+        self.assertEqual(table.schema.field('time').type, pa.float64())
+        self.assertEqual(table.schema.field('val').type, pa.float32())
+        self.assertEqual(columnar.to_table({'acc': []}).num_rows, 0)
+
+    def test_encode_round_trip(self):
+        item = {'acc_x': (np.arange(100, dtype=np.float64), np.linspace(-1, 1, 100))}
+        table = columnar.to_table({'acc': [item]})
+        for output_format in columnar.FORMATS:
+            payload = columnar.encode(table, output_format)
+            decoded = _decode({'body': base64.b64encode(payload),
+                               'headers': {'Content-Type': columnar.CONTENT_TYPES[output_format]}})
+            self.assertTrue(decoded.equals(table), output_format)
+
+
+class TestHandlerColumnar(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        access.client = TopicDynamoClient(self.DEVICES, packets=40)
+
+    @unittest.skipIf(pa is None or np is None, "pyarrow or numpy is not installed")
+    def test_binary_pages_match_json(self):
+        print("\n--- Test: arrow/parquet pages hold the same samples as the JSON page ---")
+        for engine in ['python', 'numpy']:
+            for table_name in ['acc', 'acc,gyr,fft']:
+                params = dict(table_name=table_name, id='ASENSE00000022', decode_engine=engine)
+                _, body = call_handler(output_format='dict_array', **params)
+                data = body['data'] if ',' in table_name else {table_name: body['data']}
+                expected = sorted(_json_rows(data))
+                for output_format in columnar.FORMATS:
+                    response = _handler_response(output_format=output_format, **params)
+                    self.assertEqual(response['statusCode'], 200)
+                    self.assertTrue(response['isBase64Encoded'])
+                    table = _decode(response)
+                    self.assertEqual(sorted(_rows(table)), expected, f"{engine} {table_name} {output_format}")
+                    items = json.loads(table.schema.metadata[columnar.METADATA_KEY])['items']
+                    self.assertEqual(items[table_name.split(',')[0]][0]['datetime'],
+                                     data[table_name.split(',')[0]][0]['datetime'])
+
+    @unittest.skipIf(pa is None or np is None, "pyarrow or numpy is not installed")
+    def test_paging_headers(self):
+        response = _handler_response(table_name='acc', id='ASENSE00000022', output_format='arrow', max_bytes='20000')
+        metadata = json.loads(_decode(response).schema.metadata[columnar.METADATA_KEY])
+        self.assertEqual(int(response['headers']['X-Next-Timestamp']), metadata['next_timestamp'])
+        self.assertEqual(response['headers']['X-Cursor'], metadata['cursor'])
+        # The cursor resumes after the page's last packet
+        status, body = call_handler(cursor=metadata['cursor'], output_format='dict_array')
+        self.assertEqual(status, 200)
+        last_time = max(_decode(response).column('time').to_pylist())
+        self.assertGreater(body['data'][0]['acc_x'][0]['time'], last_time)
+
+    def test_invalid_requests(self):
+        status, _ = call_handler(table_name='acc', id='ASENSE00000022,ASENSE00000023', output_format='arrow')
+        self.assertEqual(status, 400)
+        status, _ = call_handler(table_name='acc', id='ASENSE00000022', output_format='parquet', aggregate='1m')
+        self.assertEqual(status, 400)
+
+
+def _handler_response(**params):
+    params = {'start_time': str(START), 'end_time': str(START + 60000), 'fast_decode': 'true', **params}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return lambda_function.lambda_handler({'queryStringParameters': params}, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
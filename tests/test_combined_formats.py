@@ -0,0 +1,78 @@
+# tests/test_combined_formats.py
+import unittest
+import sys
+import os
+import copy
+import random
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import formatters
+from utils.formatters import FIELD_SCHEMA, GROUPS
+
+
+def _row_loop_groups(item, target_format):
+    """The combined groups as built row by row before the zip transposition."""
+    groups = {}
+    for group_name, config in GROUPS.items():
+        keys = config['keys']
+        if not all(k in item for k in keys):
+            continue
+        domain_key = FIELD_SCHEMA[keys[0]]['idx']
+        rows = []
+        for i in range(len(item[keys[0]])):
+            vals = [item[k][i].get('val') for k in keys]
+            if target_format == 'combined_tuple':
+                rows.append([item[keys[0]][i].get(domain_key)] + vals)
+            else:
+                row = {domain_key: item[keys[0]][i].get(domain_key)}
+                for label, val in zip(config['labels'], vals):
+                    row[label] = val
+                rows.append(row)
+        groups[group_name] = rows
+    return groups
+
+
+def _item(n, seed=0):
+    rnd = random.Random(seed)
+    times = [1700000000000 + i * 19.53125 for i in range(n)]
+    item = {'time': times[0], 'id': 'ASENSE00000022', 'tamb': [{'time': times[0], 'val': 21.5}]}
+    for key in ['acc_x', 'acc_y', 'acc_z', 'ain_a', 'ain_b']:
+        item[key] = [{'time': t, 'val': rnd.gauss(0, 1)} for t in times]
+    for key in ['fft_x', 'fft_y', 'fft_z']:
+        item[key] = [{'freq': f * 0.5, 'val': rnd.random()} for f in range(64)]
+    item['acc_y'][3]['val'] = None
+    return item
+
+
+class TestCombinedFormats(unittest.TestCase):
+
+    def test_matches_row_loop(self):
+        print("\n--- Test: zip-transposed combined groups == row-by-row groups ---")
+        item = _item(500)
+        for target_format in ['combined_tuple', 'combined_dict']:
+            original = copy.deepcopy(item)
+            converted = formatters.convert_item_format(item, target_format)
+            self.assertEqual(item, original)
+            for group_name, rows in _row_loop_groups(item, target_format).items():
+                self.assertEqual(converted[group_name], rows, f"{target_format} {group_name}")
+            self.assertFalse(any(k in converted for k in ['acc_x', 'fft_y', 'ain_b']))
+            self.assertEqual(converted['tamb'], [[1700000000000.0, 21.5]] if target_format == 'combined_tuple'
+                             else [{'time': 1700000000000.0, 'val': 21.5}])
+
+    def test_unchanged_items_are_not_copied(self):
+        item = {'time': 1700000000000, 'id': 'ASENSE00000022', 'status': 'ok'}
+        for target_format in ['map', 'tuple_array', 'combined_tuple', 'dict_array']:
+            self.assertIs(formatters.convert_item_format(item, target_format), item)
+        self.assertIsNot(formatters.convert_item_format(_item(5), 'map'), item)
+
+    def test_faster_than_row_loop(self):
+        item = _item(50000)
+        loop = min(timeit.repeat(lambda: _row_loop_groups(item, 'combined_tuple'), number=1, repeat=3))
+        bulk = min(timeit.repeat(lambda: formatters.convert_item_format(item, 'combined_tuple'), number=1, repeat=3))
+        print(f"row loop: {loop * 1000:.1f} ms, zip: {bulk * 1000:.1f} ms")
+        self.assertLess(bulk, loop)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# tests/test_cursor.py
+import unittest
+import sys
+import os
+import json
+from unittest import mock
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+os.environ.setdefault('ASENSE_CURSOR_SECRET', 'test-cursor-secret')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from utils import corrector, cursor, paging
+from tests.test_multi_topic import HandlerTestCase, call_handler, START
+
+DEVICE = 'ASENSE00000022'
+
+
+def collect_pages(**params):
+    """Follows 'cursor' until the last page; returns the concatenated data and the page count."""
+    status, body = call_handler(**params)
+    data, pages = list(body['data']), 1
+    while 'cursor' in body:
+        status, body = call_handler(cursor=body['cursor'], max_bytes=params.get('max_bytes'),
+                                    **{k: v for k, v in params.items()
+                                       if k not in ('table_name', 'id', 'start_time', 'end_time', 'max_bytes')})
+        assert status == 200, body
+        data.extend(body['data'])
+        pages += 1
+    return data, pages
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip_and_tampering(self):
+        token = cursor.encode('acc', DEVICE, 1700000001280, 1700000060000)
+        payload = cursor.decode(token)
+        self.assertEqual(payload['key'], {'id': DEVICE, 'time': 1700000001280})
+        self.assertEqual(cursor.resume_start_time(payload), 1700000001281)
+
+        body, signature = token.split('.')
+        forged = cursor._b64encode(cursor._b64decode(body).replace(b'1700000060000', b'1800000060000'))
+        for bad in [f"{forged}.{signature}", token[:-2], 'garbage', '']:
+            with self.assertRaises(cursor.CursorError):
+                cursor.decode(bad)
+
+    def test_disabled_without_secret(self):
+        token = cursor.encode('acc', DEVICE, 1700000001280, 1700000060000)
+        with mock.patch.dict(os.environ, {cursor.SECRET_ENV: ''}):
+            self.assertFalse(cursor.enabled())
+            with self.assertRaises(cursor.CursorError):
+                cursor.decode(token)
+            with self.assertRaises(cursor.CursorError):
+                cursor.encode('acc', DEVICE, 1700000001280, 1700000060000)
+
+    def test_payload_and_state_shape(self):
+        def signed(payload):
+            body = cursor._b64encode(json.dumps(payload).encode())
+            return f"{body}.{cursor._b64encode(cursor._sign(body))}"
+
+        payload = cursor.decode(cursor.encode('acc', DEVICE, 1700000001280, 1700000060000))
+        for bad in [[1], {**payload, 'end': '1700000060000'}, {**payload, 'key': None},
+                    {**payload, 'topic': 3}, {**payload, 'state': [1280]}]:
+            with self.assertRaises(cursor.CursorError):
+                cursor.decode(signed(bad))
+
+        corrector.validate_state(None)
+        corrector.validate_state({'prev_time': 1700000001280, 'median_delta': 1283.5,
+                                  'prev_raw_time': None, 'recent_deltas': [1280, 1283.0]})
+        for bad in [{'prev_time': '1'}, {'median_delta': 0.001}, {'median_delta': True},
+                    {'recent_deltas': [1280] * 1000}, {'recent_deltas': [1e9]}, {'other': 1}]:
+            with self.assertRaises(ValueError):
+                corrector.validate_state(bad)
+
+
+class TestCursorPaging(HandlerTestCase):
+
+    def test_pages_concatenate_to_the_unpaged_result(self):
+        print("\n--- Test: Following cursors reproduces the unpaged response ---")
+        params = dict(table_name='gyr', id=DEVICE, merge='false', enable_correction='false')
+        _, unpaged = call_handler(**params)
+        self.assertNotIn('cursor', unpaged)
+
+        paged, pages = collect_pages(max_bytes=str(3 * 6000), **params)
+        self.assertGreater(pages, 3)
+        self.assertEqual(paged, unpaged['data'])
+
+    def test_rejects_tampered_or_mismatched_cursor(self):
+        _, body = call_handler(table_name='gyr', id=DEVICE, max_bytes='6000', merge='false')
+        token = body['cursor']
+        status, _ = call_handler(cursor=token[:10] + ('B' if token[10] == 'A' else 'A') + token[11:])
+        self.assertEqual(status, 400)
+        status, _ = call_handler(cursor=body['cursor'], table_name='acc')
+        self.assertEqual(status, 400)
+        # Signed, but carrying a corrector state the server never issues
+        forged = cursor.encode('gyr', DEVICE, START, START + 60000, state={'median_delta': 1})
+        status, _ = call_handler(cursor=forged)
+        self.assertEqual(status, 400)
+
+    def test_no_cursor_without_secret(self):
+        query_paginated = access.query_paginated
+        with mock.patch.dict(os.environ, {cursor.SECRET_ENV: ''}), \
+                mock.patch.object(access, 'query_paginated', wraps=query_paginated) as query:
+            _, body = call_handler(table_name='gyr', id=DEVICE, max_bytes='6000', merge='false',
+                                   disk_cache='false')
+        self.assertIn('next_timestamp', body)
+        self.assertNotIn('cursor', body)
+        # No state to carry: no lookahead packet is fetched either
+        self.assertEqual(query.call_args.kwargs['limit'], paging.packets_for_budget('gyr', 'map', 6000))
+        self.assertEqual(len(body['data']), query.call_args.kwargs['limit'])
+
+
+if __name__ == '__main__':
+    unittest.main()
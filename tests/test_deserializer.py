@@ -0,0 +1,53 @@
+# tests/test_deserializer.py
+import unittest
+import sys
+import os
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from boto3.dynamodb.types import TypeDeserializer
+from db.deserializer import deserialize_item
+from processors import acc, data
+
+
+class TestFastDeserializer(unittest.TestCase):
+
+    WIRE_ACC = {
+        'id': {'S': 'ASENSE00000022'},
+        'time': {'N': '1764201600000'},
+        'odr': {'N': '52.5'},
+        'scale': {'N': '2'},
+        'seq': {'N': '12'},
+        'tamb': {'N': '2512'},
+        'axyz': {'L': [{'N': str(v)} for v in range(-96, 96)]},
+    }
+
+    def test_types(self):
+        print("\n--- Test: Fast deserializer types ---")
+        item = deserialize_item(self.WIRE_ACC)
+        self.assertIsInstance(item['axyz'], array)
+        self.assertEqual(item['axyz'].typecode, 'd')
+        self.assertEqual(item['time'], 1764201600000)
+        self.assertIsInstance(item['time'], int)
+        self.assertEqual(item['odr'], 52.5)
+
+    def test_processor_output_matches_decimal_path(self):
+        print("\n--- Test: Processor output identical with Decimal vs fast items ---")
+        slow = TypeDeserializer().deserialize({'M': self.WIRE_ACC})
+        fast = deserialize_item(self.WIRE_ACC)
+        for engine in ['python', 'numpy']:
+            self.assertEqual(acc.process([slow], engine=engine), acc.process([fast], engine=engine))
+
+    def test_non_sample_lists_stay_lists(self):
+        """w_s_avg is not a sample list: data.process requires a real list."""
+        print("\n--- Test: Non-sample lists stay python lists ---")
+        wire = {'id': {'S': 'X'}, 'time': {'N': '1764201600000'}, 'odr': {'N': '1'}, 'scale': {'N': '1'},
+                'w_s_avg': {'L': [{'N': '100'}, {'N': '250'}]}}
+        slow = TypeDeserializer().deserialize({'M': wire})
+        fast = deserialize_item(wire)
+        self.assertEqual(fast['w_s_avg'], [100, 250])
+        self.assertEqual(data.process([slow]), data.process([fast]))
+
+
+if __name__ == '__main__':
+    unittest.main()
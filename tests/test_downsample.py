@@ -0,0 +1,114 @@
+# tests/test_downsample.py
+import unittest
+import sys
+import os
+import copy
+import random
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc
+from utils import downsample, formatters, mergers
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, call_handler
+
+
+def _reference_lttb(x, y, threshold):
+    """Textbook single-series LTTB (loop over every candidate)."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+            avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+
+def _merged_acc(n_packets, seed=1):
+    raw = [_raw_packet(1700000000000 + i * 1280, 'axyz', 64 * 3) for i in range(n_packets)]
+    random.Random(seed).shuffle(raw)
+    return raw
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestDownsample(unittest.TestCase):
+
+    def test_minmax_keeps_extremes(self):
+        print("\n--- Test: min/max buckets keep every key's extremes, shared positions ---")
+        rnd = np.random.default_rng(2)
+        index = np.arange(10000, dtype=np.float64) * 20
+        columns = [rnd.normal(size=10000) for _ in range(3)]
+        kept = downsample.select(index, columns, 600, 'minmax')
+        self.assertLessEqual(len(kept), 600)
+        self.assertTrue((np.diff(kept) > 0).all())
+        for values in columns:
+            self.assertIn(int(np.argmin(values)), kept.tolist())
+            self.assertIn(int(np.argmax(values)), kept.tolist())
+        self.assertEqual(downsample.select(index[:500], columns, 600).tolist(), list(range(500)))
+
+    def test_minmax_small_budget(self):
+        print("\n--- Test: min/max never exceeds max_points, even below two samples per key ---")
+        raw = _merged_acc(10)
+        for max_points in range(downsample.MIN_POINTS, 8):
+            items = [mergers.merge_items_in_group(sorted(acc.process(copy.deepcopy(raw)), key=lambda x: x['time']))]
+            downsample.downsample_items(items, max_points, 'minmax')
+            for key in ['acc_x', 'acc_y', 'acc_z']:
+                self.assertLessEqual(len(items[0][key]), max_points, f"max_points={max_points}")
+
+    def test_lttb_matches_reference(self):
+        print("\n--- Test: Bucket-vectorized LTTB == textbook LTTB ---")
+        rnd = random.Random(3)
+        for n, threshold in [(100, 3), (1000, 50), (5000, 999), (64, 63)]:
+            x = [1700000000000 + 20.0 * i for i in range(n)]
+            y = [rnd.gauss(0, 1) for _ in range(n)]
+            kept = downsample.select(np.array(x), [np.array(y)], threshold, 'lttb')
+            self.assertEqual(kept.tolist(), _reference_lttb([t - x[0] for t in x], y, threshold), f"n={n}")
+
+    def test_frame_matches_dict_items(self):
+        print("\n--- Test: Downsampled frames == downsampled dict items, every format ---")
+        raw = _merged_acc(100)
+        for method in downsample.METHODS:
+            items = [mergers.merge_items_in_group(sorted(acc.process(copy.deepcopy(raw)), key=lambda x: x['time']))]
+            downsample.downsample_items(items, 500, method)
+            frame = downsample.downsample_frame(
+                mergers.merge_items_in_group(acc.process(copy.deepcopy(raw), fmt='frame').sorted()), 500, method)
+            for output_format in ['map', 'combined_tuple', 'dict_array']:
+                expected = [formatters.convert_item_format(copy.deepcopy(item), output_format) for item in items]
+                self.assertEqual(formatters.convert_frame(frame, output_format), expected, f"{method} {output_format}")
+            self.assertLessEqual(len(items[0]['acc_x']), 500)
+            self.assertEqual(len(items[0]['tamb']), 100)
+
+
+class TestHandlerDownsample(HandlerTestCase):
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_max_points(self):
+        print("\n--- Test: max_points caps every vector key, combined rows stay aligned ---")
+        for engine in ['python', 'numpy']:
+            for method in downsample.METHODS:
+                status, body = call_handler(table_name='acc', id='ASENSE00000022', max_points='300',
+                                            downsample=method, decode_engine=engine, output_format='combined_tuple')
+                self.assertEqual(status, 200)
+                rows = body['data'][0]['acc']
+                self.assertLessEqual(len(rows), 300)
+                if method == 'lttb':
+                    self.assertEqual(len(rows), 300)
+                self.assertTrue(all(len(row) == 4 for row in rows))
+                self.assertEqual(rows, sorted(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
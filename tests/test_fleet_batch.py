@@ -0,0 +1,127 @@
+# tests/test_fleet_batch.py
+import unittest
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from db import access
+from utils import batch
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler
+
+FLEET = [f"ASENSE000000{n:02d}" for n in range(1, 7)]
+
+
+class FailingClient(TopicDynamoClient):
+    """Raises for one device, like a throttled or misconfigured partition would."""
+
+    def query(self, **request):
+        if request['ExpressionAttributeValues'][':id']['S'] == 'ASENSE00000003':
+            raise RuntimeError('ProvisionedThroughputExceededException')
+        return super().query(**request)
+
+
+class TestDeviceIds(unittest.TestCase):
+
+    def test_parse_lists_and_ranges(self):
+        self.assertEqual(batch.parse_device_ids('ASENSE00000022'), ['ASENSE00000022'])
+        self.assertEqual(batch.parse_device_ids('ASENSE00000008..ASENSE00000011'),
+                         ['ASENSE00000008', 'ASENSE00000009', 'ASENSE00000010', 'ASENSE00000011'])
+        self.assertEqual(batch.parse_device_ids('ASENSE00000001..3, ASENSE00000022,ASENSE00000002'),
+                         ['ASENSE00000001', 'ASENSE00000002', 'ASENSE00000003', 'ASENSE00000022'])
+        with self.assertRaises(ValueError):
+            batch.parse_device_ids('ASENSE00000009..ASENSE00000001')
+        with self.assertRaises(ValueError):
+            batch.parse_device_ids('ASENSE00000001..99999')
+
+    def test_run_bounded_limits_concurrency(self):
+        print("\n--- Test: run_bounded keeps at most N calls in flight ---")
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work(key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            if key == 4:
+                raise ValueError('boom')
+            return key * 10
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results, errors = batch.run_bounded(pool, work, list(range(10)), 3)
+        self.assertLessEqual(state['peak'], 3)
+        self.assertEqual(list(results), [0, 1, 2, 3, 5, 6, 7, 8, 9])
+        self.assertEqual(errors, {4: 'boom'})
+
+
+class TestFleetBatch(HandlerTestCase):
+    DEVICES = FLEET
+
+    def test_batch_matches_single_device_requests(self):
+        print("\n--- Test: id=<range> == one request per device ---")
+        status, body = call_handler(table_name='acc', id='ASENSE00000001..06', batch_concurrency='2')
+        self.assertEqual(status, 200)
+        self.assertEqual(list(body['data']), FLEET)
+        for device in FLEET:
+            _, single = call_handler(table_name='acc', id=device)
+            self.assertEqual(body['data'][device], single['data'])
+
+    def test_per_device_cursors(self):
+        print("\n--- Test: Batch pages share max_bytes and keep one cursor per device ---")
+        max_bytes = len(FLEET) * 4 * 6000
+        _, body = call_handler(table_name='gyr', id=','.join(FLEET), max_bytes=str(max_bytes), merge='false')
+        _, single = call_handler(table_name='gyr', id=FLEET[0], max_bytes=str(max_bytes // len(FLEET)),
+                                 merge='false')
+        self.assertEqual(set(body['next_timestamp']), set(FLEET))
+        self.assertEqual(body['next_timestamp'][FLEET[0]], single['next_timestamp'])
+        self.assertEqual(body['data'][FLEET[0]], single['data'])
+
+    def test_partial_results_when_a_device_fails(self):
+        print("\n--- Test: One failing device does not fail the batch ---")
+        access.client = FailingClient(FLEET)
+        status, body = call_handler(table_name='acc,gyr', id='ASENSE00000001..ASENSE00000006')
+        self.assertEqual(status, 200)
+        self.assertEqual(list(body['errors']), ['ASENSE00000003'])
+        self.assertNotIn('ASENSE00000003', body['data'])
+        self.assertEqual(len(body['data']), len(FLEET) - 1)
+        self.assertEqual(set(body['data']['ASENSE00000001']), {'acc', 'gyr'})
+
+    def test_batch_topics_run_in_device_workers(self):
+        print("\n--- Test: Multi-topic batches are bounded by batch_concurrency, not topic_pool ---")
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0, 'threads': set()}
+        run_topic = lambda_function.run_topic
+
+        def probe(*args, **kwargs):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+                state['threads'].add(threading.current_thread().name.split('_')[0])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return run_topic(*args, **kwargs)
+
+        with mock.patch.object(lambda_function, 'run_topic', probe):
+            status, body = call_handler(table_name='acc,gyr,ain', id='ASENSE00000001..06', batch_concurrency='6')
+        self.assertEqual(status, 200)
+        self.assertEqual(set(body['data']['ASENSE00000006']), {'acc', 'gyr', 'ain'})
+        self.assertEqual(state['threads'], {'device'})
+        self.assertGreater(state['peak'], lambda_function.MAX_TOPIC_WORKERS)
+        self.assertLessEqual(state['peak'], 6)
+
+    def test_invalid_range(self):
+        status, _ = call_handler(table_name='acc', id='ASENSE00000009..ASENSE00000001')
+        self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
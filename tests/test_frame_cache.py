@@ -0,0 +1,173 @@
+# tests/test_frame_cache.py
+import unittest
+import sys
+import os
+import random
+import tempfile
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from db.cache import IntervalCache
+from db.frame_cache import FrameDiskCache, HOUR_MS
+from processors import acc, fft
+from utils import formatters
+from utils.frame import np
+from tests.test_segmented_queries import InMemoryDynamoClient, DEVICE
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient
+from tests.test_cursor import collect_pages
+
+BASE = 1700000000000 - 1700000000000 % HOUR_MS
+
+
+class AccDynamoClient(InMemoryDynamoClient):
+    """In-memory client serving full acc packets, counting the queries it receives."""
+
+    def __init__(self, times):
+        super().__init__(times)
+        rnd = random.Random(3)
+        for row in self.rows:
+            row.update({'scale': {'N': '2'}, 'odr': {'N': '50'},
+                        'axyz': {'L': [{'N': str(rnd.randint(-32768, 32767))} for _ in range(64 * 3)]}})
+        self.calls = 0
+
+    def query(self, **request):
+        self.calls += 1
+        return super().query(**request)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestFrameCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._original = access.client, access.range_cache, access.frame_cache
+        access.range_cache = IntervalCache(freshness_ms=0)
+        access.frame_cache = FrameDiskCache(root=self.tmp.name, max_bytes=10 ** 9, freshness_ms=0)
+
+    def tearDown(self):
+        access.client, access.range_cache, access.frame_cache = self._original
+        self.tmp.cleanup()
+
+    def test_round_trip_is_memory_mapped(self):
+        print("\n--- Test: Frame cache store/load round trip (FFT with a missing axis) ---")
+        raw = [_raw_packet(BASE + 100, 'fft', 512, axis='1'), _raw_packet(BASE + 200, 'fft', 512, axis='2')]
+        frame = fft.process(raw, fmt='frame')
+        access.frame_cache.store('asense_table_fft', DEVICE, BASE, frame)
+
+        loaded = access.frame_cache.load('asense_table_fft', DEVICE, BASE)
+        self.assertIsInstance(loaded.blocks[0].values['fft'], np.memmap)
+        for output_format in ['map', 'combined_dict']:
+            self.assertEqual(formatters.convert_frame(frame, output_format),
+                             formatters.convert_frame(loaded, output_format))
+        self.assertIsNone(access.frame_cache.load('asense_table_fft', DEVICE, BASE + HOUR_MS))
+
+    def test_hourly_frames_match_paginated_query(self):
+        print("\n--- Test: query_hourly_frames == query_paginated + process, second pass from disk ---")
+        times = [BASE + 700 + i * 6000 for i in range(1500)] + [BASE + 20 * HOUR_MS + 5]
+        fake = access.client = AccDynamoClient(times)
+        start, end = BASE + 100 * 6000, BASE + 30 * HOUR_MS
+
+        for limit in [1, 100, 1000, 5000]:
+            raw, expected_next = access.query_paginated('asense_table_acc', DEVICE, start, end, limit=limit,
+                                                        fast_decode=True)
+            expected = formatters.convert_frame(acc.process(raw, fmt='frame'), 'map')
+
+            for _ in range(2):
+                fake.read = 0
+                frame, next_timestamp = access.query_hourly_frames('asense_table_acc', DEVICE, start, end,
+                                                                   limit, acc)
+                self.assertEqual(next_timestamp, expected_next, f"limit={limit}")
+                self.assertEqual(formatters.convert_frame(frame, 'map'), expected, f"limit={limit}")
+                # Never more packets than the page asks for (plus the probes past empty hours)
+                self.assertLessEqual(fake.read, limit + 2, f"limit={limit}")
+
+        # Only whole hours are stored (1, 2, 20 and the empty 3 and 21); on the second pass of the
+        # last request they came from disk and the partial first hour from range_cache
+        self.assertEqual(access.frame_cache.stats()['entries'], 5)
+        self.assertEqual(fake.read, 0)
+
+    def test_small_page_in_an_uncached_hour(self):
+        print("\n--- Test: a small page inside a historical hour reads only its packets ---")
+        fake = access.client = AccDynamoClient([BASE + 700 + i * 6000 for i in range(600)])
+        frame, next_timestamp = access.query_hourly_frames('asense_table_acc', DEVICE, BASE, BASE + HOUR_MS - 1,
+                                                           10, acc)
+        self.assertEqual(len(frame), 10)
+        self.assertEqual(next_timestamp, BASE + 700 + 9 * 6000 + 1)
+        self.assertEqual(fake.read, 10)
+        self.assertEqual(access.frame_cache.stats()['entries'], 0)
+
+        # A request reading the whole hour stores it, the next small page is served from disk
+        access.query_hourly_frames('asense_table_acc', DEVICE, BASE, BASE + HOUR_MS - 1, 5000, acc)
+        fake.read = 0
+        frame, _ = access.query_hourly_frames('asense_table_acc', DEVICE, BASE, BASE + HOUR_MS - 1, 10, acc)
+        self.assertEqual(len(frame), 10)
+        self.assertEqual(fake.read, 0)
+
+    def test_size_capped_lru(self):
+        print("\n--- Test: Frame cache evicts the least recently used hour ---")
+        frame = acc.process([_raw_packet(BASE + 100, 'axyz', 64 * 3)], fmt='frame')
+        probe = FrameDiskCache(root=os.path.join(self.tmp.name, 'probe'), max_bytes=10 ** 9)
+        probe.store('t', DEVICE, BASE, frame)
+        entry_bytes = probe.stats()['bytes']
+
+        cache = FrameDiskCache(root=os.path.join(self.tmp.name, 'lru'), max_bytes=int(entry_bytes * 2.5))
+        cache.store('t', DEVICE, BASE, frame)
+        cache.store('t', DEVICE, BASE + HOUR_MS, frame)
+        self.assertIsNotNone(cache.load('t', DEVICE, BASE))  # BASE + 1h becomes least recently used
+        cache.store('t', DEVICE, BASE + 2 * HOUR_MS, frame)
+
+        self.assertIsNone(cache.load('t', DEVICE, BASE + HOUR_MS))
+        self.assertIsNotNone(cache.load('t', DEVICE, BASE))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        # A new process sees the entries left on disk
+        self.assertEqual(FrameDiskCache(root=cache.root).stats()['entries'], 2)
+
+    def test_entry_path_stays_in_its_directory(self):
+        names = ['..', '.', '', 'a/b', 'a\\b', 'a_b', '%2E', '%']
+        paths = {name: access.frame_cache.entry_path('t', name, BASE) for name in names}
+        self.assertEqual(len(set(paths.values())), len(names))
+        for path in paths.values():
+            self.assertEqual(os.path.dirname(os.path.dirname(os.path.dirname(path))), self.tmp.name)
+            self.assertEqual(os.path.normpath(path), path)
+
+        frame = acc.process([_raw_packet(BASE + 100, 'axyz', 64 * 3)], fmt='frame')
+        for name in names:
+            access.frame_cache.store('t', name, BASE, frame)
+        self.assertEqual(FrameDiskCache(root=self.tmp.name).stats()['entries'], len(names))
+
+
+class TestHandlerFrameCache(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        access.range_cache = IntervalCache(freshness_ms=0)
+        access.client = TopicDynamoClient(self.DEVICES, times=[BASE + 600 + i * 1280 for i in range(3 * 2812)],
+                                          topics=['acc'])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_default_pages_fill_the_disk_cache(self):
+        print("\n--- Test: paging through hours at the default max_bytes stores them, second pass from disk ---")
+        for output_format in ['map', 'typed']:
+            access.frame_cache = FrameDiskCache(root=os.path.join(self.tmp.name, output_format), freshness_ms=0)
+            access.range_cache = IntervalCache(freshness_ms=0)
+            params = dict(table_name='acc', id=DEVICE, start_time=str(BASE), end_time=str(BASE + 3 * HOUR_MS - 1),
+                          decode_engine='numpy', output_format=output_format)
+            first, pages = collect_pages(**params)
+            self.assertGreater(pages, 3)
+            self.assertEqual(access.frame_cache.stats()['stores'], 3)
+
+            # A new container: range_cache is gone, the hours are still in /tmp
+            access.range_cache = IntervalCache(freshness_ms=0)
+            fake = access.client.tables[('asense_table_acc', DEVICE)]
+            fake.read = 0
+            second, _ = collect_pages(**params)
+            self.assertEqual(second, first)
+            self.assertGreaterEqual(access.frame_cache.stats()['hits'], 3)
+            self.assertEqual(fake.read, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_merge_windows.py
+import unittest
+import sys
+import os
+import copy
+import datetime
+import random
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from processors import acc, fft
+from utils import mergers, formatters
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler, START
+
+
+def _datetime_hour(timestamp_ms):
+    """get_hour_from_timestamp before integer bucketing (kept as the reference)."""
+    dt = datetime.datetime.fromtimestamp(float(timestamp_ms) / 1000, tz=datetime.timezone.utc)
+    return int(dt.replace(minute=0, second=0, microsecond=0).timestamp() * 1000)
+
+
+class TestWindowMerge(unittest.TestCase):
+
+    def test_parse_window(self):
+        self.assertEqual(mergers.parse_window('window:10m'), 600000)
+        self.assertEqual(mergers.parse_window('WINDOW:2h'), 7200000)
+        self.assertEqual(mergers.parse_window('window:1d'), 86400000)
+        self.assertIsNone(mergers.parse_window('true'))
+        for bad in ['window:', 'window:0h', 'window:5s', 'window:-1m', 'window:1.5h']:
+            with self.assertRaises(ValueError):
+                mergers.parse_window(bad)
+
+    def test_integer_hours_match_datetime(self):
+        print("\n--- Test: Integer floor bucketing == datetime hour truncation ---")
+        rnd = random.Random(3)
+        for _ in range(2000):
+            t = rnd.randint(0, 4102444800000)
+            self.assertEqual(mergers.get_hour_from_timestamp(t), _datetime_hour(t))
+        self.assertEqual(mergers.get_hour_from_timestamp('nope'), 0)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_frame_matches_dict_items(self):
+        print("\n--- Test: merge_items_by_window on frames == on dict items ---")
+        times = sorted(random.Random(4).sample(range(1700000000000, 1700000000000 + 3 * 3600000, 1280), 300))
+        raw = [_raw_packet(t, 'axyz', 3 * 4) for t in times]
+        for bucket_ms in [60000, 600000, 3600000, 86400000]:
+            items = mergers.merge_items_by_window(acc.process(copy.deepcopy(raw)), bucket_ms)
+            frame = mergers.merge_items_by_window(acc.process(copy.deepcopy(raw), fmt='frame'), bucket_ms)
+            expected = [formatters.convert_item_format(item, 'map') for item in items]
+            self.assertEqual(formatters.convert_frame(frame, 'map'), expected, f"bucket={bucket_ms}")
+            self.assertEqual(len(items), len({t // bucket_ms for t in times}))
+            self.assertTrue(all(item['time'] // bucket_ms * bucket_ms == mergers.get_bucket_start(item['time'], bucket_ms)
+                                for item in items))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_fft_windows(self):
+        raw = [_raw_packet(1700000000000 + i * 290000, 'fft', 8, axis=str(i % 3)) for i in range(24)]
+        items = mergers.merge_fft_axes_by_window(fft.process(copy.deepcopy(raw)), 1800000)
+        frame = mergers.merge_fft_axes_by_window(fft.process(copy.deepcopy(raw), fmt='frame'), 1800000)
+        self.assertEqual(formatters.convert_frame(frame, 'map'),
+                         [formatters.convert_item_format(item, 'map') for item in items])
+        self.assertEqual(mergers.merge_fft_axes_by_hour(fft.process(copy.deepcopy(raw))),
+                         mergers.merge_fft_axes_by_window(fft.process(copy.deepcopy(raw)), mergers.HOUR_MS))
+
+
+class TestHandlerWindowMerge(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # One packet every 20s for ~7 minutes
+        self.times = [START + 600 + i * 20000 for i in range(20)]
+        access.client = TopicDynamoClient(self.DEVICES, times=self.times)
+
+    def test_window_merge(self):
+        print("\n--- Test: merge=window:10s is rejected, merge=window:1m returns one item per minute ---")
+        status, body = call_handler(table_name='acc', id='ASENSE00000022', merge='window:10s')
+        self.assertEqual(status, 400)
+
+        for engine in ['python', 'numpy'] if np is not None else ['python']:
+            params = dict(table_name='acc', id='ASENSE00000022', decode_engine=engine, end_time=str(START + 600000))
+            status, body = call_handler(merge='window:1m', **params)
+            self.assertEqual(status, 200)
+            self.assertEqual(len(body['data']), len({t // 60000 for t in self.times}))
+            _, whole = call_handler(**params)
+            self.assertEqual(sum(len(item['acc_x']) for item in body['data']), len(whole['data'][0]['acc_x']))
+            self.assertTrue(all('seq' not in item for item in body['data']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_mergers.py
+import unittest
+import sys
+import os
+import copy
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc, fft
+from utils import mergers
+from tests.test_sensor_frame import _raw_packet
+from tests.bench_mergers import _quadratic_merge
+
+
+class TestChunkedMerge(unittest.TestCase):
+
+    def test_matches_quadratic_merge(self):
+        print("\n--- Test: Chunked merge_items_in_group == 'current + value' merger ---")
+        rnd = random.Random(7)
+        for trial in range(50):
+            items = acc.process([_raw_packet(1700000000000 + i * 1280, 'axyz', 3 * rnd.choice([0, 1, 64]))
+                                 for i in range(rnd.randint(1, 30))])
+            # Keys missing from the first packets, scalar/vector clashes and new scalars
+            for item in items:
+                if rnd.random() < 0.3:
+                    item.pop('acc_y')
+                if rnd.random() < 0.2:
+                    item['acc_z'] = 1.5
+                if rnd.random() < 0.2:
+                    item['extra'] = rnd.random()
+            snapshot = copy.deepcopy(items)
+
+            self.assertEqual(_quadratic_merge(copy.deepcopy(items)), mergers.merge_items_in_group(items),
+                             f"trial={trial}")
+            self.assertEqual(items, snapshot, "inputs must not be modified")
+
+    def test_fft_axes_merge(self):
+        raw = [_raw_packet(1700000000000 + i * 60000, 'fft', 16, axis=str(i % 3)) for i in range(9)]
+        merged = mergers.merge_fft_axes_by_hour(fft.process(raw))
+        self.assertEqual(len(merged), 1)
+        self.assertEqual([len(merged[0][k]) for k in ['fft_x', 'fft_y', 'fft_z']], [48, 48, 48])
+        self.assertNotIn('axis', merged[0])
+        self.assertEqual(merged[0]['time'], 1700000000000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# tests/test_multi_topic.py
+import unittest
+import sys
+import os
+import json
+import random
+import tempfile
+import contextlib
+import io
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+os.environ.setdefault('ASENSE_CURSOR_SECRET', 'test-cursor-secret')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access, calibration
+from db.calibration import CalibrationStore
+from db.cache import IntervalCache
+from db.frame_cache import FrameDiskCache
+import lambda_function
+from tests.test_segmented_queries import InMemoryDynamoClient
+
+START = 1700000000000
+VALUE_KEYS = {'acc': ('axyz', 64 * 3), 'gyr': ('gxyz', 64 * 3), 'ain': ('ain', 64 * 2)}
+
+
+class TopicDynamoClient:
+    """In-memory low-level client holding one InMemoryDynamoClient per (table, device)."""
+
+    def __init__(self, devices, packets=20, times=None, topics=tuple(VALUE_KEYS)):
+        self.tables = {}
+        for topic in topics:
+            values_key, n_values = VALUE_KEYS[topic]
+            for device in devices:
+                rnd = random.Random(f"{topic}{device}")
+                fake = InMemoryDynamoClient(times or [START + 600 + i * 1280 for i in range(packets)])
+                for row in fake.rows:
+                    row['id'] = {'S': device}
+                    row.pop('axyz')
+                    row.update({'scale': {'N': '2'}, 'odr': {'N': '50'},
+                                values_key: {'L': [{'N': str(rnd.randint(-32768, 32767))} for _ in range(n_values)]}})
+                self.tables[(f"asense_table_{topic}", device)] = fake
+
+    def query(self, **request):
+        key = (request['TableName'], request['ExpressionAttributeValues'][':id']['S'])
+        if key not in self.tables:
+            return {'Items': []}
+        fake = self.tables[key]
+        response = fake.query(**request)
+        if 'LastEvaluatedKey' in response:
+            response['LastEvaluatedKey']['id'] = request['ExpressionAttributeValues'][':id']
+        return response
+
+
+def call_handler(**params):
+    params = {'start_time': str(START), 'end_time': str(START + 60000), 'fast_decode': 'true', **params}
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_function.lambda_handler({'queryStringParameters': params}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+class HandlerTestCase(unittest.TestCase):
+    """Swaps the DynamoDB client, the caches and the calibration store for in-memory / temporary ones."""
+    DEVICES = ['ASENSE00000022']
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._original = access.client, access.range_cache, access.frame_cache, calibration.calibration_store
+        access.client = TopicDynamoClient(self.DEVICES)
+        access.range_cache = IntervalCache(max_bytes=0)
+        access.frame_cache = FrameDiskCache(root=self.tmp.name, freshness_ms=0)
+        calibration.calibration_store = CalibrationStore(path=os.path.join(self.tmp.name, 'calibration.json'))
+
+    def tearDown(self):
+        access.client, access.range_cache, access.frame_cache, calibration.calibration_store = self._original
+        self.tmp.cleanup()
+
+
+class TestMultiTopic(HandlerTestCase):
+
+    def test_fused_response_matches_single_topics(self):
+        print("\n--- Test: table_name=acc,gyr,ain == three single-topic requests ---")
+        for output_format in ['map', 'combined_dict']:
+            status, fused = call_handler(table_name='acc,gyr,ain', id='ASENSE00000022', output_format=output_format)
+            self.assertEqual(status, 200)
+            self.assertEqual(list(fused['data']), ['acc', 'gyr', 'ain'])
+            for topic in ['acc', 'gyr', 'ain']:
+                _, single = call_handler(table_name=topic, id='ASENSE00000022', output_format=output_format)
+                self.assertEqual(fused['data'][topic], single['data'], f"{topic} {output_format}")
+
+    def test_budget_is_shared_between_topics(self):
+        print("\n--- Test: Multi-topic pages split max_bytes and report per-topic cursors ---")
+        max_bytes = 3 * 4 * 6000
+        _, fused = call_handler(table_name='acc,gyr', id='ASENSE00000022', max_bytes=str(max_bytes), merge='false')
+        _, single = call_handler(table_name='acc', id='ASENSE00000022', max_bytes=str(max_bytes // 2), merge='false')
+        self.assertEqual(fused['data']['acc'], single['data'])
+        self.assertEqual(fused['next_timestamp']['acc'], single['next_timestamp'])
+        self.assertIn('gyr', fused['next_timestamp'])
+
+    def test_unknown_topic_in_list(self):
+        status, body = call_handler(table_name='acc,nope', id='ASENSE00000022')
+        self.assertEqual(status, 400)
+        self.assertIn('nope', body['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
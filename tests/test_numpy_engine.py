@@ -0,0 +1,70 @@
+# tests/test_numpy_engine.py
+import unittest
+import sys
+import os
+import random
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc, gyr, ain, fft, numpy_engine
+
+FORMATS = ['dict_array', 'tuple_array', 'map']
+
+
+def _raw_packet(time_val, values_key, n_values, odr=50, scale=2, **extra):
+    """Creates a raw DynamoDB-like packet (numbers as Decimal, like boto3 returns them)."""
+    rnd = random.Random(time_val)
+    packet = {
+        'id': 'TEST_DEVICE',
+        'time': Decimal(time_val),
+        'odr': Decimal(odr),
+        'scale': Decimal(scale),
+        'seq': Decimal(7),
+        values_key: [Decimal(rnd.randint(-32768, 32767)) for _ in range(n_values)],
+    }
+    packet.update(extra)
+    return packet
+
+
+@unittest.skipIf(numpy_engine.np is None, "numpy is not installed")
+class TestNumpyEngine(unittest.TestCase):
+
+    def _assert_engines_match(self, processor, raw_items):
+        for fmt in FORMATS:
+            expected = processor.process(raw_items, fmt=fmt, engine='python')
+            actual = processor.process(raw_items, fmt=fmt, engine='numpy')
+            self.assertEqual(expected, actual, f"Engines differ for fmt={fmt}")
+
+    def test_acc_matches_python(self):
+        print("\n--- Test: ACC numpy engine == python engine ---")
+        raw = [_raw_packet(1700000000000 + i * 1280, 'axyz', 64 * 3, odr=52.5, tamb=Decimal(2500)) for i in range(4)]
+        self._assert_engines_match(acc, raw)
+
+    def test_gyr_matches_python(self):
+        print("\n--- Test: GYR numpy engine == python engine ---")
+        raw = [_raw_packet(1700000000000 + i * 1280, 'gxyz', 64 * 3, scale=3) for i in range(4)]
+        self._assert_engines_match(gyr, raw)
+
+    def test_ain_matches_python(self):
+        print("\n--- Test: AIN numpy engine == python engine ---")
+        raw = [_raw_packet(1700000000000 + i * 1000, 'ain', 10 * 2, odr=10) for i in range(3)]
+        self._assert_engines_match(ain, raw)
+
+    def test_fft_matches_python(self):
+        print("\n--- Test: FFT numpy engine == python engine ---")
+        raw = [_raw_packet(1700000000000, 'fft', 512, axis='0')]
+        self._assert_engines_match(fft, raw)
+
+    def test_truncated_and_zero_odr_packets(self):
+        """A trailing partial sample is dropped and ODR=0 keeps every sample on the anchor."""
+        print("\n--- Test: Partial sample + ODR=0 ---")
+        raw = [_raw_packet(1700000000000, 'axyz', 3 * 5 + 2, odr=0)]
+        self._assert_engines_match(acc, raw)
+
+        item = acc.process(raw, engine='numpy')[0]
+        self.assertEqual(len(item['acc_x']), 5)
+        self.assertEqual({s['time'] for s in item['acc_x']}, {1700000000000})
+
+
+if __name__ == '__main__':
+    unittest.main()
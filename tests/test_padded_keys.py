@@ -0,0 +1,102 @@
+# tests/test_padded_keys.py
+import unittest
+import sys
+import os
+import math
+import random
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import formatters
+from utils.formatters import float_to_padded_string, padded_keys
+from utils.frame import np
+
+EDGE_CASES = [
+    0.0, -0.0, 0, -0, 1, -1, 7, 12345, 123456, -123456, 1.5, -1.5, 0.5, -0.5,
+    1e-4, 9.99e-5, 1e-5, -1e-5, 1.23e-7, 5e-324,                      # exponent range below 1e-4
+    1e16, 9999999999999998.0, 1.5e16, 1e20, -1e20, 1.7976931348623157e308,  # exponent range above
+    1e15, 10000.0, 9999.999, 99999.5, 1700000000000.0, 1700000000000.25, 1700000000000,
+    float('nan'), float('inf'), float('-inf'), True, False,
+]
+
+
+def _random_values(n, seed):
+    rnd = random.Random(seed)
+    values = []
+    for _ in range(n):
+        magnitude = 10.0 ** rnd.uniform(-8, 20)
+        value = rnd.choice([magnitude, round(magnitude), round(magnitude, 3), float(round(magnitude))])
+        values.append(-value if rnd.random() < 0.2 else value)
+    return values
+
+
+class TestPaddedKeys(unittest.TestCase):
+
+    def assertConforms(self, values, pad):
+        expected = [float_to_padded_string(v, pad) for v in values]
+        self.assertEqual(padded_keys(values, pad), expected, f"pad={pad}")
+        # The per-value fallback path on its own
+        self.assertEqual([formatters._padded_key(v, pad) for v in values], expected, f"pad={pad}")
+
+    def test_edge_cases(self):
+        print("\n--- Test: padded_keys == float_to_padded_string on the edge cases ---")
+        for pad in [0, 1, 3, 5, 8]:
+            self.assertConforms(EDGE_CASES, pad)
+            for value in EDGE_CASES:
+                self.assertConforms([value], pad)
+
+    def test_trailing_point_and_exponents(self):
+        self.assertEqual(padded_keys([1e16], 5), ['10000000000000000.0'])
+        self.assertEqual(padded_keys([1e-5], 5), ['00000.00001'])
+        self.assertEqual(padded_keys([-2.5, -0.0], 5), ['-00002.5', '-00000.0'])
+        self.assertEqual(padded_keys([42], 5), ['00042.0'])
+        self.assertEqual(padded_keys([], 5), [])
+
+    def test_random_values(self):
+        for seed in range(5):
+            values = _random_values(2000, seed)
+            for pad in [0, 3, 5]:
+                self.assertConforms(values, pad)
+
+    def test_timestamp_arrays(self):
+        times = [1700000000000 + i * 19.53125 for i in range(5000)]
+        for pad in [3, 5]:
+            self.assertConforms(times, pad)
+            self.assertConforms([t - 1699999999990 for t in times], pad)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_arrays(self):
+        times = 1700000000000 + np.arange(1000) * 19.53125
+        self.assertEqual(padded_keys(times, 5), [float_to_padded_string(t, 5) for t in times.tolist()])
+        freqs = np.arange(-5, 200, dtype=np.int64)
+        self.assertEqual(padded_keys(freqs, 3), [float_to_padded_string(f, 3) for f in freqs.tolist()])
+        nan = np.array([1.0, math.nan, 2.0])
+        self.assertEqual(padded_keys(nan, 3), ['001.0', 'nan.0', '002.0'])
+
+    def test_map_keys_shared_between_keys(self):
+        print("\n--- Test: acc_x/acc_y/acc_z map keys are built once and match the per-sample keys ---")
+        times = [1700000000000 + i * 19.53125 for i in range(640)]
+        item = {'time': times[0], **{k: [{'time': t, 'val': float(i)} for i, t in enumerate(times)]
+                                     for k in ['acc_x', 'acc_y', 'acc_z']}}
+        converted = formatters.convert_item_format(item, 'map')
+        expected = {float_to_padded_string(t, 5): float(i) for i, t in enumerate(times)}
+        for key in ['acc_x', 'acc_y', 'acc_z']:
+            self.assertEqual(list(converted[key].items()), list(expected.items()))
+
+        cache = formatters.MapKeyCache()
+        first = cache.keys(times, 5)
+        self.assertIs(cache.keys(list(times), 5), first)
+        self.assertIsNot(cache.keys(times, 3), first)
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_faster_than_per_sample_calls(self):
+        print("\n--- Test: Bulk map keys are faster than float_to_padded_string per sample ---")
+        times = [1700000000000 + i * 19.53125 for i in range(20000)]
+        per_sample = min(timeit.repeat(lambda: [float_to_padded_string(t, 5) for t in times], number=3, repeat=3))
+        bulk = min(timeit.repeat(lambda: padded_keys(times, 5), number=3, repeat=3))
+        print(f"per sample: {per_sample / 3 * 1000:.2f} ms, bulk: {bulk / 3 * 1000:.2f} ms")
+        self.assertLess(bulk, per_sample)
+
+
+if __name__ == '__main__':
+    unittest.main()
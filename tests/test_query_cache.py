@@ -0,0 +1,107 @@
+# tests/test_query_cache.py
+import unittest
+import sys
+import os
+import time
+import random
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from db.cache import QueryCache, IntervalCache, estimate_items_bytes
+from tests.test_segmented_queries import InMemoryDynamoClient, DEVICE
+
+
+class CountingClient(InMemoryDynamoClient):
+    def __init__(self, times):
+        super().__init__(times)
+        self.calls = 0
+
+    def query(self, **request):
+        self.calls += 1
+        return super().query(**request)
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_lru_eviction_by_size(self):
+        print("\n--- Test: LRU eviction by byte cap ---")
+        cache = QueryCache(max_bytes=100, freshness_ms=0)
+        cache.put('a', 1, 40)
+        cache.put('b', 2, 40)
+        cache.get('a')  # 'b' becomes least recently used
+        cache.put('c', 3, 40)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.current_bytes, 100)
+
+    def test_freshness_horizon(self):
+        print("\n--- Test: Only ranges older than the freshness horizon are cacheable ---")
+        cache = QueryCache(max_bytes=100, freshness_ms=60000)
+        now = 10 ** 12
+        self.assertTrue(cache.is_cacheable(now - 60001, now_ms=now))
+        self.assertFalse(cache.is_cacheable(now - 1000, now_ms=now))
+        self.assertFalse(QueryCache(max_bytes=0).is_cacheable(0))
+
+    def test_estimate_grows_with_samples(self):
+        small = [{'id': 'x', 'axyz': [Decimal(1)] * 10}]
+        large = [{'id': 'x', 'axyz': [Decimal(1)] * 1000}]
+        self.assertGreater(estimate_items_bytes(large), estimate_items_bytes(small) + 1000 * 8)
+
+    def test_read_through(self):
+        print("\n--- Test: query_paginated read-through cache ---")
+        original_client, original_cache = access.client, access.range_cache
+        fake = CountingClient(range(1000, 50000, 1280))
+        access.client = fake
+        access.range_cache = IntervalCache(max_bytes=10 ** 7, freshness_ms=60000)
+        try:
+            first = access.query_paginated('t', DEVICE, 0, 100000, limit=10, fast_decode=True)
+            calls = fake.calls
+            second = access.query_paginated('t', DEVICE, 0, 100000, limit=10, fast_decode=True)
+            self.assertEqual(first, second)
+            self.assertEqual(fake.calls, calls, "Historical window must be served from the cache")
+            self.assertEqual(access.range_cache.stats()['hits'], 1)
+
+            # A window reaching 'now' only caches its historical part: the recent gap is always queried
+            now = int(time.time() * 1000)
+            access.query_paginated('t', DEVICE, 60000, now, limit=100, fast_decode=True)
+            calls = fake.calls
+            access.query_paginated('t', DEVICE, 60000, now, limit=100, fast_decode=True)
+            self.assertEqual(fake.calls, calls + 1)
+        finally:
+            access.client, access.range_cache = original_client, original_cache
+
+    def test_sliding_windows_fetch_only_gaps(self):
+        print("\n--- Test: Overlapping windows reuse cached intervals and splice the gaps ---")
+        original_client, original_cache = access.client, access.range_cache
+        rnd = random.Random(8)
+        times = sorted(rnd.sample(range(0, 400000), 300))
+        fake = CountingClient(times)
+        access.client = fake
+        try:
+            for limit in [None, 1, 7, 40]:
+                access.range_cache = IntervalCache(max_bytes=10 ** 7, freshness_ms=0)
+                for k in range(12):
+                    start = rnd.randint(0, 300000)
+                    end = start + rnd.randint(0, 120000)
+                    expected = access.query_paginated('t', DEVICE, start, end, limit=limit, fast_decode=True,
+                                                      use_cache=False)
+                    actual = access.query_paginated('t', DEVICE, start, end, limit=limit, fast_decode=True)
+                    self.assertEqual(expected, actual, f"limit={limit} window={start}-{end}")
+
+            # Window N+1 overlapping window N by 90% only queries the new 10%
+            access.range_cache = IntervalCache(max_bytes=10 ** 7, freshness_ms=0)
+            access.query_paginated('t', DEVICE, 100000, 200000, limit=None, fast_decode=True)
+            calls = fake.calls
+            items, _ = access.query_paginated('t', DEVICE, 110000, 210000, limit=None, fast_decode=True)
+            self.assertEqual([int(i['time']) for i in items], [t for t in times if 110000 <= t <= 210000])
+            self.assertEqual(fake.calls - calls, 1 + sum(200000 < t <= 210000 for t in times) // fake.PAGE_SIZE)
+            self.assertEqual(access.range_cache.stats()['segments'], 1)
+        finally:
+            access.client, access.range_cache = original_client, original_cache
+
+if __name__ == '__main__':
+    unittest.main()
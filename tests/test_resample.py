@@ -0,0 +1,92 @@
+# tests/test_resample.py
+import unittest
+import sys
+import os
+import copy
+import random
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc, gyr
+from utils import corrector, formatters, mergers, resample
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, call_handler
+
+START = 1700000000000
+
+
+def _corrected(processor, values_key, times, fmt='dict_array'):
+    raw = [_raw_packet(t, values_key, 64 * 3) for t in times]
+    if fmt == 'frame':
+        items = processor.process(raw, fmt='frame').sorted()
+        return mergers.merge_items_in_group(corrector.apply_correction(items, True, True))
+    items = sorted(processor.process(raw), key=lambda x: x['time'])
+    return [mergers.merge_items_in_group(corrector.apply_correction(items, True, True))]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestResample(unittest.TestCase):
+
+    def test_linear_signal_is_reproduced(self):
+        print("\n--- Test: Interpolation of a linear signal is exact on the epoch grid ---")
+        rnd = random.Random(1)
+        times = np.cumsum([START + 3.7] + [rnd.uniform(15, 25) for _ in range(999)])
+        grid, (values,) = resample.resample_series(times, [0.5 * (times - START) + 2], 10.0)
+        self.assertTrue((grid % 10.0 == 0).all())
+        self.assertEqual(grid[0], START + 10)
+        self.assertTrue(np.allclose(values, 0.5 * (grid - START) + 2))
+        self.assertEqual(len(grid), int((times[-1] - grid[0]) // 10) + 1)
+
+    def test_gaps_are_not_bridged(self):
+        grid, _ = resample.resample_series([0.0, 20.0, 40.0, 1000.0, 1020.0], [np.zeros(5)], 10.0)
+        self.assertEqual(grid.tolist(), [0.0, 10.0, 20.0, 30.0, 40.0, 1000.0, 1010.0, 1020.0])
+        grid, (values,) = resample.resample_series([5.0], [[1.0]], 10.0)
+        self.assertEqual(len(grid), 0)
+
+    def test_acc_and_gyr_align_by_index(self):
+        print("\n--- Test: acc and gyr with different packet times share one grid ---")
+        acc_items = _corrected(acc, 'axyz', [START + 600 + i * 1280 for i in range(50)])
+        gyr_items = _corrected(gyr, 'gxyz', [START + 611 + i * 1280 for i in range(50)])
+        resample.resample_items(acc_items, 50)
+        resample.resample_items(gyr_items, 50)
+        acc_times = [s['time'] for s in acc_items[0]['acc_x']]
+        gyr_times = [s['time'] for s in gyr_items[0]['gyr_x']]
+        # Same grid: one list is a slice of the other
+        offset = acc_times.index(gyr_times[0])
+        self.assertEqual(acc_times[offset:], gyr_times[:len(acc_times) - offset])
+        self.assertTrue(all(t % 20 == 0 for t in acc_times))
+        self.assertEqual(set(acc_items[0]['acc_x'][0]), {'time', 'val'})
+
+    def test_frame_matches_dict_items(self):
+        print("\n--- Test: Resampled frames == resampled dict items, every format ---")
+        times = [START + 600 + i * 1280 for i in range(40)]
+        items = resample.resample_items(_corrected(acc, 'axyz', times), 33)
+        frame = resample.resample_frame(_corrected(acc, 'axyz', times, fmt='frame'), 33)
+        for output_format in ['map', 'combined_tuple', 'dict_array']:
+            expected = [formatters.convert_item_format(copy.deepcopy(item), output_format) for item in items]
+            self.assertEqual(formatters.convert_frame(frame, output_format), expected, output_format)
+        self.assertEqual(len(items[0]['tamb']), 40)
+
+
+class TestHandlerResample(HandlerTestCase):
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_resample_hz(self):
+        print("\n--- Test: resample_hz puts acc and gyr rows on the same timestamps ---")
+        for engine in ['python', 'numpy']:
+            status, body = call_handler(table_name='acc,gyr', id='ASENSE00000022', resample_hz='25',
+                                        decode_engine=engine, output_format='combined_tuple')
+            self.assertEqual(status, 200)
+            acc_rows, gyr_rows = body['data']['acc'][0]['acc'], body['data']['gyr'][0]['gyr']
+            self.assertEqual([r[0] for r in acc_rows], [r[0] for r in gyr_rows])
+            self.assertTrue(all(r[0] % 40 == 0 for r in acc_rows))
+
+    def test_invalid_rate_is_ignored(self):
+        _, expected = call_handler(table_name='acc', id='ASENSE00000022')
+        for value in ['0', '-5', 'fast', '1e9']:
+            self.assertEqual(call_handler(table_name='acc', id='ASENSE00000022', resample_hz=value)[1], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
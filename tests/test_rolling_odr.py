@@ -0,0 +1,177 @@
+# tests/test_rolling_odr.py
+import unittest
+import sys
+import os
+import copy
+import random
+import statistics
+import tempfile
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access, calibration
+from db.calibration import CalibrationStore
+from processors import acc
+from utils import corrector, formatters, odr
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler, START
+from tests.test_cursor import collect_pages
+from tests.test_streaming_corrector import _glitchy_times
+
+
+def _drifting_times(n, seed=5):
+    """Packet period drifting from 1250 to 1310ms, with long/short glitch pairs."""
+    rnd = random.Random(seed)
+    times, t = [], START + 600
+    while len(times) < n:
+        period = 1250 + 60 * len(times) // n
+        if rnd.random() < 0.1:
+            times.append(t + period + 48)
+            t += 2 * period
+        else:
+            t += period
+        times.append(t)
+    return times[:n]
+
+
+def _stream(items, chunk_size, odr_window, raw=None):
+    """Corrects 'items' chunk by chunk; with 'raw', as SensorFrames decoded from the raw packets."""
+    state, out, start = None, [], 0
+    while start < len(items):
+        chunk = copy.deepcopy(items[start:start + chunk_size + 1])
+        lookahead = start + chunk_size < len(items)
+        as_frame = raw is not None
+        if as_frame:
+            chunk = acc.process(copy.deepcopy(raw[start:start + chunk_size + 1]), fmt='frame')
+        stream = corrector.StreamingCorrector(True, True, state=state, odr_window=odr_window)
+        chunk = stream.correct(chunk, lookahead=lookahead)
+        state = stream.state()
+        out.extend(formatters.convert_frame(chunk, 'dict_array') if as_frame else chunk)
+        start += chunk_size
+    return out
+
+
+class TestRollingMedian(unittest.TestCase):
+
+    def test_matches_statistics_median(self):
+        print("\n--- Test: Two-heap rolling median == statistics.median of the window ---")
+        rnd = random.Random(1)
+        for window in [1, 2, 3, 8, 31]:
+            values = [rnd.choice([1250, 1280, 1280, 1290, 1305, rnd.randint(1000, 1500)]) for _ in range(400)]
+            estimator = odr.RollingMedian(window)
+            for i, value in enumerate(values):
+                estimator.push(value)
+                self.assertEqual(estimator.median(), statistics.median(values[max(0, i - window + 1):i + 1]))
+
+    def test_rolling_medians_skip_gaps(self):
+        times = [0] + [1280 * i + 90000 * (i > 5) for i in range(1, 20)]
+        medians, estimator = odr.rolling_medians(times, 4, fallback=1300.0)
+        self.assertEqual(medians[:odr.MIN_WINDOW_DELTAS], [1300.0] * 4 + [1280] * 4)
+        self.assertEqual(len(estimator), 4)
+        self.assertNotIn(91280, estimator.values)
+
+
+class TestRollingCorrection(unittest.TestCase):
+
+    def test_drift_is_followed(self):
+        print("\n--- Test: Rolling median catches glitches a page-wide median misses under drift ---")
+        times = _drifting_times(200)
+        items = acc.process([_raw_packet(t, 'axyz', 3) for t in times])
+        whole = corrector.apply_correction(copy.deepcopy(items), True, True)
+        rolling = corrector.StreamingCorrector(True, True, odr_window=32).correct(copy.deepcopy(items))
+        # Every glitch packet was sent 48ms late: the local period gives back the right shift
+        errors = lambda out: [abs(a['time'] - b['time'] - 48) for a, b in zip(items, out) if a['time'] != b['time']]
+        self.assertTrue(errors(rolling))
+        self.assertLess(max(errors(rolling)), max(errors(whole)))
+        self.assertLessEqual(max(errors(rolling)), 6)
+
+    def test_chunked_matches_whole(self):
+        print("\n--- Test: Streaming rolling-median correction in chunks == one pass ---")
+        raw = [_raw_packet(t, 'axyz', 3 * 4) for t in _drifting_times(120)]
+        items = acc.process(copy.deepcopy(raw))
+        for window in [4, 32]:
+            expected = corrector.StreamingCorrector(True, True, odr_window=window).correct(copy.deepcopy(items))
+            for chunk_size in [1, 5, 37]:
+                self.assertEqual(expected, _stream(items, chunk_size, window), f"window={window} chunk={chunk_size}")
+            if np is not None:
+                expected_frames = formatters.convert_frame(corrector.StreamingCorrector(
+                    True, True, odr_window=window).correct(acc.process(copy.deepcopy(raw), fmt='frame')),
+                    'dict_array')
+                self.assertEqual(expected_frames, _stream(items, 9, window, raw=raw))
+
+    def test_calibrated_delta_seeds_short_chunks(self):
+        items = acc.process([_raw_packet(START + i * 1310, 'axyz', 3) for i in range(4)])
+        stream = corrector.StreamingCorrector(True, True, calibrated_delta=1310.0)
+        stream.correct(copy.deepcopy(items), lookahead=True)
+        self.assertEqual(stream.state()['median_delta'], 1310.0)
+        self.assertIsNone(stream.learned_delta())
+
+
+class TestCalibrationStore(unittest.TestCase):
+
+    def test_persists_and_expires(self):
+        print("\n--- Test: Calibration store survives a new process and ignores stale entries ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'calibration.json')
+            store = CalibrationStore(path=path, max_age_ms=1000)
+            self.assertIsNone(store.get('t', 'D', now_ms=0))
+            store.update('t', 'D', 1283.5, now_ms=0)
+            store.update('t', 'E', None, now_ms=0)
+
+            reloaded = CalibrationStore(path=path, max_age_ms=1000)
+            self.assertEqual(reloaded.get('t', 'D', now_ms=500), 1283.5)
+            self.assertIsNone(reloaded.get('t', 'D', now_ms=2000))
+            self.assertEqual(reloaded.stats()['devices'], 1)
+
+    def test_writes_only_meaningful_changes(self):
+        print("\n--- Test: Calibration store rewrites its file on real changes or on the timer ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'calibration.json')
+            store = CalibrationStore(path=path)
+            store.update('t', 'D', 1283.5, now_ms=0)
+            self.assertEqual(store.stats()['saves'], 1)
+            # Refinements within SAVE_TOLERANCE stay in memory until SAVE_INTERVAL_MS has passed
+            for k in range(1, 50):
+                store.update('t', 'D', 1283.5 + k * 1e-3, now_ms=k)
+            self.assertEqual(store.stats()['saves'], 1)
+            self.assertEqual(store.get('t', 'D', now_ms=50), 1283.549)
+            self.assertEqual(CalibrationStore(path=path).get('t', 'D', now_ms=50), 1283.5)
+
+            store.update('t', 'D', 1290.0, now_ms=60)
+            store.update('t', 'E', 1280.0, now_ms=70)
+            store.update('t', 'E', 1280.1, now_ms=calibration.SAVE_INTERVAL_MS + 70)
+            self.assertEqual(store.stats()['saves'], 4)
+            store.update('t', 'E', 1280.2, now_ms=calibration.SAVE_INTERVAL_MS + 80)
+            store.flush()
+            store.flush()
+            self.assertEqual(store.stats()['saves'], 5)
+            self.assertEqual(CalibrationStore(path=path).get('t', 'E', now_ms=0), 1280.2)
+
+
+class TestHandlerCalibration(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        access.client = TopicDynamoClient(self.DEVICES, times=_glitchy_times(45))
+
+    def test_long_request_calibrates_short_one(self):
+        print("\n--- Test: A long auto_odr request stores the period used by later short ones ---")
+        params = dict(table_name='acc', id='ASENSE00000022', auto_odr='true', merge='false')
+        call_handler(**params)
+        period = calibration.calibration_store.get('asense_table_acc', 'ASENSE00000022')
+        self.assertIsNotNone(period)
+        self.assertTrue(odr.is_valid_delta(period))
+
+    def test_paged_rolling_matches_unpaged(self):
+        print("\n--- Test: Paged rolling-median correction (cursor state) == unpaged ---")
+        params = dict(table_name='acc', id='ASENSE00000022', merge='false', auto_odr='true',
+                      odr_window='8', output_format='dict_array')
+        _, unpaged = call_handler(**params)
+        paged, pages = collect_pages(max_bytes=str(4 * 11000), **params)
+        self.assertGreater(pages, 5)
+        self.assertEqual(paged, unpaged['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# tests/test_segmented_queries.py
+import unittest
+import sys
+import os
+import random
+import bisect
+import threading
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import access
+from db.cache import QueryCache, IntervalCache
+
+DEVICE = 'ASENSE00000022'
+
+
+class InMemoryDynamoClient:
+    """
+    Tiny stand-in for the low-level DynamoDB client: id + time BETWEEN queries with Limit,
+    ExclusiveStartKey and a small page size, so LastEvaluatedKey loops are exercised.
+    """
+    PAGE_SIZE = 7
+
+    def __init__(self, times):
+        self.read = 0  # items returned so far, i.e. what DynamoDB would bill
+        self.rows = [
+            {'id': {'S': DEVICE}, 'time': {'N': str(t)}, 'seq': {'N': str(i)},
+             'axyz': {'L': [{'N': str(i)}, {'N': '-1'}, {'N': '2'}]}}
+            for i, t in enumerate(sorted(times))
+        ]
+        self.times = sorted(times)  # bisected by query()
+
+    def query(self, **request):
+        values = request['ExpressionAttributeValues']
+        start, end = int(values[':start']['N']), int(values[':end']['N'])
+        if 'ExclusiveStartKey' in request:
+            start = max(start, int(request['ExclusiveStartKey']['time']['N']) + 1)
+        rows = [r for r in self.rows[bisect.bisect_left(self.times, start):bisect.bisect_right(self.times, end)]
+                if r['id']['S'] == values[':id']['S']]
+
+        page_size = min(self.PAGE_SIZE, request.get('Limit', self.PAGE_SIZE))
+        page = rows[:page_size]
+        if 'IndexName' in request:
+            page = [{'time': r['time']} for r in page]
+
+        self.read += len(page)
+        response = {'Items': page}
+        if page and (len(rows) > page_size or request.get('Limit') == len(page)):
+            response['LastEvaluatedKey'] = {'id': {'S': DEVICE}, 'time': page[-1]['time']}
+        return response
+
+
+class ConcurrencyProbeClient(InMemoryDynamoClient):
+    """Slow in-memory client recording the largest number of queries running at once."""
+
+    def __init__(self, times):
+        super().__init__(times)
+        self._lock = threading.Lock()
+        self.active = self.max_active = 0
+
+    def query(self, **request):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.005)
+        try:
+            return super().query(**request)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestSegmentedQueries(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(5)
+        self.times = sorted(rnd.sample(range(1000, 200000), 150))
+        self._original = access.client, access.page_cache, access.range_cache
+        access.client = InMemoryDynamoClient(self.times)
+        # Disabled caches: every call must really run its (segmented or sequential) queries
+        access.page_cache = QueryCache(max_bytes=0)
+        access.range_cache = IntervalCache(max_bytes=0)
+
+    def tearDown(self):
+        access.client, access.page_cache, access.range_cache = self._original
+
+    def test_paginated_matches_sequential(self):
+        print("\n--- Test: Segmented query_paginated == sequential ---")
+        for limit in [1, 32, 149, 150, 151, 500]:
+            for fast_decode in [True, False]:
+                if fast_decode:
+                    expected = access.query_paginated('t', DEVICE, 0, 250000, limit=limit, fast_decode=True)
+                else:
+                    # Sequential Decimal path through the client (same items the resource returns)
+                    expected = access._paginate(access._ClientTable('t', DEVICE, 0, 250000), DEVICE, 0, 250000, limit)
+                for segments in [2, 5, 16]:
+                    for size_from_index in [False, True]:
+                        actual = access.query_paginated('t', DEVICE, 0, 250000, limit=limit, fast_decode=fast_decode,
+                                                        segments=segments, size_from_index=size_from_index)
+                        self.assertEqual(expected, actual, f"limit={limit} segments={segments} index={size_from_index}")
+
+    def test_segmented_reads_stay_within_limit(self):
+        print("\n--- Test: Segmented query_paginated reads close to 'limit' items ---")
+        first_slice = sum(1 for t in self.times if t <= 250000 // 8)
+        for limit in [1, 10, 32, 149]:
+            for size_from_index in [False, True]:
+                access.client.read = 0
+                items, _ = access.query_paginated('t', DEVICE, 0, 250000, limit=limit, fast_decode=True,
+                                                  segments=8, size_from_index=size_from_index)
+                self.assertEqual(len(items), limit)
+                if size_from_index:
+                    # Table items, plus the GSI keys that sized the slices
+                    self.assertLessEqual(access.client.read, 2 * limit)
+                elif limit <= first_slice:
+                    # The first slice alone fills the page: no other slice was launched
+                    self.assertEqual(access.client.read, limit)
+
+    def test_slices_run_concurrently(self):
+        print("\n--- Test: Sparse ranges keep several slice queries in flight ---")
+        client = access.client = ConcurrencyProbeClient(self.times)
+        expected = access.query_paginated('t', DEVICE, 0, 250000, limit=140, fast_decode=True)
+        client.max_active = 0
+        actual = access.query_paginated('t', DEVICE, 0, 250000, limit=140, fast_decode=True, segments=16)
+        self.assertEqual(actual, expected)
+        self.assertGreater(client.max_active, 1)
+
+    def test_timestamps_limit(self):
+        access.client.read = 0
+        self.assertEqual(access.query_timestamps_only('t', DEVICE, 500, 150000, segments=4, limit=20),
+                         [t for t in self.times if 500 <= t <= 150000][:20])
+        self.assertEqual(access.client.read, 20)
+
+    def test_timestamps_match_sequential(self):
+        print("\n--- Test: Segmented query_timestamps_only == sequential ---")
+        expected = access.query_timestamps_only('t', DEVICE, 500, 150000, fast_decode=True)
+        self.assertEqual(expected, [t for t in self.times if 500 <= t <= 150000])
+        for segments in [2, 3, 32]:
+            self.assertEqual(expected, access.query_timestamps_only('t', DEVICE, 500, 150000, segments=segments))
+
+    def test_split_range(self):
+        print("\n--- Test: Range splitting ---")
+        self.assertEqual(access._split_range(0, 9, 3), [(0, 2), (3, 5), (6, 9)])
+        self.assertEqual(access._split_range(5, 6, 8), [(5, 5), (6, 6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
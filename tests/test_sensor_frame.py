@@ -0,0 +1,106 @@
+# tests/test_sensor_frame.py
+import unittest
+import sys
+import os
+import copy
+import random
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc, gyr, fft
+from utils import corrector, mergers, formatters
+from utils.frame import np
+
+FORMATS = ['map', 'tuple_array', 'dict_array', 'combined_tuple', 'combined_dict']
+
+
+def _raw_packet(time_val, values_key, n_values, **extra):
+    rnd = random.Random(time_val)
+    packet = {
+        'id': 'TEST_DEVICE',
+        'time': Decimal(time_val),
+        'odr': Decimal(50),
+        'scale': Decimal(2),
+        'seq': Decimal(1),
+        values_key: [Decimal(rnd.randint(-32768, 32767)) for _ in range(n_values)],
+    }
+    packet.update(extra)
+    return packet
+
+
+def _glitchy_acc_packets():
+    # Normal -> Long -> Short (glitch at index 2) + a 1250ms stretch for auto ODR, shuffled.
+    times = [0, 1280, 2585, 3840, 5090, 6340]
+    raw = [_raw_packet(1700000000000 + t, 'axyz', 64 * 3) for t in times]
+    random.Random(1).shuffle(raw)
+    return raw
+
+
+def _legacy_pipeline(processor, raw, output_format, merge, fft_topic=False, **flags):
+    items = processor.process(raw)
+    items.sort(key=lambda x: x.get('time', 0))
+    if not fft_topic:
+        items = corrector.apply_correction(items, **flags)
+    if merge:
+        items = mergers.merge_fft_axes_by_hour(items) if fft_topic else [mergers.merge_items_in_group(items)]
+    return [formatters.convert_item_format(item, output_format) for item in items]
+
+
+def _frame_pipeline(processor, raw, output_format, merge, fft_topic=False, **flags):
+    frame = processor.process(raw, fmt='frame').sorted()
+    if not fft_topic:
+        frame = corrector.apply_correction(frame, **flags)
+    if merge:
+        frame = mergers.merge_fft_axes_by_hour(frame) if fft_topic else mergers.merge_items_in_group(frame)
+    return formatters.convert_frame(frame, output_format)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestSensorFrame(unittest.TestCase):
+
+    def _assert_pipelines_match(self, processor, raw, **kwargs):
+        for output_format in FORMATS:
+            for merge in [True, False]:
+                expected = _legacy_pipeline(processor, copy.deepcopy(raw), output_format, merge, **kwargs)
+                actual = _frame_pipeline(processor, copy.deepcopy(raw), output_format, merge, **kwargs)
+                self.assertEqual(expected, actual, f"Mismatch for format={output_format}, merge={merge}")
+
+    def test_acc_glitch_fix_and_auto_odr(self):
+        print("\n--- Test: Frame pipeline == dict_array pipeline (ACC, correction + auto ODR) ---")
+        self._assert_pipelines_match(acc, _glitchy_acc_packets(), enable_glitch_fix=True, enable_auto_odr=True)
+
+    def test_acc_glitch_fix_only(self):
+        print("\n--- Test: Frame pipeline == dict_array pipeline (ACC, correction only) ---")
+        self._assert_pipelines_match(acc, _glitchy_acc_packets(), enable_glitch_fix=True)
+
+    def test_gyr_uncorrected(self):
+        print("\n--- Test: Frame pipeline == dict_array pipeline (GYR, no correction) ---")
+        raw = [_raw_packet(1700000000000 + i * 1280, 'gxyz', 64 * 3) for i in range(5)]
+        self._assert_pipelines_match(gyr, raw)
+
+    def test_fft_hourly_axes(self):
+        """The 14:00 hour misses axis 0, so its merged item must not have an 'fft_x' key at all."""
+        print("\n--- Test: Frame pipeline == dict_array pipeline (FFT hourly merge) ---")
+        hour = 3600 * 1000
+        base = 1700000000000 - 1700000000000 % hour
+        raw = [
+            _raw_packet(base + hour - 300, 'fft', 512, axis='0'),
+            _raw_packet(base + hour - 200, 'fft', 512, axis='1'),
+            _raw_packet(base + hour - 100, 'fft', 512, axis='2'),
+            _raw_packet(base + hour + 100, 'fft', 512, axis='1'),
+            _raw_packet(base + hour + 200, 'fft', 512, axis='2'),
+        ]
+        self._assert_pipelines_match(fft, raw, fft_topic=True)
+
+        merged = _frame_pipeline(fft, raw, 'map', merge=True, fft_topic=True)
+        self.assertIn('fft_x', merged[0])
+        self.assertNotIn('fft_x', merged[1])
+
+    def test_to_items_round_trip(self):
+        print("\n--- Test: SensorFrame.to_items == dict_array processor output ---")
+        raw = [_raw_packet(1700000000000 + i * 1280, 'axyz', 64 * 3) for i in range(3)]
+        self.assertEqual(acc.process(raw), acc.process(raw, fmt='frame').to_items())
+
+
+if __name__ == '__main__':
+    unittest.main()
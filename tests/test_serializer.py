@@ -0,0 +1,83 @@
+# tests/test_serializer.py
+import unittest
+import sys
+import os
+import io
+import json
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import formatters, serializer
+from utils.frame import np
+
+
+def _body(n_items=5, samples=200, output_format='map', seed=0):
+    rnd = random.Random(seed)
+    items = []
+    for p in range(n_items):
+        t = 1700000000000 + p * 1280
+        item = {'id': 'ASENSE00000022', 'time': t, 'datetime': '2023-11-14T22:13:20Z', 'scale': 2.0, 'seq': p}
+        for key in ['acc_x', 'acc_y', 'acc_z']:
+            item[key] = [{'time': t - 1280 + i * 19.53125, 'val': rnd.gauss(0, 1)} for i in range(samples)]
+        item['tamb'] = [{'time': t, 'val': 21.5}]
+        items.append(formatters.convert_item_format(item, output_format))
+    return {'data': items, 'next_timestamp': 1700000099999, 'cursor': 'abc.def'}
+
+
+class TestSerializer(unittest.TestCase):
+
+    def test_stdlib_output_is_unchanged(self):
+        body = _body(output_format='combined_dict')
+        self.assertEqual(serializer.dumps(body, engine='json'), json.dumps(body))
+
+    @unittest.skipIf(serializer.orjson is None, "orjson is not installed")
+    def test_engines_agree(self):
+        print("\n--- Test: orjson and stdlib bodies decode to the same values ---")
+        for output_format in ['map', 'tuple_array', 'combined_tuple', 'combined_dict']:
+            body = _body(output_format=output_format)
+            self.assertEqual(json.loads(serializer.dumps(body, engine='orjson')),
+                             json.loads(serializer.dumps(body, engine='json')), output_format)
+        self.assertEqual(json.loads(serializer.dumps({'a': 1e16, 'b': -0.0, 'c': [5e-324]})),
+                         {'a': 1e16, 'b': -0.0, 'c': [5e-324]})
+
+    def test_chunked_matches_dumps(self):
+        print("\n--- Test: iter_encode chunks join to dumps_bytes, every engine and chunk size ---")
+        bodies = [_body(n_items=7, samples=50), _body(output_format='combined_tuple'),
+                  {'data': {'acc': _body(3, 10)['data'], 'gyr': []}, 'errors': {}},
+                  {'data': []}, [], {}, 'text', 12.5, None]
+        for engine in serializer.ENGINES:
+            for body in bodies:
+                expected = serializer.dumps_bytes(body, engine)
+                for chunk_items in [1, 2, 64]:
+                    chunks = list(serializer.iter_encode(body, engine, chunk_items))
+                    self.assertEqual(b''.join(chunks), expected, f"{engine} {chunk_items}")
+
+        body = _body(n_items=20, samples=20)
+        fp = io.BytesIO()
+        written = serializer.dump(body, fp, chunk_items=4)
+        self.assertEqual(written, len(fp.getvalue()))
+        self.assertEqual(json.loads(fp.getvalue()), json.loads(serializer.dumps(body)))
+        # The largest chunk holds a few items, not the page
+        self.assertLess(max(map(len, serializer.iter_encode(body, chunk_items=4))), written / 4)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_values(self):
+        body = {'times': np.arange(3, dtype=np.int64) + 1700000000000, 'vals': np.array([0.5, -1.25]),
+                'scalar': np.float64(2.5), 'grid': np.arange(6.0).reshape(2, 3)[:, ::2]}
+        expected = {'times': [1700000000000, 1700000000001, 1700000000002], 'vals': [0.5, -1.25],
+                    'scalar': 2.5, 'grid': [[0.0, 2.0], [3.0, 5.0]]}
+        for engine in serializer.ENGINES:
+            self.assertEqual(json.loads(serializer.dumps(body, engine)), expected, engine)
+
+    def test_unknown_types_raise(self):
+        for engine in serializer.ENGINES:
+            with self.assertRaises(TypeError):
+                serializer.dumps({'x': object()}, engine)
+
+    def test_resolve_engine(self):
+        self.assertEqual(serializer.resolve_engine('nope'), 'json')
+        self.assertEqual(serializer.resolve_engine('orjson'), 'orjson' if serializer.orjson else 'json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# tests/test_streaming_corrector.py
+import unittest
+import sys
+import os
+import copy
+import random
+from unittest import mock
+from botocore.exceptions import ClientError
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from db import access
+from processors import acc
+from utils import corrector, formatters
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, TopicDynamoClient, call_handler, START
+from tests.test_cursor import collect_pages
+
+FLAG_COMBINATIONS = [(True, False), (False, True), (True, True)]
+
+
+def _glitchy_times(n, seed=2):
+    """Mostly 1280ms apart, with long/short glitch pairs and a few 1250ms stretches."""
+    rnd = random.Random(seed)
+    times, t = [], START + 600
+    while len(times) < n:
+        roll = rnd.random()
+        if roll < 0.15:
+            times.append(t + 1310)
+            t += 2560
+            times.append(t)
+        elif roll < 0.25:
+            t += 1250
+            times.append(t)
+        else:
+            t += 1280
+            times.append(t)
+    return times[:n]
+
+
+def _stream(chunks_of, items, flags, as_frame):
+    """Feeds 'items' through a StreamingCorrector in chunks, each followed by one lookahead packet."""
+    window = [int(x['time']) for x in items]
+    state, out, start = None, [], 0
+    while start < len(items):
+        size = chunks_of(start)
+        chunk = copy.deepcopy(items[start:start + size + 1])
+        lookahead = start + size < len(items)
+        if as_frame:
+            chunk = acc.process(chunk, fmt='frame')
+        stream = corrector.StreamingCorrector(*flags, state=state)
+        chunk = stream.correct(chunk, lookahead=lookahead, window_times=lambda: window)
+        state = stream.state()
+        out.extend(formatters.convert_frame(chunk, 'dict_array') if as_frame else chunk)
+        start += size
+    return out
+
+
+class TestStreamingCorrector(unittest.TestCase):
+
+    def test_chunked_matches_whole(self):
+        print("\n--- Test: Streaming correction in random chunks == one apply_correction ---")
+        raw = [_raw_packet(t, 'axyz', 64 * 3) for t in _glitchy_times(60)]
+        rnd = random.Random(4)
+        for flags in FLAG_COMBINATIONS:
+            expected = corrector.apply_correction(acc.process(copy.deepcopy(raw)), *flags)
+            processed = acc.process(copy.deepcopy(raw))
+            for chunk_size in [1, 2, 3, 7, 59, 60]:
+                actual = _stream(lambda _: chunk_size, processed, flags, as_frame=False)
+                self.assertEqual(expected, actual, f"flags={flags} chunk={chunk_size}")
+            actual = _stream(lambda _: rnd.randint(1, 10), processed, flags, as_frame=False)
+            self.assertEqual(expected, actual, f"flags={flags} random chunks")
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_chunked_frames_match_whole(self):
+        print("\n--- Test: Streaming correction on SensorFrames == one apply_correction ---")
+        raw = [_raw_packet(t, 'axyz', 64 * 3) for t in _glitchy_times(40, seed=9)]
+        for flags in FLAG_COMBINATIONS:
+            expected = formatters.convert_frame(
+                corrector.apply_correction(acc.process(copy.deepcopy(raw), fmt='frame'), *flags), 'dict_array')
+            for chunk_size in [1, 4, 13]:
+                actual = _stream(lambda _: chunk_size, raw, flags, as_frame=True)
+                self.assertEqual(expected, actual, f"flags={flags} chunk={chunk_size}")
+
+    def test_state_is_json_serializable(self):
+        stream = corrector.StreamingCorrector(True, True)
+        items = acc.process([_raw_packet(t, 'axyz', 64 * 3) for t in _glitchy_times(5)])
+        stream.correct(items, lookahead=True, window_times=lambda: [x['time'] for x in items])
+        state = stream.state()
+        self.assertEqual(set(state), {'prev_time', 'median_delta'})
+        self.assertTrue(all(isinstance(v, (int, float)) for v in state.values()))
+
+
+class TestPagedCorrection(HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        access.client = TopicDynamoClient(self.DEVICES, times=_glitchy_times(45))
+
+    def test_paged_matches_unpaged(self):
+        print("\n--- Test: Corrected pages followed by cursor == unpaged corrected window ---")
+        for correction, auto_odr in FLAG_COMBINATIONS:
+            for engine in ['python', 'numpy'] if np is not None else ['python']:
+                params = dict(table_name='acc', id='ASENSE00000022', merge='false', decode_engine=engine,
+                              enable_correction=str(correction).lower(), auto_odr=str(auto_odr).lower(),
+                              output_format='dict_array')
+                _, unpaged = call_handler(**params)
+                paged, pages = collect_pages(max_bytes=str(4 * 11000), **params)
+                self.assertGreater(pages, 5)
+                self.assertEqual(paged, unpaged['data'], f"correction={correction} auto_odr={auto_odr} {engine}")
+
+    def test_window_times_are_bounded(self):
+        print("\n--- Test: The first page's median seed reads at most SEED_PACKETS index keys ---")
+        access.client = TopicDynamoClient(self.DEVICES, times=[START + i * 1280 for i in range(2000)], topics=['acc'])
+        fake = access.client.tables[('asense_table_acc', 'ASENSE00000022')]
+        times = lambda_function._window_times('asense_table_acc', 'ASENSE00000022', START, START + 3000 * 1280)
+        self.assertEqual(times, fake.times[:corrector.SEED_PACKETS])
+        self.assertEqual(fake.read, corrector.SEED_PACKETS)
+
+        # A table without the index fails once, then is not queried again
+        def no_index(**request):
+            raise ClientError({'Error': {'Code': 'ValidationException'}}, 'Query')
+        access.client = mock.Mock(query=mock.Mock(side_effect=no_index))
+        with mock.patch.object(lambda_function, '_tables_without_index', set()):
+            for _ in range(2):
+                self.assertIsNone(lambda_function._window_times('asense_table_ain', 'X', START + 1, START + 2))
+        self.assertEqual(access.client.query.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# tests/test_time_grid.py
+import unittest
+import sys
+import os
+import copy
+import random
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc, gyr
+from utils import corrector, formatters
+from utils.frame import SensorFrame, np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_vectorized_corrector import _random_times
+
+
+def _eager(frame):
+    """Materializes every lazy block, i.e. the frame as it was before time grids."""
+    for block in frame.blocks:
+        block.index
+    return frame
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestTimeGrid(unittest.TestCase):
+
+    def test_processors_build_lazy_time_blocks(self):
+        print("\n--- Test: Frame processors keep sample times as a per-packet grid ---")
+        frame = acc.process([_raw_packet(1700000000000, 'axyz', 64 * 3)], fmt='frame')
+        scalar, vector = frame.time_blocks()
+        self.assertIsNotNone(vector.grid)
+        self.assertEqual(vector.grid.dtype, np.float64)
+        self.assertEqual(scalar.grid.dtype, np.int64)
+        self.assertEqual(len(vector.grid.anchor), 1)
+
+        # Reading the index gives the same times as the eager decode
+        times = vector.index
+        self.assertIsNone(vector.grid)
+        self.assertEqual(times.tolist(), (1700000000000 - np.arange(63, -1, -1, dtype=np.float64) * 20.0).tolist())
+
+    def test_correction_edits_grid_only(self):
+        print("\n--- Test: Lazy grid correction == eager correction, without materializing ---")
+        rnd = random.Random(21)
+        for trial in range(100):
+            times = _random_times(rnd, rnd.randint(1, 25))
+            raw = [_raw_packet(t, 'axyz', 3 * rnd.choice([0, 1, 4, 64])) for t in times]
+            prev_time = rnd.choice([None, times[0] - rnd.choice([1280, 2585, 1250])])
+            for flags in [(True, False), (False, True), (True, True)]:
+                lazy = corrector.apply_correction(acc.process(copy.deepcopy(raw), fmt='frame'), *flags,
+                                                  prev_time=prev_time)
+                self.assertTrue(all(b.grid is not None for b in lazy.time_blocks()))
+                eager = corrector.apply_correction(_eager(acc.process(copy.deepcopy(raw), fmt='frame')), *flags,
+                                                   prev_time=prev_time)
+                self.assertEqual(formatters.convert_frame(eager, 'dict_array'),
+                                 formatters.convert_frame(lazy, 'dict_array'), f"trial={trial} flags={flags}")
+
+    def test_zero_odr_and_repeated_shifts(self):
+        print("\n--- Test: Zero-period packets and a second shift keep eager semantics ---")
+        raw = [_raw_packet(1700000000000 + t, 'gxyz', 3 * 8) for t in [0, 1280, 2585, 3840, 5120]]
+        raw[1]['odr'] = 0
+        lazy = gyr.process(copy.deepcopy(raw), fmt='frame')
+        eager = _eager(gyr.process(copy.deepcopy(raw), fmt='frame'))
+        for frame in (lazy, eager):
+            corrector.apply_correction(frame, True, False)
+            corrector.apply_correction(frame, True, True, median_delta=1300.0)
+        self.assertEqual(formatters.convert_frame(eager, 'map'), formatters.convert_frame(lazy, 'map'))
+
+    def test_take_and_concat_stay_lazy(self):
+        print("\n--- Test: take/sorted/concat operate on the per-packet grid ---")
+        times = [1700000000000 + 1280 * i for i in range(6)]
+        raw = [_raw_packet(t, 'axyz', 3 * 4) for t in times]
+        random.Random(2).shuffle(raw)
+        first, second = acc.process(raw[:3], fmt='frame'), acc.process(raw[3:], fmt='frame')
+
+        lazy = SensorFrame.concat([first, second]).sorted()
+        self.assertTrue(all(b.grid is not None for b in lazy.blocks))
+
+        # Mixed lazy/eager inputs fall back to concatenating the indexes
+        mixed = SensorFrame.concat([acc.process(raw[:3], fmt='frame'), _eager(acc.process(raw[3:], fmt='frame'))])
+        expected = formatters.convert_frame(acc.process(raw, fmt='frame').sorted(), 'map')
+        self.assertEqual(formatters.convert_frame(lazy, 'map'), expected)
+        self.assertEqual(formatters.convert_frame(mixed.sorted(), 'map'), expected)
+        self.assertEqual(formatters.convert_frame(lazy.merged(), 'map'),
+                         formatters.convert_frame(_eager(acc.process(raw, fmt='frame').sorted()).merged(), 'map'))
+
+    def test_merged_and_typed_grid_stay_lazy(self):
+        print("\n--- Test: merged() keeps the grid; typed_grid sends it instead of per-sample times ---")
+        from tests.test_typed_format import _array
+        rnd = random.Random(5)
+        times = _random_times(rnd, 12)
+        raw = [_raw_packet(t, 'axyz', 3 * rnd.choice([0, 4, 64])) for t in times]
+        lazy = corrector.apply_correction(acc.process(copy.deepcopy(raw), fmt='frame').sorted(), True, True)
+        eager = corrector.apply_correction(_eager(acc.process(copy.deepcopy(raw), fmt='frame').sorted()), True, True)
+
+        for frame, expected in [(lazy, eager), (lazy.merged(), eager.merged())]:
+            self.assertTrue(all(b.grid is not None for b in frame.time_blocks()))
+            typed = formatters.convert_frame(frame, formatters.TYPED_GRID)
+            self.assertTrue(all(b.grid is not None for b in frame.time_blocks()))
+            for typed_item, item in zip(typed, formatters.convert_frame(expected, 'dict_array')):
+                grid = typed_item['acc_x']['grid']
+                self.assertIs(grid, typed_item['acc_z']['grid'])
+                anchor, period, count, shift = (_array(grid[k]) for k in ['anchor', 'period', 'count', 'shift'])
+                # What a client does with the descriptor
+                decoded = np.concatenate([(a - np.arange(n - 1, -1, -1, dtype=np.float64) * p) - s
+                                          for a, p, n, s in zip(anchor, period, count, shift)])
+                self.assertEqual(decoded.tolist(), [s['time'] for s in item['acc_x']])
+                self.assertEqual(_array(typed_item['acc_y']['val']).tolist(),
+                                 np.array([s['val'] for s in item['acc_y']], dtype=np.float32).tolist())
+
+        self.assertEqual(formatters.convert_frame(lazy.merged(), 'map'), formatters.convert_frame(eager.merged(), 'map'))
+
+    def test_frame_cache_stores_the_grid(self):
+        print("\n--- Test: Frame cache persists anchor/period/shift instead of per-sample times ---")
+        from db.frame_cache import FrameDiskCache
+        raw = [_raw_packet(1700000000000 + 1280 * i, 'axyz', 64 * 3) for i in range(5)]
+        frame = acc.process(raw, fmt='frame')
+        with tempfile.TemporaryDirectory() as root:
+            cache = FrameDiskCache(root=root, max_bytes=10 ** 9)
+            cache.store('t', 'D', 0, frame)
+            files = os.listdir(cache.entry_path('t', 'D', 0))
+            self.assertFalse([f for f in files if f.endswith('.index.npy')])
+
+            loaded = cache.load('t', 'D', 0)
+            self.assertIsNotNone(loaded.blocks[1].grid)
+            corrector.apply_correction(loaded, True, True)
+            corrector.apply_correction(frame, True, True)
+            self.assertEqual(formatters.convert_frame(frame, 'map'), formatters.convert_frame(loaded, 'map'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_typed_format.py
+import unittest
+import sys
+import os
+import base64
+import copy
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc
+from utils import corrector, formatters, mergers
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+from tests.test_multi_topic import HandlerTestCase, call_handler, START
+
+
+def _array(buffer):
+    """What a client does: bytes -> typed array of the announced dtype and shape."""
+    return np.frombuffer(base64.b64decode(buffer['b64']), dtype=buffer['dtype']).reshape(buffer['shape'])
+
+
+def _assertMatchesDictArray(test, typed_item, item):
+    for key, value in item.items():
+        if not isinstance(value, list) or key not in formatters.FIELD_SCHEMA:
+            test.assertEqual(typed_item[key], value, key)
+            continue
+        cfg = formatters.FIELD_SCHEMA[key]
+        test.assertEqual(_array(typed_item[key][cfg['idx']]).tolist(), [s[cfg['idx']] for s in value], key)
+        test.assertEqual(_array(typed_item[key][cfg['val']]).tolist(),
+                         np.array([s[cfg['val']] for s in value], dtype=np.float32).tolist(), key)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestTypedFormat(unittest.TestCase):
+
+    def test_buffers_decode_to_dict_array_values(self):
+        print("\n--- Test: typed buffers decode to the dict_array samples, frames and dict items ---")
+        raw = [_raw_packet(START + i * 1280 + 3, 'axyz', 64 * 3) for i in range(20)]
+        items = corrector.apply_correction(sorted(acc.process(copy.deepcopy(raw)), key=lambda x: x['time']), True, True)
+        merged = mergers.merge_items_in_group(items)
+        frame = corrector.apply_correction(acc.process(copy.deepcopy(raw), fmt='frame').sorted(), True, True)
+
+        typed_items = formatters.convert_item_format(copy.deepcopy(merged), formatters.TYPED)
+        typed_frame, = formatters.convert_frame(mergers.merge_items_in_group(frame), formatters.TYPED)
+        self.assertEqual(typed_frame, typed_items)
+        _assertMatchesDictArray(self, typed_items, merged)
+
+        # acc_x/acc_y/acc_z share one encoded index; tamb has its own
+        self.assertIs(typed_items['acc_x']['time'], typed_items['acc_z']['time'])
+        self.assertIsNot(typed_items['acc_x']['time'], typed_items['tamb']['time'])
+        self.assertEqual(typed_items['acc_x']['val']['dtype'], '<f4')
+        self.assertEqual(typed_items['acc_x']['val']['shape'], [20 * 64])
+
+    def test_index_dtype(self):
+        item = {'time': 1, 'acc_x': [{'time': 1700000000000, 'val': 0.5}, {'time': 1700000000020, 'val': 1.5}],
+                'fft_x': [{'freq': 0.0, 'val': 1.0}, {'freq': 0.048828125, 'val': 2.0}], 'tamb': []}
+        typed = formatters.convert_item_format(item, formatters.TYPED)
+        self.assertEqual(typed['acc_x']['time']['dtype'], '<i8')
+        self.assertEqual(typed['fft_x']['freq']['dtype'], '<f8')
+        self.assertEqual(_array(typed['fft_x']['freq']).tolist(), [0.0, 0.048828125])
+        self.assertEqual(typed['tamb']['val'], {'dtype': '<f4', 'shape': [0], 'b64': ''})
+        # Little-endian bytes, whatever the server's byte order
+        self.assertEqual(base64.b64decode(typed['acc_x']['val']['b64'])[:4], b'\x00\x00\x00\x3f')
+
+
+class TestHandlerTyped(HandlerTestCase):
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_typed_pages(self):
+        print("\n--- Test: output_format=typed pages hold the dict_array samples and are smaller ---")
+        for engine in ['python', 'numpy']:
+            params = dict(table_name='acc', id='ASENSE00000022', decode_engine=engine)
+            status, typed = call_handler(output_format='typed', **params)
+            self.assertEqual(status, 200)
+            _, dict_array = call_handler(output_format='dict_array', **params)
+            self.assertEqual(len(typed['data']), len(dict_array['data']))
+            for typed_item, item in zip(typed['data'], dict_array['data']):
+                _assertMatchesDictArray(self, typed_item, item)
+            _, mapped = call_handler(**params)
+            self.assertLess(len(str(typed)), len(str(mapped)) / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
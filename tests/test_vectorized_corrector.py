@@ -0,0 +1,88 @@
+# tests/test_vectorized_corrector.py
+import unittest
+import sys
+import os
+import copy
+import random
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processors import acc
+from utils import corrector, formatters
+from utils.frame import np
+from tests.test_sensor_frame import _raw_packet
+
+
+def _sequential_reference(items, enable_glitch_fix, enable_auto_odr):
+    """The original packet-by-packet corrector (before vectorization), kept as the oracle."""
+    if len(items) < 2:
+        return items
+    if enable_glitch_fix and len(items) >= 3:
+        deltas = [items[i]['time'] - items[i - 1]['time'] for i in range(1, len(items))]
+        valid = [d for d in deltas if 1000 <= d <= 1500]
+        median = statistics.median(valid) if enable_auto_odr and valid else 1280.0
+        short, long_ = median * (1 - 0.015), median * (1 + 0.015)
+        for i in range(2, len(items)):
+            delta_curr = items[i]['time'] - items[i - 1]['time']
+            delta_prev = items[i - 1]['time'] - items[i - 2]['time']
+            if delta_curr <= short and delta_prev >= long_:
+                shift = int(round(median - delta_curr))
+                items[i - 1]['time'] -= shift
+                corrector._shift_vector_timestamps(items[i - 1], -shift)
+    if enable_auto_odr:
+        corrector._recalibrate_samples_backwards(items)
+    return items
+
+
+def _random_times(rnd, n):
+    """Random mix of normal, long/short, chained glitches, gaps and duplicated spacing."""
+    times, t = [], 1700000000000
+    for _ in range(n):
+        t += rnd.choice([1280, 1280, 1280, 1250, 1305, 1255, 1300, 1261, 1260, 2560, 900, 90000, 1500, 1000])
+        times.append(t)
+    return times
+
+
+class TestVectorizedCorrector(unittest.TestCase):
+
+    def test_dict_path_matches_sequential_loop(self):
+        print("\n--- Test: Mask-based glitch decisions == sequential scan (dict items) ---")
+        rnd = random.Random(11)
+        for trial in range(300):
+            times = _random_times(rnd, rnd.randint(0, 25))
+            raw = [_raw_packet(t, 'axyz', 3 * rnd.choice([0, 1, 4])) for t in times]
+            for flags in [(True, False), (False, True), (True, True)]:
+                expected = _sequential_reference(acc.process(copy.deepcopy(raw)), *flags)
+                actual = corrector.apply_correction(acc.process(copy.deepcopy(raw)), *flags)
+                self.assertEqual(expected, actual, f"trial={trial} flags={flags}")
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_frame_path_matches_sequential_loop(self):
+        print("\n--- Test: Vectorized frame corrector == sequential scan ---")
+        rnd = random.Random(12)
+        for trial in range(150):
+            times = _random_times(rnd, rnd.randint(1, 25))
+            raw = [_raw_packet(t, 'axyz', 3 * rnd.choice([1, 4, 64])) for t in times]
+            for flags in [(True, False), (False, True), (True, True)]:
+                expected = _sequential_reference(acc.process(copy.deepcopy(raw)), *flags)
+                frame = corrector.apply_correction(acc.process(copy.deepcopy(raw), fmt='frame'), *flags)
+                self.assertEqual(expected, formatters.convert_frame(frame, 'dict_array'),
+                                 f"trial={trial} flags={flags}")
+
+    def test_documented_scenarios_with_glitch_fix(self):
+        print("\n--- Test: tests/test_corrector.py scenarios, glitch fix enabled ---")
+        scenarios = [
+            ([0, 1280, 2585, 3840], {2: 2560}),
+            ([0, 1280, 2560, 1000000, 1001260], {3: 999980}),
+            ([0, 1280, 2540], {2: 2540}),
+        ]
+        for times, expected in scenarios:
+            rows = [{'time': t, 'acc_x': [{'time': t, 'val': 1.0}]} for t in times]
+            corrected = corrector.apply_correction(rows, enable_glitch_fix=True)
+            for index, value in expected.items():
+                self.assertEqual(corrected[index]['time'], value)
+                self.assertEqual(corrected[index]['acc_x'][0]['time'], value)
+
+
+if __name__ == '__main__':
+    unittest.main()
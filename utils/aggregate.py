@@ -0,0 +1,80 @@
+# utils/aggregate.py
+"""
+Windowed statistics of the vibration channels (aggregate=<N>m|h|d).
+
+Condition monitoring only needs, per UTC window, the RMS, peak-to-peak, mean and standard
+deviation of each channel, not the waveform. Samples are bucketed by their corrected time with
+one floor division, sorted by bucket once, and every statistic is a ufunc.reduceat over the
+bucket boundaries.
+
+Each row also reports the sample count: with count, mean and rms, clients can combine the rows of
+a window split across pages exactly (sum = mean * count, sum of squares = rms^2 * count).
+"""
+from utils.frame import SensorFrame, np
+
+AGGREGATE_KEYS = {
+    'acc': ['acc_x', 'acc_y', 'acc_z'],
+    'gyr': ['gyr_x', 'gyr_y', 'gyr_z'],
+    'ain': ['ain_a', 'ain_b'],
+}
+TOPICS = list(AGGREGATE_KEYS)
+
+
+def aggregate(data, window_ms, topic):
+    """
+    Corrected 'dict_array' items or SensorFrame -> one row per window holding samples:
+        {'time': window start, 'acc_x': {'count', 'mean', 'std', 'rms', 'p2p'}, ...}
+    Rows are sorted by window; a key without samples in a window is left out of that row.
+    """
+    keys = AGGREGATE_KEYS[topic]
+    columns = _frame_columns(data, keys) if isinstance(data, SensorFrame) else _item_columns(data, keys)
+
+    rows = {}
+    for key, (times, values) in columns.items():
+        if not len(times):
+            continue
+        for start, stats in zip(*_window_stats(times, values, window_ms)):
+            rows.setdefault(start, {'time': start})[key] = stats
+    return [rows[start] for start in sorted(rows)]
+
+
+def _frame_columns(frame, keys):
+    columns = {}
+    for block in frame.time_blocks():
+        for key in keys:
+            if key in block.values:
+                columns[key] = (block.index, block.values[key])
+    return columns
+
+
+def _item_columns(items, keys):
+    columns = {}
+    for key in keys:
+        samples = [s for item in items for s in item.get(key) or []]
+        if samples:
+            columns[key] = (np.array([s['time'] for s in samples], dtype=np.float64),
+                            np.array([s['val'] for s in samples], dtype=np.float64))
+    return columns
+
+
+def _window_stats(times, values, window_ms):
+    """(window starts, [stats dict per window]) for one channel."""
+    buckets = np.floor_divide(np.asarray(times, dtype=np.float64), window_ms).astype(np.int64)
+    order = np.argsort(buckets, kind='stable')
+    buckets, values = buckets[order], np.asarray(values, dtype=np.float64)[order]
+
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    counts = np.diff(np.append(starts, len(values)))
+
+    mean = np.add.reduceat(values, starts) / counts
+    # Two-pass variance: squared deviations from each window's own mean
+    deviations = values - np.repeat(mean, counts)
+    std = np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts)
+    rms = np.sqrt(np.add.reduceat(values * values, starts) / counts)
+    p2p = np.maximum.reduceat(values, starts) - np.minimum.reduceat(values, starts)
+
+    stats = [
+        {'count': c, 'mean': m, 'std': s, 'rms': r, 'p2p': p}
+        for c, m, s, r, p in zip(counts.tolist(), mean.tolist(), std.tolist(), rms.tolist(), p2p.tolist())
+    ]
+    return (buckets[starts] * window_ms).tolist(), stats
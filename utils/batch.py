@@ -0,0 +1,66 @@
+# utils/batch.py
+"""
+Helpers for fleet-wide batch requests (one window, many devices).
+"""
+import re
+import traceback
+from concurrent.futures import FIRST_COMPLETED, wait
+
+MAX_BATCH_DEVICES = 64
+
+# 'ASENSE00000001..ASENSE00000036' or the shorthand 'ASENSE00000001..36'
+_RANGE = re.compile(r'^(?P<prefix>.*?)(?P<first>\d+)\.\.(?:(?P=prefix))?(?P<last>\d+)$')
+
+
+def parse_device_ids(id_value):
+    """
+    Expands an 'id' parameter into a list of device ids (order kept, duplicates dropped).
+    Accepts a single id, a comma-separated list, ranges ('ASENSE00000001..ASENSE00000036',
+    'ASENSE00000001..36'), or any mix of them. Raises ValueError on reversed or oversized ranges.
+    """
+    devices = []
+    for part in (p.strip() for p in str(id_value).split(',')):
+        if not part:
+            continue
+        match = _RANGE.match(part)
+        if not match:
+            devices.append(part)
+            continue
+
+        first, last = int(match['first']), int(match['last'])
+        if last < first:
+            raise ValueError(f"Invalid device range: {part}")
+        if last - first + 1 > MAX_BATCH_DEVICES:
+            raise ValueError(f"Device range too large: {part} (max {MAX_BATCH_DEVICES} devices)")
+        width = len(match['first'])
+        devices.extend(f"{match['prefix']}{n:0{width}d}" for n in range(first, last + 1))
+
+    return list(dict.fromkeys(devices))
+
+
+def run_bounded(pool, fn, keys, concurrency):
+    """
+    Runs fn(key) for every key on 'pool' with at most 'concurrency' calls in flight.
+    A failing key does not stop the others: returns ({key: result}, {key: error message}),
+    both in the order of 'keys'.
+    """
+    pending = list(keys)
+    in_flight = {}
+    results, errors = {}, {}
+
+    while pending or in_flight:
+        while pending and len(in_flight) < concurrency:
+            key = pending.pop(0)
+            in_flight[pool.submit(fn, key)] = key
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = in_flight.pop(future)
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+                errors[key] = str(e)
+
+    return ({k: results[k] for k in keys if k in results},
+            {k: errors[k] for k in keys if k in errors})
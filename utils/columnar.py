@@ -0,0 +1,108 @@
+# utils/columnar.py
+"""
+Binary columnar outputs: output_format=arrow (Arrow IPC stream) and output_format=parquet.
+
+Analytics clients load months of data into pandas/polars; parsing JSON maps back into arrays is
+most of their time. These formats carry typed columns built straight from the processed packets
+(the formatters.COLUMNS item format, no per-sample Python objects), in one long table per page:
+
+    topic  dictionary<string>  acc, gyr, ...
+    item   int16 | int32       position of the item in its topic's list (JSON 'data' order)
+    key    dictionary<string>  acc_x, tamb, fft_x, ...
+    time   int64 | float64     sample time (int64 when every time is integral); null for freq keys
+    freq   float64             fft bin frequency; only when the page has fft, null for time keys
+    val    float32 | float64   float32 when that is lossless (scaled int16 samples), else float64
+
+Pivot with e.g. df.pivot_table(index=['item', 'time'], columns='key', values='val').
+The scalar fields of the items (id, datetime, axis...) and the paging fields (next_timestamp,
+cursor) are JSON in the schema metadata under b'asense'.
+
+pyarrow is optional: without it the handler rejects these formats.
+"""
+from utils import serializer
+from utils.formatters import FIELD_SCHEMA
+from utils.frame import np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CONTENT_TYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FORMATS = list(CONTENT_TYPES)
+METADATA_KEY = b'asense'
+PARQUET_COMPRESSION = 'zstd'
+
+
+def to_table(data, metadata=None):
+    """
+    {topic: items in the formatters.COLUMNS format} -> pyarrow.Table (see module docstring).
+    'metadata' (e.g. the paging fields) is stored with the items' scalar fields.
+    """
+    topic_codes, item_ids, key_codes, index_parts, is_freq, val_parts = [], [], [], [], [], []
+    key_names = {}
+    scalars = {}
+    for topic_code, (topic, items) in enumerate(data.items()):
+        scalars[topic] = []
+        for position, item in enumerate(items):
+            fields = {}
+            for key, value in item.items():
+                if not isinstance(value, tuple):
+                    fields[key] = value
+                    continue
+                index, values = value
+                n = len(values)
+                topic_codes.append(np.full(n, topic_code, dtype=np.int32))
+                item_ids.append(np.full(n, position, dtype=np.int32))
+                key_codes.append(np.full(n, key_names.setdefault(key, len(key_names)), dtype=np.int32))
+                index_parts.append(np.asarray(index, dtype=np.float64))
+                is_freq.append(np.full(n, FIELD_SCHEMA.get(key, {'idx': 'time'})['idx'] == 'freq'))
+                val_parts.append(np.asarray(values, dtype=np.float64))
+            scalars[topic].append(fields)
+
+    index = _concat(index_parts, np.float64)
+    is_freq = _concat(is_freq, np.bool_)
+    values = _concat(val_parts, np.float64)
+
+    # The per-row columns are as narrow as the page allows: int8 dictionary codes, int16 items
+    item_ids = _concat(item_ids, np.int32)
+    columns = {
+        'topic': _dictionary(_concat(topic_codes, np.int32), list(data)),
+        'item': pa.array(item_ids.astype(np.int16) if max(map(len, data.values()), default=0) <= 2 ** 15
+                         else item_ids),
+        'key': _dictionary(_concat(key_codes, np.int32), list(key_names)),
+    }
+    if any(topic != 'fft' for topic in data):
+        times = index[~is_freq]
+        time_dtype = np.int64 if np.array_equal(times, np.floor(times)) else np.float64
+        columns['time'] = pa.array(index.astype(time_dtype), mask=is_freq)
+    if 'fft' in data:
+        columns['freq'] = pa.array(index, mask=~is_freq)
+    as_float32 = values.astype(np.float32)
+    columns['val'] = pa.array(as_float32 if np.array_equal(as_float32, values) else values)
+
+    return pa.table(columns, metadata={METADATA_KEY: serializer.dumps({'items': scalars, **(metadata or {})})})
+
+
+def _concat(parts, dtype):
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+def _dictionary(codes, names):
+    code_type = pa.int8() if len(names) <= 2 ** 7 else pa.int32()
+    return pa.DictionaryArray.from_arrays(pa.array(codes, type=code_type), pa.array(names, type=pa.string()))
+
+
+def encode(table, output_format):
+    """pyarrow.Table -> bytes of an Arrow IPC stream (uncompressed: zero-copy reads) or a Parquet file."""
+    sink = pa.BufferOutputStream()
+    if output_format == 'parquet':
+        pq.write_table(table, sink, compression=PARQUET_COMPRESSION)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,5 +1,7 @@
 import logging
 import statistics
+from utils.frame import SensorFrame, np
+from utils import odr
 
 VECTOR_KEYS = ['acc_x', 'acc_y', 'acc_z', 'gyr_x', 'gyr_y', 'gyr_z', 'ain_a', 'ain_b', 'tamb', 'w_s', 'w_d']
 
@@ -7,39 +9,35 @@ logger = logging.getLogger("Corrector")
 logger.setLevel(logging.INFO)
 
 
-def apply_correction(items, enable_glitch_fix=False, enable_auto_odr=False):
+def apply_correction(items, enable_glitch_fix=False, enable_auto_odr=False, median_delta=None, prev_time=None):
     """
-    Corrects timestamp anomalies and optionally recalibrates sample spacing.
+    Corrects timestamp anomalies and optionally recalibrates sample spacing of 'dict_array' items or a SensorFrame,
+    in place. median_delta overrides the estimated spacing (one value, or one per packet incl. prev_time's);
+    prev_time is the corrected time of the packet just before 'items', used for deltas but never returned.
     """
+    if isinstance(items, SensorFrame):
+        return _apply_correction_frame(items, enable_glitch_fix, enable_auto_odr, median_delta, prev_time)
+
+    chunk = items
+    if prev_time is not None:
+        # Stand-in for the previous packet: a time without vectors
+        items = [{'time': prev_time}] + items
+
     if len(items) < 2:
-        return items
+        return chunk
 
     # --- Stage 1: Glitch Correction (Conditional) ---
     if enable_glitch_fix and len(items) >= 3:
-        raw_deltas = [items[i]['time'] - items[i - 1]['time'] for i in range(1, len(items))]
-        valid_deltas = [d for d in raw_deltas if 1000 <= d <= 1500]
-
-        median_delta = statistics.median(valid_deltas) if enable_auto_odr and valid_deltas else 1280.0
-
-        thresh_short = median_delta * (1 - 0.015)
-        thresh_long = median_delta * (1 + 0.015)
-
-        logger.info(
-            f"Corrector Config: Median={median_delta:.1f}ms, Thresholds=[{thresh_short:.1f}, {thresh_long:.1f}]")
+        median_delta = _median_delta([it['time'] for it in items], enable_auto_odr, median_delta)
+        _log_thresholds(median_delta)
         count_fixed = 0
 
-        for i in range(2, len(items)):
-            delta_curr = items[i]['time'] - items[i - 1]['time']
-            delta_prev = items[i - 1]['time'] - items[i - 2]['time']
+        for p, shift_int in _glitch_fixes([it['time'] for it in items], median_delta):
+            logger.info(f"  > Glitch Fix @ Idx {p}: Correcting packet time by {-shift_int}ms.")
 
-            if delta_curr <= thresh_short and delta_prev >= thresh_long:
-                diff_needed = median_delta - delta_curr
-                shift_int = int(round(diff_needed))
-                logger.info(f"  > Glitch Fix @ Idx {i - 1}: Correcting packet time by {-shift_int}ms.")
-
-                items[i - 1]['time'] -= shift_int
-                _shift_vector_timestamps(items[i - 1], -shift_int)
-                count_fixed += 1
+            items[p]['time'] -= shift_int
+            _shift_vector_timestamps(items[p], -shift_int)
+            count_fixed += 1
 
         if count_fixed > 0:
             logger.info(f"Timestamp Correction: Fixed {count_fixed} anomalies.")
@@ -50,7 +48,60 @@ def apply_correction(items, enable_glitch_fix=False, enable_auto_odr=False):
         if calibrated_count > 0:
             logger.info(f"Auto ODR: Recalibrated sample spacing for {calibrated_count} packets.")
 
-    return items
+    return chunk
+
+
+GLITCH_TOLERANCE = 0.015
+# Auto ODR: fewer plausible deltas than this and a calibrated period (if any) is trusted more
+MIN_CALIBRATION_DELTAS = 16
+# StreamingCorrector: the auto ODR median of a stream is taken over its first SEED_PACKETS packets
+SEED_PACKETS = 512
+
+
+def _log_thresholds(median_delta):
+    if isinstance(median_delta, (int, float)):
+        logger.info(f"Corrector Config: Median={median_delta:.1f}ms, "
+                    f"Thresholds=[{median_delta * (1 - GLITCH_TOLERANCE):.1f}, "
+                    f"{median_delta * (1 + GLITCH_TOLERANCE):.1f}]")
+    elif len(median_delta):
+        logger.info(f"Corrector Config: Rolling median in [{min(median_delta):.1f}, {max(median_delta):.1f}]ms")
+
+
+def _glitch_fixes(times, median_delta):
+    """
+    Stage 1 decisions as [(packet index, shift)]: packet p moves by -shift when the delta after it
+    is short and the delta before it is long, relative to the median (or median_delta[p]).
+    """
+    if np is None:
+        medians = median_delta if isinstance(median_delta, list) else [median_delta] * len(times)
+        deltas = [times[i] - times[i - 1] for i in range(1, len(times))]
+        return [(p, int(round(medians[p] - deltas[p])))
+                for p in range(1, len(deltas))
+                if deltas[p] <= medians[p] * (1 - GLITCH_TOLERANCE)
+                and deltas[p - 1] >= medians[p] * (1 + GLITCH_TOLERANCE)]
+
+    deltas = np.diff(np.asarray(times))
+    medians = np.broadcast_to(np.asarray(median_delta, dtype=np.float64), (len(times),))[1:-1]
+    packets = np.flatnonzero((deltas[1:] <= medians * (1 - GLITCH_TOLERANCE))
+                             & (deltas[:-1] >= medians * (1 + GLITCH_TOLERANCE))) + 1
+    shifts = np.round(medians[packets - 1] - deltas[packets]).astype(np.int64)
+    return list(zip(packets.tolist(), shifts.tolist()))
+
+
+def _median_delta(times, enable_auto_odr, median_delta=None, calibrated_delta=None):
+    """
+    Expected packet spacing: the median of the plausible deltas with auto ODR, 1280ms otherwise.
+    calibrated_delta (a period learned earlier for the device) wins over a median of too few deltas.
+    """
+    if not enable_auto_odr:
+        return 1280.0
+    if median_delta is not None:
+        return median_delta
+    raw_deltas = [times[i] - times[i - 1] for i in range(1, len(times))]
+    valid_deltas = [d for d in raw_deltas if odr.is_valid_delta(d)]
+    if calibrated_delta is not None and len(valid_deltas) < MIN_CALIBRATION_DELTAS:
+        return calibrated_delta
+    return statistics.median(valid_deltas) if valid_deltas else 1280.0
 
 
 def _shift_vector_timestamps(item, offset):
@@ -84,4 +135,227 @@ def _recalibrate_samples_backwards(items):
                         for k, sample in enumerate(samples):
                             steps_back = (count - 1) - k
                             sample['time'] = end_time_anchor - (steps_back * period)
-    return calibrated_count
\ No newline at end of file
+    return calibrated_count
+
+
+def _apply_correction_frame(frame, enable_glitch_fix=False, enable_auto_odr=False, median_delta=None,
+                            prev_time=None):
+    """
+    Same two stages as apply_correction, on a SensorFrame.
+    Packet times live in one array; glitch decisions are taken with np.diff and boolean masks, and
+    both the shifts and the recalibration are applied to whole blocks by broadcasting.
+    """
+    times = frame.packet_times().tolist()
+    # With prev_time, times[0] is the previous chunk's packet and packet p of the frame is times[p + 1]
+    lead = 0
+    if prev_time is not None:
+        times = [prev_time] + times
+        lead = 1
+    if len(times) < 2:
+        return frame
+
+    # --- Stage 1: Glitch Correction (Conditional) ---
+    if enable_glitch_fix and len(times) >= 3:
+        median_delta = _median_delta(times, enable_auto_odr, median_delta)
+        _log_thresholds(median_delta)
+        count_fixed = 0
+
+        fixes = _glitch_fixes(times, median_delta)
+        if fixes:
+            shifts = np.zeros(len(times), dtype=np.int64)
+            for p, shift_int in fixes:
+                logger.info(f"  > Glitch Fix @ Idx {p}: Correcting packet time by {-shift_int}ms.")
+                times[p] -= shift_int
+                shifts[p] = shift_int
+            count_fixed = len(fixes)
+
+            for block in frame.time_blocks():
+                grid = block.grid
+                # Lazy grid: one shift per packet. A second shift on the same packet would round
+                # differently from two float subtractions, so that (rare) case goes eager.
+                if grid is not None and not grid.shift[shifts[lead:] != 0].any():
+                    grid.shift = grid.shift + shifts[lead:]
+                    continue
+                # One broadcast per block: every sample moves with its packet
+                block.index -= np.repeat(shifts[lead:], block.counts()).astype(block.index.dtype)
+
+        if count_fixed > 0:
+            frame.packets['time'] = np.asarray(times[lead:], dtype=frame.packets['time'].dtype)
+            logger.info(f"Timestamp Correction: Fixed {count_fixed} anomalies.")
+
+    # --- Stage 2: Auto ODR Recalibration (Conditional) ---
+    if enable_auto_odr:
+        calibrated_count = _recalibrate_frame_backwards(frame, times, lead)
+        if calibrated_count > 0:
+            logger.info(f"Auto ODR: Recalibrated sample spacing for {calibrated_count} packets.")
+
+    return frame
+
+
+def _recalibrate_frame_backwards(frame, times, lead=0):
+    """
+    Frame version of _recalibrate_samples_backwards (same float64 arithmetic), vectorized per block.
+    times[i] belongs to packet i - lead; lazy TimeGrids only get their anchor/period replaced.
+    """
+    t = np.asarray(times, dtype=np.int64)
+    deltas = (t - np.concatenate([t[:1], t[:-1]]))[lead:]
+    # The first packet has no predecessor unless the previous chunk provided one
+    recalibrate = (deltas >= 1000) & (deltas <= 1500)
+    if not lead:
+        recalibrate[:1] = False
+    anchors = t[lead:]
+
+    for block in frame.time_blocks():
+        grid = block.grid
+        if grid is not None:
+            # Lazy grid: a recalibrated packet is just a new anchor and period
+            counts = block.counts()
+            selected = recalibrate & (counts > 0)
+            grid.dtype = np.dtype(np.float64)
+            grid.anchor = np.where(selected, anchors, grid.anchor)
+            grid.period = np.where(selected, deltas / np.maximum(counts, 1), grid.period)
+            grid.shift = np.where(selected, 0, grid.shift)
+            continue
+
+        if block.index.dtype.kind != 'f':
+            block.index = block.index.astype(np.float64)
+
+        counts = block.counts()
+        sample_packet = np.repeat(np.arange(len(counts)), counts)
+        selected = np.flatnonzero(recalibrate[sample_packet])
+        if not len(selected):
+            continue
+
+        packet = sample_packet[selected]
+        position = selected - block.offsets[:-1][packet]
+        steps_back = (counts[packet] - 1 - position).astype(np.float64)
+        period = deltas[packet] / counts[packet]
+        block.index[selected] = anchors[packet] - (steps_back * period)
+
+    return int(recalibrate.sum())
+
+
+def validate_state(state):
+    """
+    Raises ValueError unless 'state' has the shape of StreamingCorrector.state() (or is None):
+    a cursor carries it back from the client, so it is checked before the corrector trusts it.
+    """
+    if state is None:
+        return
+    if not isinstance(state, dict) or not set(state) <= {'prev_time', 'median_delta', 'prev_raw_time',
+                                                          'recent_deltas'}:
+        raise ValueError('Invalid corrector state')
+
+    def number(value, integral=False):
+        return isinstance(value, int if integral else (int, float)) and not isinstance(value, bool)
+
+    for key in ('prev_time', 'prev_raw_time'):
+        if state.get(key) is not None and not number(state[key], integral=True):
+            raise ValueError(f'Invalid corrector state: {key}')
+    median_delta = state.get('median_delta')
+    if median_delta is not None and not (number(median_delta) and odr.is_valid_delta(median_delta)):
+        raise ValueError('Invalid corrector state: median_delta')
+    deltas = state.get('recent_deltas')
+    if deltas is not None and not (isinstance(deltas, list) and len(deltas) <= odr.MAX_WINDOW
+                                   and all(number(d) and odr.is_valid_delta(d) for d in deltas)):
+        raise ValueError('Invalid corrector state: recent_deltas')
+
+
+class StreamingCorrector:
+    """
+    apply_correction chunk by chunk (e.g. page by page), with the same result as one call on the whole sequence.
+    Every chunk but the last ends with a lookahead packet; state() carries what the next chunk needs.
+    """
+
+    def __init__(self, enable_glitch_fix=False, enable_auto_odr=False, state=None, odr_window=None,
+                 calibrated_delta=None):
+        self.enable_glitch_fix = enable_glitch_fix
+        self.enable_auto_odr = enable_auto_odr
+        self.odr_window = odr_window
+        self.calibrated_delta = calibrated_delta
+        state = state or {}
+        self.prev_time = state.get('prev_time')
+        self.median_delta = state.get('median_delta')
+        self.prev_raw_time = state.get('prev_raw_time')
+        self.recent_deltas = state.get('recent_deltas') or []
+        # Period estimated from enough deltas to be worth remembering (see learned_delta)
+        self._learned = None
+
+    def correct(self, chunk, lookahead=False, window_times=None):
+        """
+        Corrects a time-sorted chunk ('dict_array' items or a SensorFrame); a lookahead packet is not returned.
+        window_times: callable giving the first SEED_PACKETS packet times of the sequence (or None).
+        """
+        if not len(chunk):
+            return chunk
+
+        median_delta = None
+        if self.enable_auto_odr:
+            if self.odr_window:
+                if self.median_delta is None:
+                    self.median_delta = self.calibrated_delta or 1280.0
+                median_delta = self._rolling_medians(chunk, lookahead)
+            else:
+                times = None
+                if self.enable_glitch_fix and self.median_delta is None:
+                    times = _chunk_times(chunk)[:SEED_PACKETS]
+                    if lookahead and len(times) < SEED_PACKETS and window_times:
+                        times = (window_times() or times)[:SEED_PACKETS]
+                    self.median_delta = _median_delta(times, True, calibrated_delta=self.calibrated_delta)
+                median_delta = self.median_delta
+                self._learn(times or _chunk_times(chunk))
+
+        corrected = apply_correction(chunk, enable_glitch_fix=self.enable_glitch_fix,
+                                     enable_auto_odr=self.enable_auto_odr,
+                                     median_delta=median_delta, prev_time=self.prev_time)
+        if lookahead:
+            corrected = corrected[:-1] if not isinstance(corrected, SensorFrame) \
+                else corrected.take(np.arange(len(corrected) - 1))
+
+        if len(corrected):
+            self.prev_time = int(_chunk_times(corrected)[-1])
+        return corrected
+
+    def learned_delta(self):
+        """The packet period this run measured (None when it saw too few deltas to trust)."""
+        return self._learned
+
+    def state(self):
+        """JSON-serializable state, to be passed back as StreamingCorrector(state=...)."""
+        state = {'prev_time': self.prev_time, 'median_delta': self.median_delta}
+        if self.odr_window:
+            state.update(prev_raw_time=self.prev_raw_time, recent_deltas=self.recent_deltas)
+        return state
+
+    def _rolling_medians(self, chunk, lookahead):
+        """Per-packet medians aligned with apply_correction's times (prev_time packet first)."""
+        raw = [int(t) for t in _chunk_times(chunk)]
+        lead = []
+        if self.prev_time is not None:
+            lead = [self.prev_raw_time if self.prev_raw_time is not None else self.prev_time]
+        # The lookahead packet is emitted by the next chunk: its delta must not enter the carried window
+        emitted = raw[:-1] if lookahead else raw
+
+        medians, estimator = odr.rolling_medians(lead + emitted, self.odr_window, self.recent_deltas,
+                                                 self.median_delta)
+        if lookahead:
+            # Never used: the decisions stop at the packet before the last
+            medians.append(medians[-1] if medians else self.median_delta)
+
+        self.recent_deltas = list(estimator.values)
+        if emitted:
+            self.prev_raw_time = emitted[-1]
+        if len(estimator) >= odr.MIN_WINDOW_DELTAS:
+            self._learned = estimator.median()
+        return medians
+
+    def _learn(self, times):
+        valid = [d for d in (times[i] - times[i - 1] for i in range(1, len(times))) if odr.is_valid_delta(d)]
+        if len(valid) >= MIN_CALIBRATION_DELTAS:
+            self._learned = float(statistics.median(valid))
+
+
+def _chunk_times(chunk):
+    if isinstance(chunk, SensorFrame):
+        return chunk.packet_times().tolist()
+    return [item['time'] for item in chunk]
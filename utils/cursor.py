@@ -0,0 +1,111 @@
+# utils/cursor.py
+"""
+Opaque continuation cursors.
+
+A cursor is a signed, URL-safe token: base64url(JSON payload) + '.' + base64url(HMAC-SHA256).
+The payload records exactly where a page stopped:
+
+    {'v': 1, 'topic': 'acc', 'id': 'ASENSE00000022', 'end': <window end>,
+     'key': {'id': 'ASENSE00000022', 'time': <time of the last packet returned>},
+     'state': <corrector state or None>}
+
+'key' is the DynamoDB primary key of the last packet, i.e. the ExclusiveStartKey of the next
+page. Clients only echo the token back; the signature rejects edited or truncated tokens.
+
+The signing key is ASENSE_CURSOR_SECRET. Without it cursors are disabled: none are issued
+(clients page with next_timestamp) and any token is rejected, since a key known to anyone would
+let clients mint cursors with arbitrary corrector state.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+VERSION = 1
+
+SECRET_ENV = 'ASENSE_CURSOR_SECRET'
+_SIGNATURE_BYTES = 16
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _secret():
+    secret = os.environ.get(SECRET_ENV)
+    return secret.encode() if secret else None
+
+
+def enabled():
+    """True when a signing key is configured."""
+    return _secret() is not None
+
+
+if not enabled():
+    print(f"WARNING: {SECRET_ENV} is not set, continuation cursors are disabled")
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(body):
+    secret = _secret()
+    if secret is None:
+        raise CursorError(f'Cursors are disabled: {SECRET_ENV} is not set')
+    return hmac.new(secret, body.encode('ascii'), hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def encode(topic, id_value, last_time, end_time, state=None):
+    payload = {
+        'v': VERSION,
+        'topic': topic,
+        'id': id_value,
+        'end': int(end_time),
+        'key': {'id': id_value, 'time': int(last_time)},
+        'state': state,
+    }
+    body = _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return f"{body}.{_b64encode(_sign(body))}"
+
+
+def decode(token):
+    """Verifies and decodes a cursor. Raises CursorError on any malformed or tampered token."""
+    if not enabled():
+        raise CursorError(f'Cursors are disabled: {SECRET_ENV} is not set')
+    try:
+        body, signature = str(token).split('.')
+        if not hmac.compare_digest(_b64decode(signature), _sign(body)):
+            raise CursorError('Invalid cursor signature')
+        payload = json.loads(_b64decode(body))
+    except CursorError:
+        raise
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise CursorError(f'Malformed cursor: {e}')
+
+    if not isinstance(payload, dict) or payload.get('v') != VERSION:
+        raise CursorError('Unsupported cursor version')
+    key = payload.get('key')
+    if not (isinstance(payload.get('topic'), str) and isinstance(payload.get('id'), str)
+            and _is_int(payload.get('end')) and isinstance(key, dict) and _is_int(key.get('time'))
+            and (payload.get('state') is None or isinstance(payload['state'], dict))):
+        raise CursorError('Malformed cursor payload')
+    return payload
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def resume_start_time(payload):
+    """
+    First 'time' of the next page. The table's primary key is (id, time) with integer
+    millisecond times, so every packet after ExclusiveStartKey has time >= key time + 1 and
+    a BETWEEN query from there resumes exactly after the last packet, while staying cacheable.
+    """
+    return int(payload['key']['time']) + 1
@@ -0,0 +1,148 @@
+# utils/downsample.py
+"""
+Server-side decimation of the vector keys for chart requests (max_points).
+
+A chart a couple of thousand pixels wide cannot show more points than that, so each vector key
+of each item is reduced to at most max_points samples after correction and merge:
+
+- 'minmax': the key's range is cut into equal-count buckets and the minimum and maximum of every
+  bucket are kept (peaks survive, which is what matters for vibration data). Computed for all
+  buckets at once with np.minimum/np.maximum.reduceat. A budget below one bucket (two samples
+  per key) falls back to 'lttb'.
+- 'lttb': Largest-Triangle-Three-Buckets, which keeps the visual shape of the curve; exactly
+  max_points samples. Each bucket is scored with array arithmetic, one step per output point.
+
+Keys that the formatters render together (formatters.GROUPS, e.g. acc_x/acc_y/acc_z) keep the
+same samples, chosen by all of them at once, so combined formats stay aligned.
+"""
+from utils.formatters import FIELD_SCHEMA, GROUPS
+from utils.frame import FrameBuilder, np
+
+METHODS = ['minmax', 'lttb']
+DEFAULT_METHOD = 'minmax'
+# LTTB keeps the first and the last sample, plus at least one bucket
+MIN_POINTS = 3
+
+
+def select(index, columns, max_points, method=DEFAULT_METHOD):
+    """
+    Sorted sample positions to keep for keys sharing 'index' (arrays of equal length).
+    All positions when there are max_points samples or fewer.
+    """
+    n = len(index)
+    if n <= max_points:
+        return np.arange(n)
+    if method == 'lttb' or max_points < 2 * len(columns):
+        return _lttb(np.asarray(index, dtype=np.float64), columns, max_points)
+    return _minmax(columns, n, max_points)
+
+
+def _minmax(columns, n, max_points):
+    n_buckets = max_points // (2 * len(columns))
+    starts = np.arange(n_buckets) * n // n_buckets
+    sizes = np.diff(np.append(starts, n))
+    positions = np.arange(n)
+
+    picks = []
+    for values in columns:
+        for reduce in (np.minimum, np.maximum):
+            extreme = np.repeat(reduce.reduceat(values, starts), sizes)
+            # First position reaching the bucket's extreme
+            picks.append(np.minimum.reduceat(np.where(values == extreme, positions, n), starts))
+    return np.unique(np.concatenate(picks))
+
+
+def _lttb(x, columns, max_points):
+    n = len(x)
+    x = x - x[0]  # epoch ms are large: keep the areas well conditioned
+    y = np.stack([np.asarray(c, dtype=np.float64) for c in columns], axis=1)
+
+    # Samples 1..n-2 go into max_points - 2 buckets: bucket b is bounds[b]:bounds[b + 1]
+    bounds = np.floor(np.linspace(1, n - 1, max_points - 1)).astype(np.int64)
+    x_sums = np.concatenate([[0.0], np.cumsum(x)])
+    y_sums = np.concatenate([np.zeros((1, y.shape[1])), np.cumsum(y, axis=0)])
+    sizes = np.diff(bounds)
+    avg_x = (x_sums[bounds[1:]] - x_sums[bounds[:-1]]) / sizes
+    avg_y = (y_sums[bounds[1:]] - y_sums[bounds[:-1]]) / sizes[:, None]
+    # The point after the last bucket is the last sample itself
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.vstack([avg_y[1:], y[-1:]])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(max_points - 2):
+        lo, hi = bounds[b], bounds[b + 1]
+        # Twice the triangle area (a, candidate, next average), summed over the keys
+        area = np.abs((x[a] - avg_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (avg_y[b] - y[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def _selection_groups(columns):
+    """Lists of keys sharing one selection: members of a formatters group with the same index."""
+    groups, grouped = [], set()
+    for config in GROUPS.values():
+        members = [k for k in config['keys'] if k in columns]
+        while members:
+            reference = columns[members[0]][0]
+            same = [k for k in members if np.array_equal(columns[k][0], reference)]
+            groups.append(same)
+            grouped.update(same)
+            members = [k for k in members if k not in same]
+    return groups + [[k] for k in columns if k not in grouped]
+
+
+def _downsample_columns(columns, max_points, method):
+    """{key: (index, values)} -> {key: kept positions}."""
+    kept = {}
+    for keys in _selection_groups(columns):
+        positions = select(columns[keys[0]][0], [columns[k][1] for k in keys], max_points, method)
+        kept.update((k, positions) for k in keys)
+    return kept
+
+
+def downsample_items(items, max_points, method=DEFAULT_METHOD):
+    """Downsamples the vector keys of 'dict_array' items (in place); returns the items."""
+    for item in items:
+        columns, samples = {}, {}
+        for key, value in item.items():
+            if not isinstance(value, list) or len(value) <= max_points or not isinstance(value[0], dict):
+                continue
+            cfg = FIELD_SCHEMA.get(key, {'idx': 'time', 'val': 'val'})
+            columns[key] = (np.array([s[cfg['idx']] for s in value], dtype=np.float64),
+                            np.array([s[cfg['val']] for s in value], dtype=np.float64))
+            samples[key] = value
+
+        for key, positions in _downsample_columns(columns, max_points, method).items():
+            item[key] = [samples[key][i] for i in positions.tolist()]
+    return items
+
+
+def downsample_frame(frame, max_points, method=DEFAULT_METHOD):
+    """SensorFrame version of downsample_items: a new frame, or the same one when nothing exceeds max_points."""
+    if all((b.counts() <= max_points).all() for b in frame.blocks):
+        return frame
+
+    builder = FrameBuilder()
+    for p, meta in enumerate(frame.packet_dicts()):
+        columns, domains = {}, {}
+        for block in frame.blocks:
+            if block.present is not None and not block.present[p]:
+                continue
+            start, end = block.offsets[p], block.offsets[p + 1]
+            index = block.index[start:end]
+            for key, values in block.values.items():
+                columns[key] = (index, values[start:end])
+                domains[key] = block.domain
+
+        kept = _downsample_columns(columns, max_points, method)
+        # One block per selection group: its keys share the kept positions
+        blocks = []
+        for keys in _selection_groups(columns):
+            positions = kept[keys[0]]
+            blocks.append((domains[keys[0]], columns[keys[0]][0][positions],
+                           {k: columns[k][1][positions] for k in keys}))
+        builder.add_packet(meta, blocks)
+    return builder.build()
@@ -1,4 +1,22 @@
 # utils/formatters.py
+import base64
+
+from utils.frame import np
+
+# Internal format of the binary outputs (utils.columnar): every vector key becomes an
+# (index array, values array) pair instead of per-sample Python objects. Needs numpy.
+COLUMNS = 'columns'
+
+# 'typed': every vector key becomes {'time'/'freq': buffer, 'val': buffer}, each buffer
+# {'dtype', 'shape', 'b64'} holding little-endian array bytes (JS: new Float32Array(bytes.buffer)).
+# Values are float32; the index is int64 when every value is integral, else float64. Needs numpy.
+TYPED = 'typed'
+TYPED_VALUE_DTYPE = '<f4'
+# 'typed_grid': 'typed', except that time keys still on a lazy grid (utils.frame.TimeGrid) carry
+# {'grid': {'anchor', 'period', 'count', 'shift'}} instead of a time buffer: one entry per source
+# packet, whose count samples sit at (anchor - steps_back * period) - shift, steps_back = count - 1 ... 0.
+TYPED_GRID = 'typed_grid'
+
 
 def float_to_padded_string(val, n_left_zeros):
     """Formats a float to a string with left-padded zeros."""
@@ -18,18 +36,66 @@ def float_to_padded_string(val, n_left_zeros):
     return f"{sign}{left_padded}.{right}"
 
 
+# repr() of a float in [1e-4, 1e16) is plain positional notation with a '.'
+MIN_PLAIN_REPR = 1e-4
+MAX_PLAIN_REPR = 1e16
+
+
+def padded_keys(values, n_left_zeros):
+    """
+    Bulk float_to_padded_string: the map keys of a whole time/freq array, byte-identical.
+    Plain-notation floats with at least n_left_zeros integer digits (e.g. epoch ms timestamps)
+    are their own repr(); other non-negative floats and ints are padded directly; everything
+    else (negatives, -0.0, exponent range, nan/inf, other types) goes through the original.
+    """
+    if hasattr(values, 'tolist'):
+        # numpy scalars have their own repr(): work on Python floats
+        values = values.tolist()
+    unpadded = max(10.0 ** (n_left_zeros - 1), MIN_PLAIN_REPR)
+    if all(type(v) is float and unpadded <= v < MAX_PLAIN_REPR for v in values):
+        return list(map(repr, values))
+    return [_padded_key(v, n_left_zeros) for v in values]
+
+
+def _padded_key(val, n_left_zeros):
+    if type(val) is float and MIN_PLAIN_REPR <= val < MAX_PLAIN_REPR:
+        s = repr(val)
+        point = s.index('.')
+        return s[:point].zfill(n_left_zeros) + s[point:]
+    if type(val) is int and val >= 0:
+        return str(val).zfill(n_left_zeros) + '.0'
+    return float_to_padded_string(val, n_left_zeros)
+
+
+class MapKeyCache:
+    """Map keys built for one item: keys sharing an index (acc_x/acc_y/acc_z) format it once."""
+
+    def __init__(self):
+        self.entries = []
+
+    def keys(self, index_vals, n_left_zeros):
+        for index, pad, keys in self.entries:
+            if pad == n_left_zeros and (index is index_vals or index == index_vals):
+                return keys
+        keys = padded_keys(index_vals, n_left_zeros)
+        self.entries.append((index_vals, n_left_zeros, keys))
+        return keys
+
+
 class DataBuilder:
-    def __init__(self, output_format, index_key='time', value_key='val', pad_zeros=5, prefix=None):
+    def __init__(self, output_format, index_key='time', value_key='val', pad_zeros=5, prefix=None, key_cache=None):
         """
         :param output_format: 'map', 'tuple_array', or 'dict_array'
         :param index_key: Key for the domain (e.g., 'time', 'freq')
         :param value_key: Key for the value (e.g., 'val')
+        :param key_cache: MapKeyCache shared by the builders of one item
         """
         self.fmt = output_format
         self.index_key = index_key
         self.value_key = value_key
         self.pad = pad_zeros
         self.prefix = prefix
+        self.key_cache = key_cache
 
         if self.fmt == 'map':
             self.data = {}
@@ -53,6 +119,22 @@ class DataBuilder:
         elif self.fmt == 'dict_array':
             self.data.append({self.index_key: index_val, self.value_key: value_val})
 
+    def extend(self, index_vals, value_vals):
+        """Bulk version of add() for aligned sequences of indexes and values."""
+        if self.fmt == 'map':
+            if self.prefix:
+                keys = [f"{self.prefix}{int(i)}" for i in index_vals]
+            else:
+                keys = self.key_cache.keys(index_vals, self.pad) if self.key_cache is not None \
+                    else padded_keys(index_vals, self.pad)
+            self.data.update(zip(keys, value_vals))
+
+        elif self.fmt == 'tuple_array':
+            self.data.extend([i, v] for i, v in zip(index_vals, value_vals))
+        elif self.fmt == 'dict_array':
+            ik, vk = self.index_key, self.value_key
+            self.data.extend({ik: i, vk: v} for i, v in zip(index_vals, value_vals))
+
     def get_result(self):
         return self.data
 
@@ -82,6 +164,13 @@ def convert_item_format(item, target_format):
     """
     if target_format == 'dict_array':
         return item
+    if target_format == COLUMNS:
+        return _item_columns(item)
+    if target_format in (TYPED, TYPED_GRID):
+        return _typed_item(_item_columns(item))
+    if not any(isinstance(val, list) and key in FIELD_SCHEMA for key, val in item.items()):
+        # Nothing to convert (e.g. scalar-only items): no copy
+        return item
 
     converted = item.copy()
     processed_keys = set()
@@ -90,43 +179,23 @@ def convert_item_format(item, target_format):
     if target_format in ['combined_tuple', 'combined_dict']:
         for group_name, config in GROUPS.items():
             keys = config['keys']
-            labels = config['labels']
 
             # Check if all keys for this group exist in the item
             if all(k in item for k in keys):
-                # We assume all lists in the group are length-aligned
-                first_key = keys[0]
-                reference_list = item[first_key]
-
                 # Dynamic Lookup: Is this group 'time' based or 'freq' based?
-                domain_key = FIELD_SCHEMA[first_key]['idx']
-
-                group_data = []
-
-                for i in range(len(reference_list)):
-                    # Extract domain value (time or freq)
-                    domain_val = reference_list[i].get(domain_key)
-
-                    # Extract values from all members
-                    vals = [item[k][i].get('val') for k in keys]
-
-                    if target_format == 'combined_tuple':
-                        # Format: [time/freq, val_1, val_2, val_3]
-                        row = [domain_val] + vals
-                        group_data.append(row)
-                    else:
-                        # Format: {'time': t, 'x': val_1...} OR {'freq': f, 'x': val_1...}
-                        row = {domain_key: domain_val}
-                        for label, val in zip(labels, vals):
-                            row[label] = val
-                        group_data.append(row)
+                domain_key = FIELD_SCHEMA[keys[0]]['idx']
 
-                converted[group_name] = group_data
+                # Columns of the group (we assume all lists in the group are length-aligned),
+                # transposed into rows in bulk
+                reference_index = [point.get(domain_key) for point in item[keys[0]]]
+                member_values = [[point.get('val') for point in item[k]] for k in keys]
+                converted[group_name] = _combined_rows(target_format, domain_key, config['labels'],
+                                                       reference_index, member_values)
 
                 # Cleanup
                 for k in keys:
                     converted.pop(k, None)
-                    processed_keys.update(keys)
+                processed_keys.update(keys)
 
     # 2. Determine Sub-Format for remaining fields
     sub_format = target_format
@@ -136,6 +205,7 @@ def convert_item_format(item, target_format):
         sub_format = 'dict_array'
 
     # 3. Process remaining keys
+    key_cache = MapKeyCache()
     for key, val in item.items():
         if key in processed_keys or not isinstance(val, list) or key not in FIELD_SCHEMA:
             continue
@@ -146,13 +216,15 @@ def convert_item_format(item, target_format):
             index_key=cfg['idx'],
             value_key=cfg['val'],
             pad_zeros=cfg['pad'],
-            prefix=cfg.get('prefix')
+            prefix=cfg.get('prefix'),
+            key_cache=key_cache
         )
 
         # FIX: If we are mapping with a prefix (like w_s_avg_), we want indices (0,1,2),
         # not the stored timestamp values.
         use_list_index = (sub_format == 'map' and cfg.get('prefix') is not None)
 
+        index_vals, value_vals = [], []
         for i, point in enumerate(val):
             val_v = point.get(cfg['val'])
 
@@ -162,8 +234,166 @@ def convert_item_format(item, target_format):
                 idx_v = point.get(cfg['idx'])  # standard timestamp/freq
 
             if idx_v is not None and val_v is not None:
-                builder.add(idx_v, val_v)
+                index_vals.append(idx_v)
+                value_vals.append(val_v)
+
+        # One bulk call: the map keys of the whole array are built by padded_keys
+        builder.extend(index_vals, value_vals)
 
         converted[key] = builder.get_result()
 
-    return converted
\ No newline at end of file
+    return converted
+
+
+def convert_frame(frame, target_format):
+    """
+    Converts a SensorFrame (utils.frame) straight into a list of items in target_format.
+    This is the 'edge' of the columnar pipeline: per-sample Python objects are only created here.
+    Output matches convert_item_format applied to the equivalent 'dict_array' items.
+    """
+    items = frame.packet_dicts()
+    # COLUMNS and TYPED keep the arrays: (index, values) slices of the block arrays
+    as_arrays = target_format in (COLUMNS, TYPED, TYPED_GRID)
+
+    # Per packet: key -> (index list, value list)
+    columns = [{} for _ in items]
+    for block in frame.blocks:
+        if target_format == TYPED_GRID and block.grid is not None:
+            # Per-sample times are never built: each packet gets its grid entries
+            _add_grid_columns(columns, block)
+            continue
+        index = block.index if as_arrays else block.index.tolist()
+        values = block.values if as_arrays else {k: v.tolist() for k, v in block.values.items()}
+        bounds = block.offsets.tolist()
+        present = block.present.tolist() if block.present is not None else None
+
+        for p, packet_columns in enumerate(columns):
+            if present is not None and not present[p]:
+                continue
+            start, end = bounds[p], bounds[p + 1]
+            # One index list per block and packet, shared by its keys
+            packet_index = index[start:end]
+            for key, vals in values.items():
+                packet_columns[key] = (packet_index, vals[start:end])
+
+    if as_arrays:
+        for item, cols in zip(items, columns):
+            item.update(cols)
+        return items if target_format == COLUMNS else [_typed_item(item) for item in items]
+    return [_convert_columns(item, cols, target_format) for item, cols in zip(items, columns)]
+
+
+def _item_columns(item):
+    """'dict_array' item -> its vector keys as (index array, values array), like convert_frame(frame, COLUMNS)."""
+    converted = item.copy()
+    for key, val in item.items():
+        if not isinstance(val, list) or key not in FIELD_SCHEMA:
+            continue
+        cfg = FIELD_SCHEMA[key]
+        points = [(p.get(cfg['idx']), p.get(cfg['val'])) for p in val]
+        points = [(i, v) for i, v in points if i is not None and v is not None]
+        converted[key] = (np.array([i for i, _ in points]), np.array([v for _, v in points], dtype=np.float64))
+    return converted
+
+
+def _combined_rows(target_format, domain_key, labels, index, member_values):
+    """
+    Transposes a group's columns into rows with zip:
+    [[time/freq, val_1, val_2, ...]] or [{'time'/'freq': d, 'x': val_1, ...}].
+    """
+    rows = zip(index, *member_values)
+    if target_format == 'combined_tuple':
+        return list(map(list, rows))
+    fields = (domain_key, *labels)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _convert_columns(item, columns, target_format):
+    """Builds the formatted fields of one item from its (index, values) columns."""
+    processed_keys = set()
+
+    # 1. Handle Combined Groups (acc, gyr, ain, fft)
+    if target_format in ['combined_tuple', 'combined_dict']:
+        for group_name, config in GROUPS.items():
+            keys = config['keys']
+            if not all(k in columns for k in keys):
+                continue
+
+            domain_key = FIELD_SCHEMA[keys[0]]['idx']
+            reference_index = columns[keys[0]][0]
+            member_values = [columns[k][1] for k in keys]
+
+            item[group_name] = _combined_rows(target_format, domain_key, config['labels'],
+                                              reference_index, member_values)
+            processed_keys.update(keys)
+
+    # 2. Determine Sub-Format for remaining fields
+    sub_format = target_format
+    if target_format == 'combined_tuple':
+        sub_format = 'tuple_array'
+    elif target_format == 'combined_dict':
+        sub_format = 'dict_array'
+
+    # 3. Process remaining keys
+    key_cache = MapKeyCache()
+    for key, (index_vals, value_vals) in columns.items():
+        if key in processed_keys:
+            continue
+
+        cfg = FIELD_SCHEMA.get(key, {'idx': 'time', 'val': 'val', 'pad': 5})
+        builder = DataBuilder(sub_format, index_key=cfg['idx'], value_key=cfg['val'], pad_zeros=cfg['pad'],
+                              key_cache=key_cache)
+        builder.extend(index_vals, value_vals)
+        item[key] = builder.get_result()
+
+    return item
+
+
+def _add_grid_columns(columns, block):
+    """Adds (grid descriptor, values) columns of a lazy time block, one descriptor shared by its keys."""
+    grid, bounds = block.grid, block.offsets.tolist()
+    counts = np.diff(block.segment_offsets())
+    merged = block.grid_offsets is not None
+    present = block.present.tolist() if block.present is not None else None
+
+    for p, packet_columns in enumerate(columns):
+        if present is not None and not present[p]:
+            continue
+        entries = slice(None) if merged else slice(p, p + 1)
+        anchor = grid.anchor[entries]
+        descriptor = {
+            'anchor': _typed_buffer(anchor, '<i8' if np.array_equal(anchor, np.floor(anchor)) else '<f8'),
+            'period': _typed_buffer(grid.period[entries], '<f8'),
+            'count': _typed_buffer(counts[entries], '<i8'),
+            'shift': _typed_buffer(grid.shift[entries], '<i8'),
+        }
+        start, end = bounds[p], bounds[p + 1]
+        for key, vals in block.values.items():
+            packet_columns[key] = (descriptor, vals[start:end])
+
+
+def _typed_item(item):
+    """COLUMNS item -> TYPED item. Keys sharing an index (acc_x/acc_y/acc_z) encode it once."""
+    index_buffers = []
+    for key, value in item.items():
+        if not isinstance(value, tuple):
+            continue
+        index, values = value
+        if isinstance(index, dict):
+            # TYPED_GRID descriptor, already encoded
+            item[key] = {'grid': index, 'val': _typed_buffer(values, TYPED_VALUE_DTYPE)}
+            continue
+        for shared, buffer in index_buffers:
+            if shared is index or np.array_equal(shared, index):
+                break
+        else:
+            buffer = _typed_buffer(index, '<i8' if np.array_equal(index, np.floor(index)) else '<f8')
+            index_buffers.append((index, buffer))
+        cfg = FIELD_SCHEMA.get(key, {'idx': 'time', 'val': 'val'})
+        item[key] = {cfg['idx']: buffer, cfg['val']: _typed_buffer(values, TYPED_VALUE_DTYPE)}
+    return item
+
+
+def _typed_buffer(array, dtype):
+    array = np.ascontiguousarray(array, dtype=dtype)
+    return {'dtype': dtype, 'shape': list(array.shape), 'b64': base64.b64encode(array.tobytes()).decode('ascii')}
@@ -0,0 +1,344 @@
+# utils/frame.py
+"""
+Columnar internal representation for high-frequency packets (acc/gyr/ain/fft).
+
+The legacy 'dict_array' format stores one {'time': t, 'val': v} dict per sample. A SensorFrame
+stores the same information as a handful of NumPy arrays:
+
+- packets: one column per packet-level field ('id', 'time', 'scale', 'odr', 'seq', 'axis'...),
+  each with one entry per packet.
+- blocks: groups of keys that share a domain axis. A block holds a single 'index' array
+  (sample time or frequency), one value array per key, and 'offsets' so that packet p owns
+  samples offsets[p]:offsets[p + 1].
+
+Sample times of acc/gyr/ain packets are a regular grid ending at the packet time, so time blocks
+built by the processors keep them lazily as a TimeGrid (anchor, period, shift per packet). The
+corrector edits those per-packet numbers; the per-sample array is only built when something reads
+block.index (typically the formatter).
+
+Frames flow through processors -> corrector -> mergers, and are only converted to the public
+output formats at the edge (utils.formatters.convert_frame).
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy is optional: without it the pipeline stays on 'dict_array'
+    np = None
+
+
+class PacketGrid:
+    """Sample times of one packet: 'count' samples every 'period' ms, the last one at 'anchor'."""
+    __slots__ = ('anchor', 'period', 'count')
+
+    def __init__(self, anchor, period, count):
+        self.anchor = anchor
+        self.period = period
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def times(self):
+        # Same arithmetic as processors.numpy_engine.time_grid
+        if not self.period:
+            return np.full(self.count, self.anchor, dtype=np.int64)
+        return self.anchor - np.arange(self.count - 1, -1, -1, dtype=np.float64) * self.period
+
+
+class TimeGrid:
+    """
+    Lazy time index of a block: the samples of packet p sit at
+        (anchor[p] - steps_back * period[p]) - shift[p],   steps_back = count - 1 ... 0
+    which is exactly the float64 arithmetic of the processors (anchor - steps_back * period),
+    followed by the corrector's integer glitch shifts. 'dtype' is the dtype the eager index would
+    have: int64 while every period is zero, float64 otherwise.
+    """
+    __slots__ = ('anchor', 'period', 'shift', 'dtype')
+
+    def __init__(self, anchor, period, shift=None, dtype=None):
+        self.anchor = anchor
+        self.period = period
+        self.shift = np.zeros(len(anchor), dtype=np.int64) if shift is None else shift
+        self.dtype = np.dtype(np.float64 if dtype is None else dtype)
+
+    def take(self, order):
+        return TimeGrid(self.anchor[order], self.period[order], self.shift[order], self.dtype)
+
+    @staticmethod
+    def concat(grids):
+        return TimeGrid(np.concatenate([g.anchor for g in grids]),
+                        np.concatenate([g.period for g in grids]),
+                        np.concatenate([g.shift for g in grids]),
+                        np.result_type(*[g.dtype for g in grids]))
+
+    def materialize(self, offsets):
+        counts = np.diff(offsets)
+        packet = np.repeat(np.arange(len(counts)), counts)
+        if self.dtype.kind != 'f':
+            # Only zero periods: every sample sits on its (shifted) anchor
+            return (self.anchor - self.shift).astype(self.dtype)[packet]
+
+        steps_back = (np.repeat(offsets[1:] - 1, counts) - np.arange(offsets[-1])).astype(np.float64)
+        times = self.anchor[packet] - steps_back * self.period[packet]
+        if self.shift.any():
+            times -= self.shift[packet]
+        return times
+
+
+class Block:
+    """Samples of one or more keys sharing the same domain axis ('time' or 'freq')."""
+    __slots__ = ('domain', '_index', 'grid', 'grid_offsets', 'values', 'offsets', 'present')
+
+    def __init__(self, domain, index, values, offsets, present=None, grid=None, grid_offsets=None):
+        self.domain = domain
+        self._index = index
+        # TimeGrid standing in for 'index' until someone reads it, laid over grid_offsets when those
+        # differ from offsets (merged blocks: one packet, the grid still has one entry per source packet)
+        self.grid = grid
+        self.grid_offsets = grid_offsets
+        self.values = values
+        self.offsets = offsets
+        # Optional per-packet mask: packets where the keys do not exist at all (not just empty)
+        self.present = present
+
+    @property
+    def index(self):
+        """Per-sample index array. Reading it materializes a lazy grid (the block stays eager after)."""
+        if self.grid is not None:
+            self._index = self.grid.materialize(self.segment_offsets())
+            self.grid = self.grid_offsets = None
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = index
+        self.grid = self.grid_offsets = None
+
+    def segment_offsets(self):
+        """Offsets matching the entries of the lazy grid."""
+        return self.offsets if self.grid_offsets is None else self.grid_offsets
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def take(self, order):
+        """Gathers the samples of the packets in 'order' (a packet index array)."""
+        counts = self.counts()[order]
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        # Sample i of the new block comes from: old start of its packet + position within the packet
+        starts = self.offsets[:-1][order]
+        sample_idx = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+
+        present = self.present[order] if self.present is not None else None
+        values = {k: v[sample_idx] for k, v in self.values.items()}
+        if self.grid is not None and self.grid_offsets is None:
+            return Block(self.domain, None, values, offsets, present, grid=self.grid.take(order))
+        return Block(self.domain, self.index[sample_idx], values, offsets, present)
+
+
+class SensorFrame:
+    def __init__(self, packets, blocks):
+        self.packets = packets
+        self.blocks = blocks
+
+    def __len__(self):
+        return len(self.packets['time'])
+
+    def packet_times(self):
+        return self.packets['time']
+
+    def time_blocks(self):
+        return [b for b in self.blocks if b.domain == 'time']
+
+    def take(self, order):
+        """New frame with the packets at 'order', in that order."""
+        order = np.asarray(order, dtype=np.int64)
+        packets = {k: v[order] for k, v in self.packets.items()}
+        return SensorFrame(packets, [b.take(order) for b in self.blocks])
+
+    def sorted(self):
+        """Packets sorted by time (stable, like list.sort on the dict items)."""
+        return self.take(np.argsort(self.packets['time'], kind='stable'))
+
+    def merged(self):
+        """
+        Single-packet frame holding every sample, with the first packet's metadata.
+        Same semantics as mergers.merge_items_in_group: vectors concatenate, scalars first-wins.
+        Lazy time grids stay lazy, over the offsets of the source packets.
+        """
+        packets = {k: v[:1] for k, v in self.packets.items()}
+        blocks = [
+            Block(b.domain, None if b.grid is not None else b.index, b.values,
+                  np.array([0, b.offsets[-1]], dtype=np.int64),
+                  None if b.present is None else b.present[:1] | b.present.any(),
+                  grid=b.grid, grid_offsets=None if b.grid is None else b.segment_offsets())
+            for b in self.blocks
+        ]
+        return SensorFrame(packets, blocks)
+
+    def between(self, start_time, end_time):
+        """Packets whose time lies in [start_time, end_time] (the frame itself when all do)."""
+        times = self.packets['time']
+        mask = (times >= start_time) & (times <= end_time)
+        if mask.all():
+            return self
+        return self.take(np.flatnonzero(mask))
+
+    @staticmethod
+    def empty():
+        return SensorFrame({'time': np.zeros(0, dtype=np.int64)}, [])
+
+    @staticmethod
+    def concat(frames):
+        """
+        Stacks frames packet-wise. Blocks are matched by (domain, keys); packets of a frame
+        lacking a block get zero samples and present=False for it.
+        """
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return SensorFrame.empty()
+        if len(frames) == 1:
+            return frames[0]
+
+        fields = {}
+        for f in frames:
+            for k in f.packets:
+                fields.setdefault(k, None)
+        packets = {}
+        for k in fields:
+            parts = [f.packets[k] if k in f.packets else np.full(len(f), None, dtype=object) for f in frames]
+            packets[k] = np.concatenate(parts)
+
+        signatures = {}
+        for f in frames:
+            for b in f.blocks:
+                signatures.setdefault((b.domain,) + tuple(b.values), None)
+
+        blocks = []
+        for signature in signatures:
+            domain, keys = signature[0], signature[1:]
+            matches = [next((b for b in f.blocks if b.domain == domain and tuple(b.values) == keys), None)
+                       for f in frames]
+            found = [b for b in matches if b is not None]
+
+            counts = np.concatenate([b.counts() if b is not None else np.zeros(len(f), dtype=np.int64)
+                                     for f, b in zip(frames, matches)])
+            present = np.concatenate([
+                (b.present if b.present is not None else np.ones(len(f), dtype=bool)) if b is not None
+                else np.zeros(len(f), dtype=bool)
+                for f, b in zip(frames, matches)
+            ])
+            offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+
+            values = {k: np.concatenate([b.values[k] for b in found]) for k in keys}
+            present = None if present.all() else present
+            if all(b.grid is not None and b.grid_offsets is None for b in found):
+                # Packets of frames lacking the block own no samples: any grid entry will do
+                grid = TimeGrid.concat([b.grid if b is not None else _empty_grid(len(f))
+                                        for f, b in zip(frames, matches)])
+                blocks.append(Block(domain, None, values, offsets, present, grid=grid))
+            else:
+                blocks.append(Block(domain, np.concatenate([b.index for b in found]), values, offsets, present))
+
+        return SensorFrame(packets, blocks)
+
+    def packet_dicts(self):
+        """Packet-level fields as a list of plain dicts (python scalars)."""
+        columns = {k: v.tolist() for k, v in self.packets.items()}
+        return [{k: col[p] for k, col in columns.items()} for p in range(len(self))]
+
+    def to_items(self):
+        """Converts back to the legacy 'dict_array' item list."""
+        from utils.formatters import convert_frame
+        return convert_frame(self, 'dict_array')
+
+
+class FrameBuilder:
+    """Accumulates decoded packets and concatenates them into a SensorFrame once, in build()."""
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("The 'frame' format requires numpy")
+        self._meta = []
+        self._blocks = {}
+
+    def add_packet(self, meta, blocks):
+        """
+        :param meta: packet-level fields, e.g. {'id': ..., 'time': ..., 'scale': ...}
+        :param blocks: list of (domain, index, {key: values}) sharing that index; index may be a
+                       PacketGrid, kept lazy when every packet of the block uses one
+        """
+        packet_idx = len(self._meta)
+        self._meta.append(meta)
+
+        for domain, index, values in blocks:
+            signature = (domain,) + tuple(values)
+            block = self._blocks.setdefault(signature, {'domain': domain, 'chunks': []})
+            block['chunks'].append((packet_idx, index, values))
+
+    def build(self):
+        n_packets = len(self._meta)
+
+        fields = {}
+        for meta in self._meta:
+            for k in meta:
+                fields.setdefault(k, None)
+        packets = {k: _column([m.get(k) for m in self._meta]) for k in fields}
+        if 'time' not in packets:
+            packets['time'] = np.zeros(0, dtype=np.int64)
+
+        blocks = []
+        for signature, block in self._blocks.items():
+            keys = signature[1:]
+            chunks = block['chunks']
+
+            counts = np.zeros(n_packets, dtype=np.int64)
+            present = np.zeros(n_packets, dtype=bool)
+            for packet_idx, index, _ in chunks:
+                counts[packet_idx] = len(index)
+                present[packet_idx] = True
+            offsets = np.zeros(n_packets + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+
+            values = {k: _concat([c[2][k] for c in chunks], np.float64) for k in keys}
+            present = None if present.all() else present
+            if chunks and all(isinstance(c[1], PacketGrid) for c in chunks):
+                blocks.append(Block(block['domain'], None, values, offsets, present,
+                                    grid=_packet_grids(n_packets, chunks)))
+                continue
+
+            index = _concat([c[1].times() if isinstance(c[1], PacketGrid) else c[1] for c in chunks])
+            blocks.append(Block(block['domain'], index, values, offsets, present))
+
+        return SensorFrame(packets, blocks)
+
+
+def _column(values):
+    """Numeric packet fields become typed arrays; anything else (ids, axis labels) stays as objects."""
+    arr = np.asarray(values)
+    if arr.dtype.kind not in 'iufb':
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+    return arr
+
+
+def _packet_grids(n_packets, chunks):
+    anchor = np.zeros(n_packets, dtype=np.int64)
+    period = np.zeros(n_packets, dtype=np.float64)
+    for packet_idx, grid, _ in chunks:
+        anchor[packet_idx] = grid.anchor
+        period[packet_idx] = grid.period
+    return TimeGrid(anchor, period, dtype=np.float64 if period.any() else np.int64)
+
+
+def _empty_grid(n_packets):
+    return TimeGrid(np.zeros(n_packets, dtype=np.int64), np.zeros(n_packets, dtype=np.float64),
+                    dtype=np.int64)
+
+
+def _concat(chunks, dtype=None):
+    if not chunks:
+        return np.zeros(0, dtype=dtype or np.float64)
+    return np.concatenate([np.asarray(c, dtype=dtype) for c in chunks])
@@ -1,47 +1,88 @@
 # utils/mergers.py
-import datetime
+import re
+from utils.frame import SensorFrame, Block, np
 
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+WINDOW_UNITS = {'m': MINUTE_MS, 'h': HOUR_MS, 'd': DAY_MS}
+_DURATION = re.compile(r'^(\d+)([mhd])$')
 
-def get_hour_from_timestamp(timestamp_ms):
+
+def parse_duration(text):
+    """'<N>m|h|d' -> milliseconds. Raises ValueError on a malformed or zero duration."""
+    match = _DURATION.match(str(text).strip().lower())
+    if not match or int(match[1]) == 0:
+        raise ValueError(f"Invalid window: {text} (expected <N>m, <N>h or <N>d)")
+    return int(match[1]) * WINDOW_UNITS[match[2]]
+
+
+def parse_window(merge_param):
+    """
+    'window:<N>m|h|d' -> bucket length in ms; None for any other merge value.
+    Raises ValueError on a malformed or zero-length window.
+    """
+    merge_param = str(merge_param).strip().lower()
+    if not merge_param.startswith('window:'):
+        return None
+    return parse_duration(merge_param[len('window:'):])
+
+
+def get_bucket_start(timestamp_ms, bucket_ms):
+    """Start of the UTC bucket holding timestamp_ms. Epoch ms have no leap seconds: plain floor division."""
     try:
-        ts_seconds = float(timestamp_ms) / 1000
+        return int(float(timestamp_ms) // bucket_ms) * bucket_ms
     except (ValueError, TypeError):
         return 0
-    dt = datetime.datetime.fromtimestamp(ts_seconds, tz=datetime.timezone.utc)
-    dt_rounded = dt.replace(minute=0, second=0, microsecond=0)
-    return int(dt_rounded.timestamp() * 1000)
+
+
+def get_hour_from_timestamp(timestamp_ms):
+    return get_bucket_start(timestamp_ms, HOUR_MS)
 
 
 def merge_items_in_group(group):
+    if isinstance(group, SensorFrame):
+        # Columnar: one concatenation per block, already done by the frame itself
+        return group.merged()
+
     if not group:
         return {}
 
-    # 1. Base is the first item (sorted by time in Lambda)
-    merged_item = group[0].copy()
-
-    # 2. Iterate through the rest
-    for item in group[1:]:
-        for key, value in item.items():
-            if key == 'time': continue  # Skip time, we keep the earliest
+    # Base is the first item (sorted by time in Lambda); 'time' keeps the earliest
+    return _merge_items(group[0].copy(), group[1:], skip=('time',))
 
-            current_val = merged_item.get(key)
 
-            # Internal Standard guarantees that vectors are LISTS.
-            # We simply concatenate them.
-            if isinstance(value, list) and isinstance(current_val, list):
-                merged_item[key] = current_val + value
+def _merge_items(merged_item, items, skip=()):
+    """
+    Merges 'items' into 'merged_item': vectors (lists) concatenate, scalars are first-wins.
 
-            # If it's a scalar (metadata like scale/odr) or a new key,
-            # we generally keep the existing one (first wins) or set if missing.
-            elif key not in merged_item:
+    Growing the vectors with 'current + value' copies the accumulated list on every packet,
+    i.e. quadratic in the sample count. The chunks of each key are collected first and joined
+    once at the end instead, and the input lists are never modified.
+    """
+    chunks = {}
+    for item in items:
+        for key, value in item.items():
+            if key in skip:
+                continue
+            if key not in merged_item:
+                # New key: set it (a vector starts with this chunk)
                 merged_item[key] = value
-
+            elif isinstance(value, list) and isinstance(merged_item[key], list):
+                # Internal Standard guarantees that vectors are LISTS
+                chunks.setdefault(key, []).append(value)
+
+    for key, parts in chunks.items():
+        vector = list(merged_item[key])
+        for part in parts:
+            vector.extend(part)
+        merged_item[key] = vector
     return merged_item
 
 
 # FFT Merger needs to handle the standard list format and rename keys
 def merge_fft_axes_in_group(group):
-    merged_item = {}
+    renamed = []
     for item in group:
         temp_item = item.copy()
         axis = str(temp_item.get('axis', ''))
@@ -57,32 +98,92 @@ def merge_fft_axes_in_group(group):
                 temp_item['fft_z'] = val
 
         temp_item.pop('axis', None)
+        renamed.append(temp_item)
 
-        for key, value in temp_item.items():
-            current_val = merged_item.get(key)
-            if isinstance(value, list) and isinstance(current_val, list):
-                merged_item[key] = current_val + value
-            elif key not in merged_item:
-                merged_item[key] = value
-
-    return merged_item
+    return _merge_items({}, renamed)
 
 
 def merge_fft_axes_by_hour(data):
-    merged_data = []
-    current_hour = None
-    current_group = []
-
-    for item in data:
-        item_hour = get_hour_from_timestamp(item['time'])
-        if current_hour != item_hour:
-            if current_group:
-                merged_data.append(merge_fft_axes_in_group(current_group))
-            current_hour = item_hour
-            current_group = [item]
-        else:
-            current_group.append(item)
-
-    if current_group:
-        merged_data.append(merge_fft_axes_in_group(current_group))
-    return merged_data
\ No newline at end of file
+    return merge_fft_axes_by_window(data, HOUR_MS)
+
+
+def merge_fft_axes_by_window(data, bucket_ms):
+    """merge_fft_axes_in_group over runs of consecutive packets in the same UTC bucket."""
+    if isinstance(data, SensorFrame):
+        return _merge_frame_by_window(data, bucket_ms, split_fft_axes=True)
+    return [merge_fft_axes_in_group(group) for group in _bucket_runs(data, bucket_ms)]
+
+
+def merge_items_by_window(data, bucket_ms):
+    """
+    merge_items_in_group over runs of consecutive (time-sorted) packets in the same UTC bucket:
+    one item per bucket, or a SensorFrame with one packet per bucket.
+    """
+    if isinstance(data, SensorFrame):
+        return _merge_frame_by_window(data, bucket_ms)
+    return [merge_items_in_group(group) for group in _bucket_runs(data, bucket_ms)]
+
+
+def _bucket_runs(items, bucket_ms):
+    runs = []
+    current_bucket = None
+    for item in items:
+        bucket = get_bucket_start(item['time'], bucket_ms)
+        if not runs or bucket != current_bucket:
+            runs.append([])
+            current_bucket = bucket
+        runs[-1].append(item)
+    return runs
+
+
+FFT_AXIS_KEYS = {'0': 'fft_x', '1': 'fft_y', '2': 'fft_z'}
+
+
+def _merge_frame_by_window(frame, bucket_ms, split_fft_axes=False):
+    """
+    SensorFrame version of the window mergers: consecutive packets of the same UTC bucket become
+    one packet (buckets are found with one floor division over the packet times). With
+    split_fft_axes, the 'fft' block is split into fft_x/fft_y/fft_z by axis.
+    """
+    if len(frame) == 0:
+        return frame
+
+    buckets = frame.packet_times() // bucket_ms
+    run_ids = np.zeros(len(frame), dtype=np.int64)
+    run_ids[1:] = buckets[1:] != buckets[:-1]
+    run_ids = np.cumsum(run_ids)
+    run_starts = np.flatnonzero(np.diff(run_ids, prepend=-1))
+    n_runs = len(run_starts)
+
+    # First packet of every run carries the metadata (first-wins), without 'axis' for FFT
+    packets = {k: v[run_starts] for k, v in frame.packets.items() if not (split_fft_axes and k == 'axis')}
+
+    blocks = []
+    for block in frame.blocks:
+        if not split_fft_axes or 'fft' not in block.values:
+            blocks.append(_regroup_block(block, np.arange(len(frame)), run_ids, n_runs, block.values))
+            continue
+
+        axes = frame.packets['axis']
+        for axis, key in FFT_AXIS_KEYS.items():
+            selected = np.flatnonzero(axes == axis)
+            if len(selected) == 0:
+                continue
+            axis_block = block.take(selected)
+            blocks.append(_regroup_block(axis_block, selected, run_ids, n_runs, {key: axis_block.values['fft']}))
+
+    return SensorFrame(packets, blocks)
+
+
+def _regroup_block(block, selected, run_ids, n_runs, values):
+    """
+    Re-slices a block (holding the 'selected' packets, in order) into one slice per run.
+    Packets of one run are contiguous, so the samples are already grouped by run.
+    """
+    run_counts = np.bincount(run_ids[selected], weights=block.counts(), minlength=n_runs)
+    offsets = np.zeros(n_runs + 1, dtype=np.int64)
+    np.cumsum(run_counts.astype(np.int64), out=offsets[1:])
+
+    present = np.zeros(n_runs, dtype=bool)
+    present[run_ids[selected]] = True
+    return Block(block.domain, block.index, values, offsets, None if present.all() else present)
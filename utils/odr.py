@@ -0,0 +1,113 @@
+# utils/odr.py
+"""
+Rolling estimate of the packet period (auto ODR).
+
+A single median over a whole page is noisy on short pages and goes stale on long ranges, where the
+sensor clock drifts. rolling_medians() follows the drift instead: every packet gets the median of
+the last 'window' plausible deltas before it, maintained in O(log w) per packet by RollingMedian.
+"""
+import heapq
+from collections import deque
+
+# Deltas outside this range are gaps or duplicates, not the packet period
+MIN_VALID_DELTA = 1000
+MAX_VALID_DELTA = 1500
+
+MAX_WINDOW = 256
+# Below this many deltas in the window the estimate is too noisy: the fallback period is used
+MIN_WINDOW_DELTAS = 8
+
+
+def is_valid_delta(delta):
+    return MIN_VALID_DELTA <= delta <= MAX_VALID_DELTA
+
+
+class RollingMedian:
+    """
+    Median of the last 'window' values pushed.
+
+    Two heaps split the window at the median (max-heap 'low' stored negated, min-heap 'high').
+    Values leaving the window are not searched for: they are counted in 'delayed' and discarded
+    when they reach the top of a heap (lazy deletion). 'low_size'/'high_size' count live values.
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque()
+        self.low, self.high = [], []
+        self.low_size = self.high_size = 0
+        self.delayed = {}
+        for value in values:
+            self.push(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, value):
+        self.values.append(value)
+        if not self.low or value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._balance()
+
+    def median(self):
+        """Same value as statistics.median over the window, None when empty."""
+        if not self.values:
+            return None
+        if self.low_size > self.high_size:
+            return -self.low[0]
+        return (-self.low[0] + self.high[0]) / 2
+
+    def _remove(self, value):
+        self.delayed[value] = self.delayed.get(value, 0) + 1
+        if value <= -self.low[0]:
+            self.low_size -= 1
+            if value == -self.low[0]:
+                self._prune(self.low, -1)
+        else:
+            self.high_size -= 1
+            if self.high and value == self.high[0]:
+                self._prune(self.high, 1)
+
+    def _prune(self, heap, sign):
+        while heap and self.delayed.get(sign * heap[0]):
+            value = sign * heapq.heappop(heap)
+            self.delayed[value] -= 1
+
+    def _balance(self):
+        # Keep low_size == high_size or high_size + 1
+        if self.low_size > self.high_size + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self._prune(self.low, -1)
+        elif self.low_size < self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.high_size -= 1
+            self.low_size += 1
+            self._prune(self.high, 1)
+
+
+def rolling_medians(times, window, history=(), fallback=1280.0):
+    """
+    Per-packet period estimate for a time-sorted sequence.
+    Entry i is the median of the last 'window' valid deltas up to packet i (the delta into packet i
+    included), continuing from 'history' (the valid deltas before times[0], oldest first);
+    'fallback' while fewer than MIN_WINDOW_DELTAS of them are known.
+    Returns (medians, estimator), the estimator holding the window after the last packet.
+    """
+    estimator = RollingMedian(window, history)
+    enough = min(window, MIN_WINDOW_DELTAS)
+
+    medians = []
+    for i, t in enumerate(times):
+        if i and is_valid_delta(t - times[i - 1]):
+            estimator.push(t - times[i - 1])
+        medians.append(estimator.median() if len(estimator) >= enough else fallback)
+    return medians, estimator
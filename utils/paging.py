@@ -0,0 +1,78 @@
+# utils/paging.py
+"""
+Byte-budgeted pagination.
+
+Instead of a fixed number of packets per response, we estimate how many bytes one packet of a
+topic takes once formatted in the requested output_format, and fill each page up to a budget.
+The estimates are measured on stdlib json output (the larger of the two serializer engines, and
+the one deployed without orjson) with the longest value reprs (gyr), so a page stays within its
+budget and below the Lambda response payload ceiling (6 MB for synchronous invocations).
+"""
+import os
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get('ASENSE_RESPONSE_BUDGET_BYTES', 4 * 1024 * 1024))
+MAX_BUDGET_BYTES = 5 * 1024 * 1024
+MIN_PAGE_PACKETS = 1
+MAX_PAGE_PACKETS = 20000
+
+# Nominal packet shapes: topic -> (samples per vector, vector keys, scalar samples per packet)
+PACKET_SHAPES = {
+    'acc': (64, 3, 3),  # acc_x/y/z + tamb/w_s/w_d
+    'gyr': (64, 3, 0),
+    'ain': (64, 2, 0),
+    'fft': (512, 1, 0),
+}
+
+# 'data' packets have no vectors: ~35 scalar fields plus w_s_avg
+DATA_PACKET_BYTES = 1300
+
+# Root metadata of an item (id, datetime, scale, odr, seq...) and its key names
+PACKET_OVERHEAD_BYTES = 250
+
+# One formatted (index, value) sample, e.g. '"1700000000623.0": -306.610107421875, '
+SAMPLE_BYTES = {'map': 41, 'tuple_array': 41, 'dict_array': 56}
+# Binary rows (utils.columnar): int8 topic/key codes, int16 item, 8-byte time, 8-byte value when
+# float32 is lossy, times 4/3 for the base64 body. Parquet usually compresses well below that.
+SAMPLE_BYTES.update({'arrow': 26, 'parquet': 26})
+# 'typed' buffers: 8-byte index + float32 value, base64. Keys sharing an index buffer still
+# serialize it under each key; every key also has its {dtype, shape, b64} wrappers per packet.
+SAMPLE_BYTES['typed'] = 16
+TYPED_KEY_BYTES = 110
+# 'typed_grid' is charged like 'typed': eager blocks (and the python engine) still send time buffers
+SAMPLE_BYTES['typed_grid'] = SAMPLE_BYTES['typed']
+
+# Combined rows: (bytes per row incl. index, bytes per member value)
+COMBINED_ROW_BYTES = {'combined_tuple': (20, 19), 'combined_dict': (28, 24)}
+COMBINED_SUB_FORMAT = {'combined_tuple': 'tuple_array', 'combined_dict': 'dict_array'}
+
+# Topics whose vectors are rendered as combined rows (fft only combines after the axis merge)
+COMBINED_TOPICS = ['acc', 'gyr', 'ain']
+
+
+def estimate_packet_bytes(topic, output_format):
+    """Estimated size of one packet of 'topic' once serialized in 'output_format'."""
+    if topic not in PACKET_SHAPES:
+        return DATA_PACKET_BYTES
+
+    samples, keys, scalars = PACKET_SHAPES[topic]
+    if output_format in COMBINED_ROW_BYTES:
+        sub_format = COMBINED_SUB_FORMAT[output_format]
+        if topic in COMBINED_TOPICS:
+            row_bytes, value_bytes = COMBINED_ROW_BYTES[output_format]
+            vector_bytes = samples * (row_bytes + keys * value_bytes)
+        else:
+            vector_bytes = samples * keys * SAMPLE_BYTES[sub_format]
+    else:
+        sub_format = output_format if output_format in SAMPLE_BYTES else 'map'
+        vector_bytes = samples * keys * SAMPLE_BYTES[sub_format]
+        if output_format in ('typed', 'typed_grid'):
+            vector_bytes += (keys + scalars) * TYPED_KEY_BYTES
+
+    return PACKET_OVERHEAD_BYTES + vector_bytes + scalars * SAMPLE_BYTES[sub_format]
+
+
+def packets_for_budget(topic, output_format, budget_bytes=DEFAULT_BUDGET_BYTES):
+    """Number of packets to fetch so the formatted response stays within budget_bytes."""
+    budget_bytes = max(0, min(int(budget_bytes), MAX_BUDGET_BYTES))
+    packets = budget_bytes // estimate_packet_bytes(topic, output_format)
+    return max(MIN_PAGE_PACKETS, min(MAX_PAGE_PACKETS, packets))
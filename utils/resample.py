@@ -0,0 +1,88 @@
+# utils/resample.py
+"""
+Uniform-grid resampling of the vibration channels (resample_hz).
+
+Synchronizing acc and gyr used to mean matching packets by seq offline and joining millions of
+timestamps client-side. Here every channel is linearly interpolated (np.interp) from its corrected
+sample times onto a grid of multiples of 1000 / resample_hz ms since the epoch. Grids anchored to
+the epoch are the same for every topic and device, so two channels resampled at the same rate line
+up by timestamp, and by index over their common time range.
+
+Grid points inside a gap of the data (more than twice the typical sample spacing) are dropped
+rather than interpolated across.
+"""
+import math
+
+from utils.formatters import FIELD_SCHEMA, GROUPS
+from utils.frame import FrameBuilder, np
+
+# Time-domain channels of the combined groups (fft bins are not a time series)
+RESAMPLE_KEYS = [k for name, config in GROUPS.items() if name != 'fft' for k in config['keys']]
+MAX_HZ = 1000.0
+# A gap is a step longer than this many typical sample spacings
+GAP_FACTOR = 2.0
+
+
+def uniform_grid(first_ms, last_ms, period_ms):
+    """Multiples of period_ms (counted from the epoch) within [first_ms, last_ms]."""
+    k_first = math.ceil(first_ms / period_ms)
+    k_last = math.floor(last_ms / period_ms)
+    return np.arange(k_first, k_last + 1, dtype=np.float64) * period_ms
+
+
+def resample_series(times, columns, period_ms):
+    """
+    Interpolates value arrays sharing 'times' onto the uniform grid.
+    Returns (grid times, [resampled values per column]).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    columns = [np.asarray(c, dtype=np.float64) for c in columns]
+    if not len(times):
+        return times, columns
+    if (np.diff(times) < 0).any():
+        order = np.argsort(times, kind='stable')
+        times, columns = times[order], [c[order] for c in columns]
+
+    grid = uniform_grid(times[0], times[-1], period_ms)
+    if len(times) > 1 and len(grid):
+        # Bracketing samples of every grid point: times[right - 1] < grid <= times[right]
+        right = np.searchsorted(times, grid, side='left')
+        left = np.maximum(right - 1, 0)
+        max_gap = GAP_FACTOR * np.median(np.diff(times))
+        grid = grid[(times[right] == grid) | (times[right] - times[left] <= max_gap)]
+    return grid, [np.interp(grid, times, c) for c in columns]
+
+
+def resample_items(items, resample_hz):
+    """Resamples the channels of 'dict_array' items (in place); returns the items."""
+    period_ms = 1000.0 / resample_hz
+    for item in items:
+        for key in RESAMPLE_KEYS:
+            samples = item.get(key)
+            if not isinstance(samples, list):
+                continue
+            cfg = FIELD_SCHEMA[key]
+            grid, (values,) = resample_series([s[cfg['idx']] for s in samples],
+                                              [[s[cfg['val']] for s in samples]], period_ms)
+            item[key] = [{cfg['idx']: t, cfg['val']: v} for t, v in zip(grid.tolist(), values.tolist())]
+    return items
+
+
+def resample_frame(frame, resample_hz):
+    """SensorFrame version of resample_items: a new frame, the other blocks copied as they are."""
+    period_ms = 1000.0 / resample_hz
+    builder = FrameBuilder()
+    for p, meta in enumerate(frame.packet_dicts()):
+        blocks = []
+        for block in frame.blocks:
+            if block.present is not None and not block.present[p]:
+                continue
+            start, end = block.offsets[p], block.offsets[p + 1]
+            index = block.index[start:end]
+            values = {k: v[start:end] for k, v in block.values.items()}
+            if block.domain == 'time' and all(k in RESAMPLE_KEYS for k in values):
+                index, resampled = resample_series(index, list(values.values()), period_ms)
+                values = dict(zip(values, resampled))
+            blocks.append((block.domain, index, values))
+        builder.add_packet(meta, blocks)
+    return builder.build()
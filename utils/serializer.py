@@ -0,0 +1,115 @@
+# utils/serializer.py
+"""
+JSON serialization of the response bodies.
+
+Uses orjson when it is installed (a C encoder, several times faster than the stdlib on the
+nested float lists and maps of sensor responses, and with native numpy array support via
+OPT_SERIALIZE_NUMPY); falls back to the stdlib json module otherwise, with the exact output
+json.dumps always produced. ASENSE_JSON_ENGINE=json forces the stdlib.
+
+The two engines produce the same JSON values but not the same text: orjson writes compact
+separators, 1e16 instead of 1e+16, and null for NaN/Infinity (which the stdlib writes as
+non-standard NaN/Infinity literals).
+
+iter_encode() yields the body in chunks of at most CHUNK_ITEMS samples or rows, so the whole
+document never has to exist as one string (e.g. to write a page to a file or a streamed
+response). Joined, the chunks are byte-identical to dumps_bytes().
+"""
+import itertools
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib fallback serializes the same data
+    orjson = None
+
+ENGINES = ['orjson', 'json']
+DEFAULT_ENGINE = os.environ.get('ASENSE_JSON_ENGINE', 'orjson' if orjson is not None else 'json')
+if DEFAULT_ENGINE not in ENGINES or (DEFAULT_ENGINE == 'orjson' and orjson is None):
+    DEFAULT_ENGINE = 'json'
+
+# Entries of a flat list or dict encoded per chunk by iter_encode (samples of a 'map' vector,
+# rows of a combined group...)
+CHUNK_ITEMS = 1024
+
+# (item separator, key separator) of each engine's output
+_SEPARATORS = {'orjson': (b',', b':'), 'json': (b', ', b': ')}
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _default(obj):
+    """numpy arrays and scalars the encoder does not handle natively -> Python lists/numbers."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def resolve_engine(engine):
+    """Requested engine, or the stdlib when orjson is not installed."""
+    return engine if engine in ENGINES and (engine != 'orjson' or orjson is not None) else 'json'
+
+
+def dumps_bytes(obj, engine=DEFAULT_ENGINE):
+    """obj -> UTF-8 JSON bytes."""
+    if resolve_engine(engine) == 'orjson':
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default).encode()
+
+
+def dumps(obj, engine=DEFAULT_ENGINE):
+    """obj -> JSON str (what the Lambda proxy integration expects as 'body')."""
+    return dumps_bytes(obj, engine).decode()
+
+
+def _is_container(value):
+    return isinstance(value, (dict, list))
+
+
+def iter_encode(obj, engine=DEFAULT_ENGINE, chunk_items=CHUNK_ITEMS):
+    """
+    Yields the JSON bytes of obj in chunks. Dicts and lists holding containers (the envelope,
+    the 'data' list, the items) are walked; flat ones (a 'map' vector, the rows of a combined
+    group, judged by their first element) are encoded chunk_items entries at a time.
+    """
+    engine = resolve_engine(engine)
+    item_separator, key_separator = _SEPARATORS[engine]
+    if isinstance(obj, dict):
+        if any(_is_container(value) for value in obj.values()):
+            yield b'{'
+            for n, (key, value) in enumerate(obj.items()):
+                yield (item_separator if n else b'') + dumps_bytes(str(key), engine) + key_separator
+                yield from iter_encode(value, engine, chunk_items)
+            yield b'}'
+        else:
+            entries = iter(obj.items())
+            yield b'{'
+            for start in range(0, len(obj), chunk_items):
+                # '{"a": 1, "b": 2}' -> '"a": 1, "b": 2'
+                chunk = dumps_bytes(dict(itertools.islice(entries, chunk_items)), engine)[1:-1]
+                yield (item_separator if start else b'') + chunk
+            yield b'}'
+    elif isinstance(obj, list):
+        yield b'['
+        if obj and isinstance(obj[0], dict) and any(_is_container(value) for value in obj[0].values()):
+            for n, value in enumerate(obj):
+                if n:
+                    yield item_separator
+                yield from iter_encode(value, engine, chunk_items)
+        else:
+            for start in range(0, len(obj), chunk_items):
+                # '[a, b, c]' -> 'a, b, c'
+                chunk = dumps_bytes(obj[start:start + chunk_items], engine)[1:-1]
+                yield (item_separator if start else b'') + chunk
+        yield b']'
+    else:
+        yield dumps_bytes(obj, engine)
+
+
+def dump(obj, fp, engine=DEFAULT_ENGINE, chunk_items=CHUNK_ITEMS):
+    """Writes obj to the binary file object fp chunk by chunk; returns the number of bytes written."""
+    written = 0
+    for chunk in iter_encode(obj, engine, chunk_items):
+        fp.write(chunk)
+        written += len(chunk)
+    return written